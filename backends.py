@@ -0,0 +1,265 @@
+"""
+翻译后端模块
+- TranslatorBackend：一种服务端实现（DashScope、通用 OpenAI 兼容服务如 llama.cpp / vLLM 等）
+  负责给出默认能力、探测能力、按能力组装请求参数
+- 注册表：register_backend() 注册，resolve_backend() 按名称或 api_base 选择
+- 能力探测结果（是否支持视觉、流式、最大图片边长、可用图片格式等）按 api_base + model
+  缓存到 capabilities.json，翻译时直接按缓存选请求形式，不再靠报错试探
+"""
+
+import io
+import os
+import json
+import time
+import base64
+import threading
+
+from PIL import Image
+
+from config import atomic_write_json
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+CAPABILITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capabilities.json")
+CAPABILITY_TTL = 7 * 24 * 3600     # 探测结果有效期（秒）
+
+
+class ProbeError(Exception):
+    """能力探测无法完成（网络错误、鉴权失败等），结果不缓存"""
+
+
+# ====================================================================== #
+#  能力描述
+# ====================================================================== #
+class Capabilities:
+    """一个端点（api_base + model）支持的请求形式"""
+
+    def __init__(self, vision: bool = True, streaming: bool = True, stream_usage: bool = False,
+                 thinking_flag: bool = False, max_image_edge: int = 1920,
+                 image_formats=("jpeg",), probed_at: float = 0.0):
+        self.vision = vision
+        self.streaming = streaming
+        self.stream_usage = stream_usage          # 是否接受 stream_options.include_usage
+        self.thinking_flag = thinking_flag        # 是否接受 extra_body.enable_thinking
+        self.max_image_edge = max_image_edge
+        self.image_formats = tuple(image_formats)
+        self.probed_at = probed_at
+
+    def to_dict(self):
+        return {
+            "vision": self.vision, "streaming": self.streaming,
+            "stream_usage": self.stream_usage, "thinking_flag": self.thinking_flag,
+            "max_image_edge": self.max_image_edge, "image_formats": list(self.image_formats),
+            "probed_at": self.probed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        return cls(**{k: v for k, v in d.items() if k in cls().to_dict()})
+
+    def __repr__(self):
+        return f"Capabilities({self.to_dict()})"
+
+
+# ====================================================================== #
+#  能力缓存（磁盘）
+# ====================================================================== #
+class CapabilityCache:
+    """按 "api_base|model" 缓存探测结果"""
+
+    def __init__(self, path: str = CAPABILITIES_FILE, ttl: float = CAPABILITY_TTL):
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except Exception:
+                self._data = {}
+
+    @staticmethod
+    def key(api_base: str, model: str) -> str:
+        return f"{api_base.rstrip('/')}|{model}"
+
+    def get(self, api_base: str, model: str):
+        with self._lock:
+            entry = self._data.get(self.key(api_base, model))
+        if not entry:
+            return None
+        caps = Capabilities.from_dict(entry)
+        if time.time() - caps.probed_at > self._ttl:
+            return None
+        return caps
+
+    def put(self, api_base: str, model: str, caps: Capabilities):
+        with self._lock:
+            self._data[self.key(api_base, model)] = caps.to_dict()
+            snapshot = dict(self._data)
+        try:
+            atomic_write_json(self._path, snapshot)
+        except Exception as e:
+            print(f"[后端] 能力缓存保存失败: {e}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_capability_cache() -> CapabilityCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CapabilityCache()
+        return _default_cache
+
+
+# ====================================================================== #
+#  后端基类 + 注册表
+# ====================================================================== #
+_BACKENDS = []
+
+
+def register_backend(cls):
+    """类装饰器：注册后端；resolve_backend 按注册顺序匹配 api_base"""
+    _BACKENDS.append(cls)
+    return cls
+
+
+def resolve_backend(api_base: str, name: str = "") -> "TranslatorBackend":
+    """按名称选择后端；名称为空时按 api_base 自动识别，识别不出用通用 OpenAI 兼容后端"""
+    if name:
+        for cls in _BACKENDS:
+            if cls.name == name:
+                return cls()
+        print(f"[后端] 未知后端 {name}，按地址自动识别")
+    for cls in _BACKENDS:
+        if cls.matches(api_base):
+            return cls()
+    return OpenAICompatibleBackend()
+
+
+class TranslatorBackend:
+    """后端接口"""
+
+    name = ""
+
+    @classmethod
+    def matches(cls, api_base: str) -> bool:
+        return False
+
+    def default_capabilities(self) -> Capabilities:
+        """未探测 / 探测失败时使用的保守能力"""
+        return Capabilities()
+
+    def probe(self, client, model: str) -> Capabilities:
+        """探测端点能力；无法完成时抛出 ProbeError"""
+        return self.default_capabilities()
+
+    def request_kwargs(self, caps: Capabilities, model: str, messages,
+                       max_tokens: int, temperature: float = 0.1) -> dict:
+        """按能力组装 chat.completions.create 的参数"""
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if caps.streaming:
+            kwargs["stream"] = True
+            if caps.stream_usage:
+                kwargs["stream_options"] = {"include_usage": True}
+        if caps.thinking_flag:
+            kwargs["extra_body"] = {"enable_thinking": False}
+        return kwargs
+
+
+@register_backend
+class DashScopeBackend(TranslatorBackend):
+    """阿里云 DashScope 兼容模式：能力已知，不必发探测请求"""
+
+    name = "dashscope"
+
+    @classmethod
+    def matches(cls, api_base: str) -> bool:
+        return "dashscope" in (api_base or "")
+
+    def default_capabilities(self) -> Capabilities:
+        return Capabilities(vision=True, streaming=True, stream_usage=True, thinking_flag=True,
+                            max_image_edge=1920, image_formats=("jpeg", "png", "webp"))
+
+    def probe(self, client, model: str) -> Capabilities:
+        caps = self.default_capabilities()
+        caps.probed_at = time.time()
+        return caps
+
+
+@register_backend
+class OpenAICompatibleBackend(TranslatorBackend):
+    """
+    通用 OpenAI 兼容服务（OpenAI、llama.cpp server、vLLM 等）
+    用几个 max_tokens=1 的小请求逐项探测能力
+    """
+
+    name = "openai"
+    PROBE_FORMATS = ("jpeg", "png", "webp")
+    PROBE_EDGES = (1920, 1536, 1024, 768)
+
+    def probe(self, client, model: str) -> Capabilities:
+        client = client.with_options(timeout=15.0, max_retries=0)
+        text_only = [{"role": "user", "content": "hi"}]
+        if not self._accepts(client, model=model, messages=text_only, max_tokens=1):
+            raise ProbeError(f"{model} 连最简单的文本请求都被拒绝")
+
+        caps = Capabilities(probed_at=time.time())
+        formats = [fmt for fmt in self.PROBE_FORMATS
+                   if self._accepts(client, model=model, max_tokens=1,
+                                    messages=self._image_messages(fmt, 64))]
+        caps.vision = bool(formats)
+        caps.image_formats = tuple(formats) or ("jpeg",)
+        if caps.vision:
+            fmt = caps.image_formats[0]
+            caps.max_image_edge = next(
+                (edge for edge in self.PROBE_EDGES
+                 if self._accepts(client, model=model, max_tokens=1,
+                                  messages=self._image_messages(fmt, edge))),
+                self.PROBE_EDGES[-1],
+            )
+        caps.streaming = self._accepts(client, model=model, messages=text_only,
+                                       max_tokens=1, stream=True)
+        if caps.streaming:
+            caps.stream_usage = self._accepts(client, model=model, messages=text_only, max_tokens=1,
+                                              stream=True, stream_options={"include_usage": True})
+        caps.thinking_flag = self._accepts(client, model=model, messages=text_only, max_tokens=1,
+                                           extra_body={"enable_thinking": False})
+        return caps
+
+    @staticmethod
+    def _image_messages(fmt: str, edge: int):
+        buf = io.BytesIO()
+        Image.new("RGB", (edge, edge), (255, 255, 255)).save(buf, format=fmt.upper())
+        url = f"data:image/{fmt};base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+        return [{"role": "user", "content": [
+            {"type": "image_url", "image_url": {"url": url}},
+            {"type": "text", "text": "hi"},
+        ]}]
+
+    @staticmethod
+    def _accepts(client, **kwargs) -> bool:
+        """请求被接受返回 True；4xx 参数类错误返回 False；其他错误抛出 ProbeError"""
+        try:
+            resp = client.chat.completions.create(**kwargs)
+            if kwargs.get("stream"):
+                for _ in resp:
+                    pass
+            return True
+        except Exception as e:
+            if openai is not None and isinstance(e, (openai.BadRequestError,
+                                                     openai.UnprocessableEntityError,
+                                                     openai.NotFoundError)):
+                return False
+            raise ProbeError(str(e)) from e
@@ -0,0 +1,89 @@
+"""
+截图 → 编码器的缩放开销基准（user-033）
+4K 屏 200% 缩放：逻辑 1920x1080 的全屏选区对应 3840x2160 物理像素
+对比旧路径（先 convert("RGB")，再全分辨率 LANCZOS，然后二分 JPEG 质量）与当前的 encode_image
+运行：python -m bench.bench_resize
+"""
+
+import io
+import time
+import contextlib
+
+from PIL import Image, ImageDraw, ImageFont
+
+from translator import downscale_image, encode_image
+
+LOGICAL = (1920, 1080)
+SCALE = 2.0
+ROUNDS = 5
+
+
+def make_frame(mode: str = "RGB") -> Image.Image:
+    """文字密集的合成截图（物理分辨率）"""
+    w, h = int(LOGICAL[0] * SCALE), int(LOGICAL[1] * SCALE)
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 28)
+    except OSError:
+        font = ImageFont.load_default()
+    for i, y in enumerate(range(20, h - 40, 44)):
+        draw.text((30, y), f"{i:03d} The quick brown fox jumps over the lazy dog. " * 3,
+                  fill=(20, 20, 20), font=font)
+    return img.convert(mode) if mode != "RGB" else img
+
+
+def legacy_compress(img: Image.Image, target_size_kb: int = 1024) -> bytes:
+    """旧实现：全分辨率转换 + LANCZOS + 每次都二分质量"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    w, h = img.size
+    if max(w, h) > 1920:
+        scale = 1920 / max(w, h)
+        img = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+    low, high, best = 20, 95, None
+    while low <= high:
+        mid = (low + high) // 2
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=mid, optimize=True)
+        if buf.tell() / 1024 <= target_size_kb:
+            best, low = buf, mid + 1
+        else:
+            high = mid - 1
+    return best.getvalue() if best else b""
+
+
+def legacy_resize(img: Image.Image) -> Image.Image:
+    img = img.convert("RGB") if img.mode != "RGB" else img
+    w, h = img.size
+    scale = 1920 / max(w, h)
+    return img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+
+
+def cpu_ms(fn, *args) -> float:
+    """ROUNDS 次调用的平均 CPU 时间（毫秒）；编码器的日志不打印"""
+    total = 0.0
+    for _ in range(ROUNDS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.process_time()
+            fn(*args)
+            total += time.process_time() - started
+    return total / ROUNDS * 1000
+
+
+def main():
+    print(f"4K @ {SCALE:.0%} 缩放：逻辑 {LOGICAL[0]}x{LOGICAL[1]} → 物理 "
+          f"{int(LOGICAL[0] * SCALE)}x{int(LOGICAL[1] * SCALE)}，每项 {ROUNDS} 次取平均 CPU 时间")
+    for mode in ("RGB", "RGBA"):
+        frame = make_frame(mode)
+        old_resize = cpu_ms(legacy_resize, frame)
+        new_resize = cpu_ms(downscale_image, frame)
+        old_total = cpu_ms(legacy_compress, frame)
+        new_total = cpu_ms(encode_image, frame)
+        print(f"{mode:4}  缩放: {old_resize:6.1f}ms → {new_resize:6.1f}ms   "
+              f"整个编码: {old_total:6.1f}ms → {new_total:6.1f}ms "
+              f"（节省 {1 - new_total / old_total:.0%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+并行分条翻译基准（user-039）
+2266x1248、40 行文字的区域，分别按 parallel_strips = 1..4 翻译，比较端到端耗时
+模型服务用 tests.standin 的本地替身服务器：按收到的图片高度估计文字行数，
+每行输出一个 JSON 对象、逐行间隔 CHUNK_DELAY 发送，生成耗时与图片高度成正比，和真实模型一样
+运行：python -m bench.bench_strips
+"""
+
+import io
+import re
+import json
+import time
+import base64
+import contextlib
+
+from PIL import Image, ImageDraw, ImageFont
+
+from translator import AITranslator
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+SIZE = (2266, 1248)
+LINES = 40
+CHUNK_DELAY = 0.1          # 每输出一行的耗时（秒）
+ROUNDS = 3
+
+_DATA_URL = re.compile(r"data:image/[a-z]+;base64,([A-Za-z0-9+/=]+)")
+
+
+def make_frame() -> Image.Image:
+    img = Image.new("RGB", SIZE, "white")
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 18)
+    except OSError:
+        font = ImageFont.load_default()
+    pitch = SIZE[1] // LINES
+    for i in range(LINES):
+        draw.text((30, i * pitch + 6), f"{i:02d} The quick brown fox jumps over the lazy dog. " * 3,
+                  fill=(20, 20, 20), font=font)
+    return img
+
+
+def reply_for(request: dict) -> str:
+    """按请求里图片的高度（相对整图）输出对应行数的 JSON 行译文"""
+    match = _DATA_URL.search(json.dumps(request["messages"]))
+    height = Image.open(io.BytesIO(base64.b64decode(match.group(1)))).height if match else SIZE[1]
+    full = round(SIZE[1] * min(1.0, 1920 / max(SIZE)))     # 编码时长边缩到 1920 以内
+    lines = max(1, round(LINES * height / full))
+    return "".join(json.dumps({"src": f"line {i}", "tgt": f"第 {i} 行"}, ensure_ascii=False) + "\n"
+                   for i in range(lines))
+
+
+def main():
+    frame = make_frame()
+    print(f"区域 {SIZE[0]}x{SIZE[1]}，{LINES} 行文字；替身服务器每行输出耗时 {CHUNK_DELAY * 1000:.0f}ms，"
+          f"每项 {ROUNDS} 次取平均")
+    baseline = None
+    with StandInServer([Reply(reply_for, chunk_delay=CHUNK_DELAY)]) as server, IsolatedCapabilities(server):
+        for strips in (1, 2, 3, 4):
+            translator = AITranslator(api_key="bench", api_base=server.base_url, model=MODEL,
+                                      parallel_strips=strips)
+            total = 0.0
+            for _ in range(ROUNDS):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    started = time.perf_counter()
+                    translator.translate_image(frame, "英文", "中文")
+                    total += time.perf_counter() - started
+            seconds = total / ROUNDS
+            baseline = baseline or seconds
+            print(f"parallel_strips={strips}: {seconds:5.2f}s（{baseline / seconds:.2f}x）")
+
+
+if __name__ == "__main__":
+    main()
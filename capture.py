@@ -1,6 +1,10 @@
 """
 屏幕截图模块
 使用 mss 高效截取指定屏幕区域
+- 坐标是 mss 的物理像素坐标（区域选择器已按选区所在屏幕的缩放比换算）
+- 区域按屏幕裁剪，只截落在各屏幕内的部分；跨两块屏幕时分别截取再按物理坐标拼接，
+  屏幕之间的空隙（不同缩放比的屏幕拼接时常见）填黑，不会截到不存在的像素
+- 不再截所有屏幕的合并区域（monitors[0]）：多块高分屏时那是一张巨大且大部分无用的图
 """
 
 import io
@@ -14,6 +18,17 @@ except ImportError:
     mss = None
 
 
+def _intersect(a: dict, b: dict):
+    """两个 mss 矩形（left/top/width/height）的交集，不相交返回 None"""
+    left = max(a["left"], b["left"])
+    top = max(a["top"], b["top"])
+    right = min(a["left"] + a["width"], b["left"] + b["width"])
+    bottom = min(a["top"] + a["height"], b["top"] + b["height"])
+    if right <= left or bottom <= top:
+        return None
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+
 class ScreenCapture:
     """屏幕截图工具"""
 
@@ -31,25 +46,58 @@ class ScreenCapture:
         :param height: 高度
         :return: PIL.Image.Image
         """
-        monitor = {"left": x, "top": y, "width": width, "height": height}
-        screenshot = self._sct.grab(monitor)
-        # mss 返回 BGRA，转为 RGB
-        img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-        return img
+        region = {"left": x, "top": y, "width": width, "height": height}
+        monitor = self.monitor_for(x, y, width, height)
+        if monitor is None:
+            raise ValueError(f"区域 ({x}, {y}) {width}x{height} 不在任何屏幕上")
+        if _intersect(region, monitor) == region:
+            # 常见情况：完全在一块屏幕内，只截这块屏幕上的这个矩形
+            return self._to_image(self._sct.grab(region))
+        # 跨屏或超出屏幕边缘：逐屏截取落在屏幕内的部分，贴到区域大小的画布上
+        canvas = Image.new("RGB", (width, height))
+        for m in self.monitors:
+            part = _intersect(region, m)
+            if part:
+                canvas.paste(self._to_image(self._sct.grab(part)), (part["left"] - x, part["top"] - y))
+        return canvas
+
+    @property
+    def monitors(self) -> list:
+        """各块屏幕的物理像素矩形（mss 的 monitors[1:]，第一块通常为主屏）"""
+        return self._sct.monitors[1:]
+
+    def monitor_for(self, x: int, y: int, width: int, height: int):
+        """区域所在的屏幕（跨屏时取重叠面积最大的一块）；不在任何屏幕上返回 None"""
+        region = {"left": x, "top": y, "width": width, "height": height}
+        best, best_area = None, 0
+        for m in self.monitors:
+            part = _intersect(region, m)
+            if part and part["width"] * part["height"] > best_area:
+                best, best_area = m, part["width"] * part["height"]
+        return best
+
+    def capture_full_screen(self, monitor: int = 0) -> Image.Image:
+        """
+        截取一块屏幕：monitor 为 monitors 中的下标，0 为主屏
+        注意：以前截的是所有屏幕的合并区域（mss 的 monitors[0]），现在只截一块屏幕
+        """
+        return self._to_image(self._sct.grab(self.monitors[monitor]))
 
-    def capture_full_screen(self) -> Image.Image:
-        """截取整个屏幕"""
-        monitor = self._sct.monitors[0]  # 所有屏幕的合并区域
-        screenshot = self._sct.grab(monitor)
-        img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-        return img
+    @staticmethod
+    def _to_image(screenshot) -> Image.Image:
+        """
+        mss 返回 BGRA，解码为 RGB
+        直接读 screenshot.raw（bytearray），避免 .bgra 属性额外复制一份整帧 bytes
+        """
+        return Image.frombuffer("RGB", screenshot.size, screenshot.raw, "raw", "BGRX", 0, 1)
 
     @staticmethod
     def image_to_base64(img: Image.Image, fmt: str = "PNG") -> str:
-        """将 PIL Image 转为 base64 编码字符串"""
+        """将 PIL Image 转为 base64 编码字符串（直接编码缓冲区视图，不经 getvalue() 复制）"""
         buffer = io.BytesIO()
         img.save(buffer, format=fmt)
-        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+        with buffer.getbuffer() as view:
+            return base64.b64encode(view).decode("ascii")
 
     @staticmethod
     def images_are_similar(img1: Image.Image, img2: Image.Image, threshold: float = 0.98) -> bool:
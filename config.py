@@ -6,6 +6,9 @@
 import json
 import os
 import sys
+import stat
+import tempfile
+import threading
 
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
 
@@ -15,6 +18,7 @@ DEFAULT_CONFIG = {
     "model": "qwen3.5-plus",
     "source_lang": "英语",
     "target_lang": "中文",
+    "extra_target_langs": [],    # 附加目标语言（如 ["日语"]），与 target_lang 一起用一次请求同时翻译
     "capture_interval": 2.0,
     "mode": "vision",            # "vision" = 截图直接发给AI视觉模型
     "region": None,              # {"x": 0, "y": 0, "width": 100, "height": 100}
@@ -23,6 +27,34 @@ DEFAULT_CONFIG = {
     "overlay_position": None,    # {"x": 0, "y": 0}
     "hotkey": "ctrl+1",          # 全局截图翻译快捷键
     "save_screenshot": False,    # 是否保存截屏图片到本地
+    "endpoints": [],             # 备用端点 [{"api_base", "api_key", "model", "name"}]，用于对冲请求
+    "hedge_percentile": 0.95,    # 主端点首 token 延迟超过该分位即对冲到备用端点
+    "timeout_connect": 3.0,      # 建立连接时限（秒）
+    "timeout_first_token": 15.0, # 发出请求到收到首个内容的时限（秒）
+    "timeout_total": 45.0,       # 单次翻译（含重试）总时限（秒）
+    "max_retries": 2,            # 瞬时错误最大重试次数
+    "light_model": "",           # 文字较少的截图改用的小视觉模型（如 qwen-vl-plus），为空不路由
+    "output_format": "text",     # "text" 原文/译文对照文本；"jsonl" 每片段一行 JSON，边收边显示
+    "scroll_incremental": True,  # 检测页面滚动，只翻译新露出的部分并追加到悬浮窗
+    "backend": "",               # 主端点后端：""=按地址自动识别，"dashscope" / "openai"
+    # 翻译预设：[{"name", "hotkey", "region", "source_lang", "target_lang", "extra_target_langs", "model"}]，
+    # 缺省字段沿用主设置
+    "presets": [],
+    "profile_jobs": 0,           # >0 时剖析接下来 N 次翻译（也可用环境变量 TRANSLATER_PROFILE）
+    "profile_dir": "",           # 剖析报告目录，为空则为项目下 profiles/
+    "rate_limit_rpm": 0,         # 主端点每分钟请求数上限，0 = 按响应头自动校准
+    "rate_limit_tpm": 0,         # 主端点每分钟 token 上限，0 = 按响应头自动校准
+    "rate_limit_max_wait": 5.0,  # 限流时最多排队秒数，超过则放弃该端点（转给备用端点或报错）
+    "parallel_strips": 1,        # 文字很多的高区域沿行间空白切成至多 N 条并行翻译，1 = 不切
+    "history_max_entries": 1000, # 翻译历史最多保留条数（history.sqlite3），0 = 不记录
+    "history_hotkey": "ctrl+shift+1",  # 在悬浮窗中回看上一条翻译历史的全局快捷键
+    "speculative": False,        # 后台预翻译：默认预设区域的画面稳定后提前翻译，按热键时直接显示
+    "speculative_settle": 1.0,   # 画面保持不变多少秒后预翻译
+    "speculative_budget": 0.5,   # 预翻译消耗（估计输入 token）占总消耗的比例上限
+    "subtitle_preset": "",       # 字幕模式使用的预设（其区域应是字幕所在的窄条），为空则用默认预设
+    "subtitle_hotkey": "ctrl+shift+2",  # 开关字幕模式的全局快捷键
+    "subtitle_lines": 4,         # 字幕模式下悬浮窗保留的最近字幕行数
+    "service_url": "",           # 本地共享翻译服务地址（如 http://127.0.0.1:8765），为空则直接调用 API
 }
 
 # 支持的语言列表
@@ -32,11 +64,48 @@ LANGUAGES = [
 ]
 
 
+def atomic_write_json(path: str, data):
+    """
+    先写同目录临时文件再 os.replace，崩溃时不会留下写了一半的 JSON
+    mkstemp 建的临时文件权限是 0600：已有文件时沿用原文件的权限，新文件保持 0600
+    """
+    folder = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 class Config:
-    """配置管理器：加载/保存/更新配置"""
+    """
+    配置管理器：加载/保存/更新配置
+    - 只有值真正变化的键才会标记为脏，第一次变化起 save_delay 秒后由后台定时器合并写盘
+    - 写盘走临时文件 + os.replace，崩溃时不会留下半截的 config.json
+    - subscribe() 按键注册变更回调，只有关心的键变化时才会被通知
+    """
 
-    def __init__(self):
+    def __init__(self, path: str = CONFIG_FILE, save_delay: float = 1.0):
+        self._path = path
+        self._save_delay = save_delay
         self._data = dict(DEFAULT_CONFIG)
+        self._dirty = set()
+        self._listeners = []         # [(frozenset(keys) | None, callback)]
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()   # 串行化写盘，避免旧快照覆盖新快照
+        self._save_timer = None
         self.load()
 
     # ---- 属性快捷访问 ----
@@ -60,6 +129,15 @@ class Config:
     def target_lang(self):
         return self._data.get("target_lang", "中文")
 
+    @property
+    def extra_target_langs(self):
+        return list(self._data.get("extra_target_langs") or [])
+
+    @property
+    def target_langs(self):
+        """所有目标语言：target_lang 在前，去重"""
+        return list(dict.fromkeys([self.target_lang] + self.extra_target_langs))
+
     @property
     def capture_interval(self):
         return self._data.get("capture_interval", 2.0)
@@ -92,38 +170,206 @@ class Config:
     def save_screenshot(self):
         return self._data.get("save_screenshot", False)
 
+    @property
+    def endpoints(self):
+        return self._data.get("endpoints", []) or []
+
+    @property
+    def hedge_percentile(self):
+        return self._data.get("hedge_percentile", 0.95)
+
+    @property
+    def timeouts(self):
+        return {
+            "connect": self._data.get("timeout_connect", 3.0),
+            "first_token": self._data.get("timeout_first_token", 15.0),
+            "total": self._data.get("timeout_total", 45.0),
+        }
+
+    @property
+    def max_retries(self):
+        return self._data.get("max_retries", 2)
+
+    @property
+    def light_model(self):
+        return self._data.get("light_model", "")
+
+    @property
+    def output_format(self):
+        return self._data.get("output_format", "text")
+
+    @property
+    def scroll_incremental(self):
+        return self._data.get("scroll_incremental", True)
+
+    @property
+    def backend(self):
+        return self._data.get("backend", "")
+
+    @property
+    def presets(self):
+        return self._data.get("presets", [])
+
+    @property
+    def service_url(self):
+        return self._data.get("service_url", "")
+
+    @property
+    def profile_jobs(self):
+        return int(self._data.get("profile_jobs", 0) or 0)
+
+    @property
+    def profile_dir(self):
+        return self._data.get("profile_dir", "")
+
+    @property
+    def rate_limits(self):
+        return {
+            "rpm": float(self._data.get("rate_limit_rpm", 0) or 0),
+            "tpm": float(self._data.get("rate_limit_tpm", 0) or 0),
+            "max_wait": float(self._data.get("rate_limit_max_wait", 5.0)),
+        }
+
+    @property
+    def history_max_entries(self):
+        return int(self._data.get("history_max_entries", 1000) or 0)
+
+    @property
+    def history_hotkey(self):
+        return self._data.get("history_hotkey", "ctrl+shift+1")
+
+    @property
+    def speculative(self):
+        return bool(self._data.get("speculative", False))
+
+    @property
+    def speculative_settle(self):
+        return float(self._data.get("speculative_settle", 1.0))
+
+    @property
+    def speculative_budget(self):
+        return float(self._data.get("speculative_budget", 0.5))
+
+    @property
+    def subtitle_preset(self):
+        return self._data.get("subtitle_preset", "")
+
+    @property
+    def subtitle_hotkey(self):
+        return self._data.get("subtitle_hotkey", "ctrl+shift+2")
+
+    @property
+    def subtitle_lines(self):
+        return max(1, int(self._data.get("subtitle_lines", 4) or 4))
+
+    @property
+    def parallel_strips(self):
+        return int(self._data.get("parallel_strips", 1) or 1)
+
     # ---- 更新 ----
     def update(self, **kwargs):
-        """批量更新配置项"""
-        for k, v in kwargs.items():
-            if k in DEFAULT_CONFIG:
-                self._data[k] = v
+        """批量更新配置项（未知键忽略，值未变化的键不会触发通知）"""
+        self._apply({k: v for k, v in kwargs.items() if k in DEFAULT_CONFIG})
 
     def set(self, key, value):
         """设置单个配置项"""
-        self._data[key] = value
+        self._apply({key: value})
 
     def get(self, key, default=None):
         return self._data.get(key, default)
 
+    def _apply(self, changes: dict):
+        """写入变化的键 → 标脏 → 通知订阅者 → 安排延迟写盘"""
+        with self._lock:
+            changed = {k: v for k, v in changes.items() if self._data.get(k) != v}
+            if not changed:
+                return
+            self._data.update(changed)
+            self._dirty.update(changed)
+            listeners = list(self._listeners)
+        self._notify(changed, listeners)
+        self.schedule_save()
+
+    # ---- 变更通知 ----
+    def subscribe(self, keys, callback):
+        """
+        订阅配置变更
+        :param keys: 关心的键（可迭代对象）；None 表示所有键
+        :param callback: callback(changed: dict)，只包含该订阅关心且发生变化的键
+        """
+        entry = (frozenset(keys) if keys is not None else None, callback)
+        with self._lock:
+            self._listeners.append(entry)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._listeners = [e for e in self._listeners if e[1] is not callback]
+
+    @staticmethod
+    def _notify(changed: dict, listeners):
+        for keys, callback in listeners:
+            if keys is None:
+                relevant = changed
+            else:
+                relevant = {k: v for k, v in changed.items() if k in keys}
+            if not relevant:
+                continue
+            try:
+                callback(relevant)
+            except Exception as e:
+                print(f"[Config] 变更回调出错: {e}")
+
     # ---- 持久化 ----
+    @property
+    def dirty_keys(self):
+        with self._lock:
+            return set(self._dirty)
+
     def load(self):
         """从 config.json 加载"""
-        if os.path.exists(CONFIG_FILE):
+        if os.path.exists(self._path):
             try:
-                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                with open(self._path, "r", encoding="utf-8") as f:
                     saved = json.load(f)
                 self._data.update(saved)
             except Exception:
                 pass
 
+    def schedule_save(self):
+        """
+        延迟写盘：save_delay 内的多次修改合并为一次写入，不阻塞调用方
+        已有待执行的定时器时不再新建线程，修改由它一并写入（连续修改时最多晚 save_delay 秒落盘）
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self._save_delay, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
     def save(self):
-        """保存到 config.json"""
-        try:
-            with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"[Config] 保存失败: {e}")
+        """立即把脏数据原子写入 config.json（没有脏键时不写盘）"""
+        with self._write_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                snapshot = dict(self._data)
+                written = set(self._dirty)
+                self._dirty.clear()
+            try:
+                atomic_write_json(self._path, snapshot)
+            except Exception as e:
+                print(f"[Config] 保存失败: {e}")
+                with self._lock:
+                    self._dirty.update(written)  # 下次再试
+
+    def flush(self):
+        """退出前调用：取消定时器并同步写入所有未保存的修改"""
+        self.save()
 
     def to_dict(self):
         return dict(self._data)
@@ -0,0 +1,337 @@
+"""
+多端点对冲请求模块
+- Endpoint：一个 OpenAI 兼容端点（api_base + api_key + model）及其延迟统计
+- LatencyTracker：滑动窗口记录首 token 延迟 / 总耗时，提供分位数
+- HedgedExecutor：主端点在自适应延迟内没出首 token，就把同一请求发给备用端点，
+  先成功的结果胜出，其余请求立即取消
+"""
+
+import time
+import queue
+import threading
+from collections import deque
+
+from openai import OpenAI, Timeout
+
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, is_transient
+from backends import resolve_backend, default_capability_cache, ProbeError
+from ratelimit import get_governor
+
+
+# ====================================================================== #
+#  延迟统计
+# ====================================================================== #
+class LatencyTracker:
+    """按端点记录最近 N 次请求的首 token 延迟和总耗时"""
+
+    def __init__(self, window: int = 50):
+        self._first_token = deque(maxlen=window)
+        self._total = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+
+    def record_first_token(self, seconds: float):
+        with self._lock:
+            self._first_token.append(seconds)
+
+    def record_success(self, total_seconds: float):
+        with self._lock:
+            self._total.append(total_seconds)
+            self.successes += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def percentile(self, p: float, kind: str = "first_token"):
+        """返回 p 分位（0~1）的延迟秒数；样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._first_token if kind == "first_token" else self._total)
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, max(0, int(round(p * (len(samples) - 1)))))
+        return samples[idx]
+
+    def sample_count(self) -> int:
+        with self._lock:
+            return len(self._first_token)
+
+    def summary(self) -> str:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        fmt = lambda v: f"{v:.2f}s" if v is not None else "-"
+        return (f"首token p50={fmt(p50)} p95={fmt(p95)} "
+                f"成功={self.successes} 失败={self.failures}")
+
+
+# ====================================================================== #
+#  端点
+# ====================================================================== #
+class Endpoint:
+    """一个 OpenAI 兼容端点"""
+
+    def __init__(self, api_key: str, api_base: str, model: str, name: str = None,
+                 connect_timeout: float = 3.0, first_token_timeout: float = 15.0,
+                 backend: str = "", capability_cache=None, rpm: float = 0, tpm: float = 0):
+        self.api_key = api_key
+        self.api_base = api_base
+        self.model = model
+        self.name = name or f"{model}@{api_base}"
+        # 后端决定请求形式；能力按模型区分（路由到小模型时能力可能不同），
+        # 先取磁盘缓存，没有则用后端默认值，等 ensure_probed(model) 后台探测
+        self.backend = resolve_backend(api_base, backend)
+        self._capability_cache = capability_cache or default_capability_cache()
+        self._capabilities = {}         # {model: Capabilities}
+        self._probed = set()            # 本会话已探测（或有缓存）的模型
+        self._caps_lock = threading.Lock()
+        # 连接阶段用 connect 时限；读超时即"多久没收到任何字节"，覆盖首 token 等待
+        # 重试由 AITranslator 在重试预算内统一处理，关闭 SDK 自带的重试
+        self.client = OpenAI(
+            api_key=api_key, base_url=api_base, max_retries=0,
+            timeout=Timeout(first_token_timeout, connect=connect_timeout),
+        )
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.rpm = rpm
+        self.tpm = tpm
+
+    @classmethod
+    def from_config(cls, entry: dict, default_key: str, default_base: str, default_model: str,
+                    **timeouts):
+        """config.json 中 endpoints 的每一项，缺省字段沿用主端点配置"""
+        return cls(
+            api_key=entry.get("api_key") or default_key,
+            api_base=entry.get("api_base") or default_base,
+            model=entry.get("model") or default_model,
+            name=entry.get("name"),
+            backend=entry.get("backend", ""),
+            rpm=entry.get("rpm", 0),
+            tpm=entry.get("tpm", 0),
+            **timeouts,
+        )
+
+    def governor(self, model: str = None):
+        """该端点 + 模型的限流调度器（进程内共享）；配置的 RPM/TPM 只对端点默认模型生效"""
+        model = model or self.model
+        if model == self.model:
+            return get_governor(self.api_base, model, self.rpm, self.tpm)
+        return get_governor(self.api_base, model)
+
+    @property
+    def capabilities(self):
+        """端点默认模型的能力"""
+        return self.capabilities_for(self.model)
+
+    def capabilities_for(self, model: str = None):
+        """该端点上某个模型的能力：内存 → 磁盘缓存 → 后端默认值（探测完成前）"""
+        model = model or self.model
+        with self._caps_lock:
+            caps = self._capabilities.get(model)
+            if caps is None:
+                cached = self._capability_cache.get(self.api_base, model)
+                if cached is not None:
+                    self._probed.add(model)
+                caps = self._capabilities[model] = cached or self.backend.default_capabilities()
+            return caps
+
+    def ensure_probed(self, model: str = None):
+        """该模型没有缓存的能力时，在后台线程探测一次并写入磁盘缓存（每个模型每个会话最多一次）"""
+        model = model or self.model
+        self.capabilities_for(model)
+        with self._caps_lock:
+            if model in self._probed:
+                return
+            self._probed.add(model)
+        label = self.name if model == self.model else f"{self.name} [{model}]"
+
+        def run():
+            try:
+                caps = self.backend.probe(self.client, model)
+            except ProbeError as e:
+                print(f"[后端] {label} 能力探测失败，沿用默认能力: {e}")
+                return
+            with self._caps_lock:
+                self._capabilities[model] = caps
+            self._capability_cache.put(self.api_base, model, caps)
+            print(f"[后端] {label} ({self.backend.name}) 能力: {caps.to_dict()}")
+
+        threading.Thread(target=run, daemon=True, name=f"probe-{label}").start()
+
+    def __repr__(self):
+        return f"<Endpoint {self.name}>"
+
+
+# ====================================================================== #
+#  单次尝试（供请求函数上报首 token、注册取消动作）
+# ====================================================================== #
+class Attempt:
+    """一次对某端点的请求尝试"""
+
+    def __init__(self, endpoint: Endpoint, index: int):
+        self.endpoint = endpoint
+        self.index = index
+        self.started_at = time.monotonic()
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+        self._cancel_callbacks = []
+        self._lock = threading.Lock()
+
+    def mark_first_token(self):
+        if not self.first_token.is_set():
+            self.first_token.set()
+            self.endpoint.latency.record_first_token(time.monotonic() - self.started_at)
+
+    def on_cancel(self, callback):
+        """注册取消时要执行的动作（例如关闭流式响应）；已取消则立即执行"""
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled.is_set():
+                return
+            self.cancelled.set()
+            callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception:
+                pass
+
+
+class AttemptCancelled(Exception):
+    """对冲中落败、被主动取消的请求"""
+
+
+# ====================================================================== #
+#  对冲执行器
+# ====================================================================== #
+class HedgedExecutor:
+    """
+    在多个端点间对冲同一个请求
+    :param endpoints: 按优先级排列，第一个为主端点
+    :param hedge_percentile: 自适应对冲延迟取主端点首 token 延迟的该分位
+    :param default_delay: 样本不足时使用的对冲延迟
+    """
+
+    MIN_SAMPLES = 5
+
+    def __init__(self, endpoints, hedge_percentile: float = 0.95,
+                 default_delay: float = 2.0, min_delay: float = 0.3, max_delay: float = 8.0):
+        if not endpoints:
+            raise ValueError("至少需要一个端点")
+        self.endpoints = list(endpoints)
+        self.hedge_percentile = hedge_percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        """根据该端点最近的首 token 延迟分位数计算对冲等待时间"""
+        if endpoint.latency.sample_count() < self.MIN_SAMPLES:
+            return self.default_delay
+        p = endpoint.latency.percentile(self.hedge_percentile)
+        return min(self.max_delay, max(self.min_delay, p))
+
+    def _next_available(self, start: int) -> int:
+        """从 start 开始找第一个未熔断的端点下标；都熔断则返回 len(endpoints)"""
+        for i in range(start, len(self.endpoints)):
+            if self.endpoints[i].breaker.allow():
+                return i
+            print(f"[熔断] 跳过 {self.endpoints[i].name}"
+                  f"（{self.endpoints[i].breaker.retry_after():.0f}s 后重试）")
+        return len(self.endpoints)
+
+    def run(self, request_fn, deadline=None):
+        """
+        执行请求
+        :param request_fn: request_fn(attempt) -> result；流式读到首个内容时调用
+                           attempt.mark_first_token()，并用 attempt.on_cancel() 注册关闭动作
+        :param deadline: 可选的 resilience.Deadline，到期后取消所有尝试并抛出 DeadlineExceeded
+        :return: 最先成功的结果
+        """
+        results = queue.Queue()
+        attempts = []
+
+        def launch(i):
+            attempt = Attempt(self.endpoints[i], i)
+            attempts.append(attempt)
+
+            def target():
+                try:
+                    value = request_fn(attempt)
+                    results.put((attempt, value, None))
+                except BaseException as e:
+                    results.put((attempt, None, e))
+
+            threading.Thread(target=target, daemon=True,
+                             name=f"hedge-{attempt.endpoint.name}").start()
+            return attempt
+
+        first = self._next_available(0)
+        if first >= len(self.endpoints):
+            wait = min(e.breaker.retry_after() for e in self.endpoints)
+            raise CircuitOpenError(f"所有端点均已熔断，约 {wait:.0f}s 后重试")
+        next_idx = first + 1
+        pending = 1
+        current = launch(first)
+        last_error = None
+
+        try:
+            while pending:
+                # 当前最新的尝试还没出首 token 且还有备用端点 → 限时等待，超时就对冲
+                timeout = None
+                if next_idx < len(self.endpoints) and not current.first_token.is_set():
+                    elapsed = time.monotonic() - current.started_at
+                    timeout = max(0.0, self.hedge_delay(current.endpoint) - elapsed)
+                if deadline is not None:
+                    remaining = deadline.remaining()
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                try:
+                    attempt, value, error = results.get(timeout=timeout)
+                except queue.Empty:
+                    if deadline is not None and deadline.expired():
+                        raise DeadlineExceeded(f"超过总时限 {deadline.total:.0f}s") from None
+                    if not current.first_token.is_set():
+                        idx = self._next_available(next_idx)
+                        next_idx = idx + 1
+                        if idx < len(self.endpoints):
+                            print(f"[对冲] {current.endpoint.name} 超过 "
+                                  f"{self.hedge_delay(current.endpoint):.2f}s 无首 token，"
+                                  f"追加请求 → {self.endpoints[idx].name}")
+                            current = launch(idx)
+                            pending += 1
+                    continue
+
+                pending -= 1
+                elapsed = time.monotonic() - attempt.started_at
+                if error is None:
+                    attempt.endpoint.latency.record_success(elapsed)
+                    attempt.endpoint.breaker.record_success()
+                    print(f"[对冲] 胜出: {attempt.endpoint.name} ({elapsed:.2f}s)")
+                    return value
+
+                if not attempt.cancelled.is_set():
+                    attempt.endpoint.latency.record_failure()
+                    if is_transient(error):
+                        attempt.endpoint.breaker.record_failure()
+                    else:
+                        # 非瞬时错误（如 400/401）说明端点本身可达
+                        attempt.endpoint.breaker.record_success()
+                    print(f"[对冲] {attempt.endpoint.name} 失败: {error}")
+                last_error = error
+                # 失败立即转移到下一个端点，不必等对冲延迟
+                idx = self._next_available(next_idx)
+                next_idx = idx + 1
+                if idx < len(self.endpoints):
+                    current = launch(idx)
+                    pending += 1
+            raise last_error
+        finally:
+            for a in attempts:
+                a.cancel()
+                a.endpoint.breaker.release()
@@ -0,0 +1,189 @@
+"""
+翻译历史模块
+每次翻译的结果写入磁盘上的 SQLite 数据库，随时回看、搜索，不用重新截图付费
+- 每条记录：时间、预设、区域、语言对、译文、截图缩略图（JPEG，长边 320px）
+- 全文索引：FTS5 trigram 分词，中日文也能按任意子串搜索；不足 3 个字的关键词退回 LIKE
+- 条数有上限，写入时删除最旧的记录；内存中不保留列表，翻看和搜索每次只读需要的行，
+  长时间运行内存不增长
+- 单个连接 + 锁，翻译线程写入、主线程读取
+"""
+
+import io
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from PIL import Image
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.sqlite3")
+THUMB_EDGE = 320
+THUMB_QUALITY = 70
+SEARCH_LIMIT = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    preset TEXT NOT NULL DEFAULT '',
+    region TEXT NOT NULL DEFAULT '',
+    source_lang TEXT NOT NULL DEFAULT '',
+    target_lang TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    thumb BLOB
+);
+"""
+
+# 外部内容表 + 触发器：索引只存分词结果，正文仍在 entries 里
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    text, content='entries', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_COLUMNS = "id, ts, preset, region, source_lang, target_lang, text, thumb"
+
+
+class HistoryEntry:
+    """一条翻译历史"""
+
+    def __init__(self, id, ts, preset, region, source_lang, target_lang, text, thumb):
+        self.id = id
+        self.ts = ts
+        self.preset = preset
+        self.region = json.loads(region) if region else None
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.text = text
+        self.thumb = thumb             # JPEG bytes，可能为 None
+
+    @property
+    def time_text(self) -> str:
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.ts))
+
+    def __repr__(self):
+        return f"HistoryEntry({self.id}, {self.time_text}, {self.source_lang}→{self.target_lang})"
+
+
+def make_thumbnail(img: Image.Image, edge: int = THUMB_EDGE) -> bytes:
+    """长边缩到 edge 的 JPEG 缩略图"""
+    w, h = img.size
+    scale = min(1.0, edge / max(w, h))
+    thumb = img
+    if scale < 1.0:
+        # reducing_gap：先按整数倍盒式缩小再插值，不在全分辨率上做滤波
+        thumb = img.resize((max(1, round(w * scale)), max(1, round(h * scale))),
+                           Image.BILINEAR, reducing_gap=2.0)
+    if thumb.mode not in ("RGB", "L"):
+        thumb = thumb.convert("RGB")
+    buf = io.BytesIO()
+    thumb.save(buf, format="JPEG", quality=THUMB_QUALITY)
+    return buf.getvalue()
+
+
+class TranslationHistory:
+    """磁盘上的有界翻译历史"""
+
+    def __init__(self, path: str = HISTORY_FILE, max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite 编译时没有 FTS5 / trigram（< 3.34）：搜索退回 LIKE
+            print(f"[历史] 全文索引不可用，搜索改用逐行匹配: {e}")
+            self.fts = False
+        self._conn.commit()
+
+    # ---- 写入 ----
+    def add(self, text: str, img: Image.Image = None, region: dict = None,
+            source_lang: str = "", target_lang: str = "", preset: str = "") -> int:
+        """记录一次翻译；超过上限时删除最旧的记录。:return: 新记录的 id"""
+        thumb = make_thumbnail(img) if img is not None else None
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO entries (ts, preset, region, source_lang, target_lang, text, thumb) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), preset, json.dumps(region) if region else "",
+                 source_lang, target_lang, text, thumb),
+            )
+            entry_id = cur.lastrowid
+            if self.max_entries > 0:
+                self._conn.execute("DELETE FROM entries WHERE id <= ?", (entry_id - self.max_entries,))
+            self._conn.commit()
+        return entry_id
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    # ---- 读取 ----
+    def _one(self, sql: str, args=()):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM entries {sql} LIMIT 1", args).fetchone()
+        return HistoryEntry(*row) if row else None
+
+    def get(self, entry_id: int):
+        return self._one("WHERE id = ?", (entry_id,))
+
+    def latest(self):
+        return self._one("ORDER BY id DESC")
+
+    def previous(self, entry_id: int):
+        """比 entry_id 更早的一条；entry_id 为 None 时为最新一条"""
+        if entry_id is None:
+            return self.latest()
+        return self._one("WHERE id < ? ORDER BY id DESC", (entry_id,))
+
+    def next(self, entry_id: int):
+        return self._one("WHERE id > ? ORDER BY id ASC", (entry_id,))
+
+    def position(self, entry_id: int):
+        """:return: (第几条（从旧到新，1 起）, 总条数)"""
+        with self._lock:
+            index = self._conn.execute("SELECT count(*) FROM entries WHERE id <= ?", (entry_id,)).fetchone()[0]
+            total = self._conn.execute("SELECT count(*) FROM entries").fetchone()[0]
+        return index, total
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT):
+        """
+        全文搜索译文（含原文）；按时间从新到旧
+        :return: [HistoryEntry]（不含缩略图，需要时再用 get() 取）
+        """
+        query = query.strip()
+        if not query:
+            return []
+        columns = "e.id, e.ts, e.preset, e.region, e.source_lang, e.target_lang, e.text, NULL"
+        with self._lock:
+            if self.fts and len(query) >= 3:
+                # 整个关键词作为一个短语，引号转义
+                phrase = '"' + query.replace('"', '""') + '"'
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM entries_fts f JOIN entries e ON e.id = f.rowid "
+                    f"WHERE entries_fts MATCH ? ORDER BY e.id DESC LIMIT ?", (phrase, limit),
+                ).fetchall()
+            else:
+                pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM entries e WHERE e.text LIKE ? ESCAPE '\\' "
+                    f"ORDER BY e.id DESC LIMIT ?", (pattern, limit),
+                ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,111 @@
+"""
+截图文字分析模块（纯本地、向量化）
+- 行剖面：每一行像素中"笔画边缘"所占比例，文字行高、空白行低
+- 由行剖面估计文字行数、文字密度，供模型路由等功能使用
+- 沿行间空白把高而密的区域切成几条，供并行翻译
+"""
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TextFeatures:
+    """一帧截图的文字量特征"""
+
+    def __init__(self, lines: int, density: float, width: int, height: int):
+        self.lines = lines          # 估计的文字行数
+        self.density = density      # 边缘像素占比（0~1），越大文字越密
+        self.width = width
+        self.height = height
+
+    def __repr__(self):
+        return (f"TextFeatures(lines={self.lines}, density={self.density:.3f}, "
+                f"size={self.width}x{self.height})")
+
+
+def to_gray_array(img: Image.Image, max_height: int = 600):
+    """转灰度并按整数倍缩小到 max_height 以内，返回 (array, 缩小倍数)"""
+    gray = img if img.mode == "L" else img.convert("L")
+    factor = max(1, gray.height // max_height)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    return np.asarray(gray, dtype=np.int16), factor
+
+
+def edge_mask(gray, edge_threshold: int = 40):
+    """水平方向相邻像素差超过阈值视为笔画边缘"""
+    return np.abs(np.diff(gray, axis=1)) > edge_threshold
+
+
+def row_ink_profile(gray, edge_threshold: int = 40):
+    """每一行的边缘像素占比"""
+    mask = edge_mask(gray, edge_threshold)
+    return mask.mean(axis=1)
+
+
+def find_text_lines(profile, min_ink: float = 0.01, min_height: int = 2):
+    """
+    在行剖面中找连续的"有字"行段
+    :return: [(start_row, end_row)]，end 不含
+    """
+    ink = profile > min_ink
+    if not ink.any():
+        return []
+    # 找 False→True / True→False 的跳变位置
+    padded = np.concatenate(([False], ink, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, ends = edges[0::2], edges[1::2]
+    return [(int(s), int(e)) for s, e in zip(starts, ends) if e - s >= min_height]
+
+
+def estimate_text_features(img: Image.Image) -> TextFeatures:
+    """估计一帧截图的文字行数和密度；没有 numpy 时返回 None"""
+    if np is None:
+        return None
+    gray, _ = to_gray_array(img)
+    if gray.shape[0] < 2 or gray.shape[1] < 2:
+        return TextFeatures(0, 0.0, img.width, img.height)
+    profile = row_ink_profile(gray)
+    lines = find_text_lines(profile)
+    return TextFeatures(
+        lines=len(lines),
+        density=float(profile.mean()),
+        width=img.width,
+        height=img.height,
+    )
+
+
+def split_text_strips(img: Image.Image, parts: int, min_lines_per_strip: int = 4):
+    """
+    沿文字行之间的空白把图片横向切成至多 parts 条，各条文字行数尽量均衡
+    切线取相邻两行间空白的中点，不会切到文字
+    :return: [(top, bottom)]（原图像素坐标，bottom 不含）；不值得切分时只返回整图一条
+    """
+    whole = [(0, img.height)]
+    if np is None or parts < 2:
+        return whole
+    gray, factor = to_gray_array(img)
+    if gray.shape[0] < 2 or gray.shape[1] < 2:
+        return whole
+    lines = find_text_lines(row_ink_profile(gray))
+    parts = min(parts, len(lines) // max(1, min_lines_per_strip))
+    if parts < 2:
+        return whole
+
+    # 第 i 个候选切线在第 i 行与第 i+1 行之间，上方有 i+1 行
+    gaps = [(lines[i][1] + lines[i + 1][0]) // 2 for i in range(len(lines) - 1)]
+    cuts = []
+    above = 0
+    for k in range(1, parts):
+        target = k * len(lines) / parts
+        best = min(range(above, len(gaps)), key=lambda i: abs(i + 1 - target), default=None)
+        if best is None:
+            break
+        cuts.append(gaps[best] * factor)
+        above = best + 1
+    bounds = [0] + cuts + [img.height]
+    return [(top, bottom) for top, bottom in zip(bounds, bounds[1:]) if bottom > top]
@@ -18,9 +18,13 @@ from PyQt5.QtGui import QFont, QKeySequence
 
 from config import Config, LANGUAGES
 from capture import ScreenCapture
-from translator import AITranslator
 from region_selector import RegionSelector
 from overlay_window import OverlayWindow
+from presets import PresetRegistry, Preset, DEFAULT_PRESET, PRESET_KEYS
+from history import TranslationHistory
+from speculative import Speculator
+from subtitle import SubtitleWorker
+from profiling import profiler, profiled
 
 
 # ====================================================================== #
@@ -28,15 +32,31 @@ from overlay_window import OverlayWindow
 # ====================================================================== #
 class TranslationWorker(QThread):
     """后台线程：压缩图片 → Qwen 视觉翻译 → 返回中英对照"""
-    translation_ready = pyqtSignal(str)    # 翻译结果
+    translation_ready = pyqtSignal(str, str)         # 目标语言, 翻译结果
+    segments_update = pyqtSignal(str, object)        # 目标语言, 流式解析出的 [(原文, 译文)]
+    scroll_appended = pyqtSignal(str, str, float)    # 滚动增量：目标语言, 新条带译文, 上移比例
     error_occurred = pyqtSignal(str)
     status_update = pyqtSignal(str)
-
-    def __init__(self, config: Config, img, parent=None):
+    history_saved = pyqtSignal(int)                  # 本次翻译写入的最后一条历史记录 id
+
+    def __init__(self, config: Config, img, preset: Preset, translator, results=None,
+                 history: TranslationHistory = None, speculator: Speculator = None, parent=None):
+        """
+        :param results: 按语言缓存整帧翻译结果的 ResultCache（PresetRegistry.results），为 None 不缓存
+        :param history: 新翻译的结果写入翻译历史，为 None 不记录
+        :param speculator: 后台预翻译；用于统计命中和预算，为 None 表示未开启
+        """
         super().__init__(parent)
         self.config = config
         self._img = img
-
+        self._preset = preset
+        self._translator = translator
+        self._results = results
+        self._history = history
+        self._speculator = speculator
+        self._keys = {}              # {目标语言: 结果缓存 key}
+
+    @profiled("worker", job=True)
     def run(self):
         try:
             img = self._img
@@ -52,20 +72,47 @@ class TranslationWorker(QThread):
                 img.save(save_path)
                 print(f"[截图] 已保存: {save_path}")
 
-            # 发送给 AI 视觉模型翻译
-            self.status_update.emit("🤖 AI 视觉翻译中…")
-            translator = AITranslator(
-                api_key=self.config.api_key,
-                api_base=self.config.api_base,
-                model=self.config.model,
-            )
-            result = translator.translate_image(
-                img,
-                self.config.source_lang,
-                self.config.target_lang,
-            )
-
-            self.translation_ready.emit(result)
+            # 预翻译命中：画面与后台预翻译的帧逐像素相同，结果已在缓存中
+            preset = self._preset
+            results, missing = self._cached_results(img)
+            if self._speculator is not None \
+                    and self._speculator.note_press(preset.name, self._keys.values()) and not missing:
+                for lang in preset.target_langs:
+                    self.translation_ready.emit(lang, results[lang])
+                self._record(img, results)     # 预翻译的结果在这里才算用上，写入历史
+                preset.scroll_tracker.commit(img, preset.region_key)
+                self.status_update.emit("⚡ 预翻译命中")
+                return
+
+            # 滚动检测：与上一帧相同则不发请求；向下滚动则只翻译新露出的条带
+            plan = None
+            if preset.scroll_incremental:
+                plan = preset.scroll_tracker.plan(img, preset.region_key)
+                if plan.kind == "same":
+                    self.status_update.emit("✅ 内容未变化，沿用上次翻译")
+                    return
+
+            # 发送给 AI 视觉模型翻译（多个目标语言时一次请求全部翻译）
+            if plan is not None and plan.kind == "strip":
+                self.status_update.emit("🤖 AI 视觉翻译中…")
+                self._spend(plan.image)
+                results = self._translate(plan.image, preset.target_langs)
+                for lang, result in results.items():
+                    self.scroll_appended.emit(lang, result, plan.shift / img.height)
+                self._record(plan.image, results)
+            else:
+                if missing:
+                    self.status_update.emit("🤖 AI 视觉翻译中…")
+                    self._spend(img)
+                    fresh = self._translate(img, missing, self._emit_segments)
+                    results.update(fresh)
+                    if self._results is not None:
+                        for lang in missing:
+                            self._results.put(self._keys[lang], fresh[lang])
+                    self._record(img, fresh)
+                for lang in preset.target_langs:
+                    self.translation_ready.emit(lang, results[lang])
+            preset.scroll_tracker.commit(img, preset.region_key)
             self.status_update.emit("✅ 翻译完成")
 
         except Exception as e:
@@ -76,11 +123,67 @@ class TranslationWorker(QThread):
             self.error_occurred.emit(f"翻译出错: {err_msg}")
             self.status_update.emit("❌ 出错")
 
+    def _spend(self, img):
+        """按热键实际发出的请求计入预翻译的预算基数"""
+        if self._speculator is not None:
+            self._speculator.record_user_request(img)
+
+    def _record(self, img, results: dict):
+        """新翻译的结果写入历史（缩略图在本线程生成）；写入失败不影响翻译"""
+        if self._history is None:
+            return
+        preset = self._preset
+        try:
+            entry_id = None
+            for lang, text in results.items():
+                entry_id = self._history.add(text, img, preset.region, preset.source_lang, lang,
+                                             preset.name)
+            if entry_id is not None:
+                self.history_saved.emit(entry_id)
+        except Exception as e:
+            print(f"[历史] 写入失败: {e}")
+
+    def _cached_results(self, img):
+        """:return: ({目标语言: 缓存的译文}, [缓存中没有的目标语言])"""
+        targets = self._preset.target_langs
+        if self._results is None:
+            return {}, list(targets)
+        self._keys = self._preset.result_keys(img)
+        results = {}
+        for lang in targets:
+            text = self._results.get(self._keys[lang])
+            if text is not None:
+                results[lang] = text
+        missing = [lang for lang in targets if lang not in results]
+        if results:
+            print(f"[缓存] 命中: {'、'.join(results)}，需翻译: {'、'.join(missing) or '无'}")
+        return results, missing
+
+    def _translate(self, img, targets, on_segments=None) -> dict:
+        """:return: {目标语言: 结果}；一个目标语言走原来的单语言请求"""
+        preset = self._preset
+        if len(targets) == 1:
+            lang = targets[0]
+            callback = (lambda pairs: on_segments({lang: pairs})) if on_segments else None
+            return {lang: self._translator.translate_image(
+                img, preset.source_lang, lang, on_segments=callback)}
+        return self._translator.translate_image_multi(
+            img, preset.source_lang, targets, on_segments=on_segments)
+
+    def _emit_segments(self, by_lang: dict):
+        for lang, pairs in by_lang.items():
+            self.segments_update.emit(lang, pairs)
+
 
 # ====================================================================== #
 #  主窗口
 # ====================================================================== #
+HISTORY_ACTION = "__history_back__"   # 历史回看热键在热键表中的名称（不会与预设名冲突）
+SUBTITLE_ACTION = "__subtitle_toggle__"  # 字幕模式开关热键的名称
+
+
 class MainWindow(QMainWindow):
+    hotkey_pressed = pyqtSignal(str)   # 预设名；keyboard 线程发出，排队到主线程处理
 
     def __init__(self):
         super().__init__()
@@ -88,39 +191,92 @@ class MainWindow(QMainWindow):
         self._worker = None
         self._overlay = None
         self._selector = None
+        self._capture = None         # 常驻截图对象（主线程创建和使用）
+        self._presets = PresetRegistry(self.config)
+        profiler.configure(self.config.profile_jobs, self.config.profile_dir)
+        self._hotkey_handles = {}    # {热键: (预设名, keyboard 句柄)}
+        self._pending_preset = None  # 等待截图的预设（隐藏窗口后的 100ms 内）
+        self._restore_overlay = False  # 框选前悬浮窗是可见的，框选结束后要重新显示
+        self._streamed = set()       # 本次翻译中已流式显示过结构化片段的目标语言
         self._is_translating = False
+        self._history = self._open_history()
+        self._history_cursor = None  # 悬浮窗当前显示的历史记录 id（最新翻译写入后即指向它）
+        self._speculator = self._start_speculator()
+        self._subtitle_worker = None  # 字幕模式的采样线程（开启期间常驻）
+
+        # 提前建好翻译器：没有缓存的端点能力在后台探测，第一次按热键时通常已就绪
+        # API 设置逐字输入时会连续变化，停顿 1 秒后再重建
+        from PyQt5.QtCore import QTimer
+        self._warm_timer = QTimer(self)
+        self._warm_timer.setSingleShot(True)
+        self._warm_timer.setInterval(1000)
+        self._warm_timer.timeout.connect(self._presets.warm)
+        # 预翻译开启时定期把本程序可见窗口的位置告诉采样线程，被挡住的区域不采样
+        self._obstruction_timer = QTimer(self)
+        self._obstruction_timer.setInterval(250)
+        self._obstruction_timer.timeout.connect(self._update_speculator_obstructions)
+        self._sync_obstruction_timer()
 
         self.setWindowTitle("🌐 屏幕翻译")
         self.setMinimumWidth(520)
         self.adjustSize()
         self._init_ui()
         self._load_config_to_ui()
+        self._bind_ui_to_config()
+        self._subscribe_config()
         self._setup_shortcuts()
+        self._presets.warm()
 
     # ------------------------------------------------------------------ #
     #  快捷键
     # ------------------------------------------------------------------ #
     def _setup_shortcuts(self):
-        # 从配置读取快捷键并注册
-        self._register_hotkey(self.config.hotkey)
-
-    def _register_hotkey(self, hotkey: str):
-        """注册/重新注册全局热键"""
-        try:
-            keyboard.unhook_all()
-            keyboard.add_hotkey(hotkey, self._on_hotkey_triggered)
-            print(f"[热键] 已注册全局快捷键: {hotkey}")
-        except Exception as e:
-            print(f"[热键] 注册失败: {e}")
-            # fallback 到 ctrl+1
-            keyboard.add_hotkey('ctrl+1', self._on_hotkey_triggered)
-            print("[热键] 已回退到 ctrl+1")
-
-    def _on_hotkey_triggered(self):
-        """全局热键回调（在 keyboard 线程中），通过信号切回主线程"""
-        # keyboard 回调在后台线程，必须通过信号回到 Qt 主线程
-        from PyQt5.QtCore import QMetaObject, Qt, Q_ARG
-        QMetaObject.invokeMethod(self, "_on_translate", Qt.QueuedConnection)
+        # keyboard 回调在后台线程，通过信号排队回到 Qt 主线程
+        self.hotkey_pressed.connect(self._on_hotkey)
+        self._sync_hotkeys()
+
+    def _on_hotkey(self, name: str):
+        if name == HISTORY_ACTION:
+            self._history_step(-1)
+        elif name == SUBTITLE_ACTION:
+            self._toggle_subtitles()
+        else:
+            self._on_preset_hotkey(name)
+
+    def _sync_hotkeys(self):
+        """
+        按预设同步全局热键：只注销/注册有变化的热键，不用 unhook_all 全部重来
+        回调只携带预设名，预设重新解析后无需重新注册
+        """
+        wanted = self._presets.hotkeys()
+        history_hotkey = self.config.history_hotkey
+        if history_hotkey and self._history is not None and history_hotkey not in wanted:
+            wanted[history_hotkey] = HISTORY_ACTION
+        subtitle_hotkey = self.config.subtitle_hotkey
+        if subtitle_hotkey and subtitle_hotkey not in wanted:
+            wanted[subtitle_hotkey] = SUBTITLE_ACTION
+        for hotkey, (name, handle) in list(self._hotkey_handles.items()):
+            if wanted.get(hotkey) != name:
+                try:
+                    keyboard.remove_hotkey(handle)
+                except (KeyError, ValueError):
+                    pass
+                del self._hotkey_handles[hotkey]
+        for hotkey, name in wanted.items():
+            if hotkey in self._hotkey_handles:
+                continue
+            try:
+                handle = keyboard.add_hotkey(hotkey, self.hotkey_pressed.emit, args=(name,))
+            except Exception as e:
+                print(f"[热键] 注册失败 {hotkey} ({name}): {e}")
+                if name != DEFAULT_PRESET or "ctrl+1" in self._hotkey_handles:
+                    continue
+                # 默认预设 fallback 到 ctrl+1
+                hotkey = "ctrl+1"
+                handle = keyboard.add_hotkey(hotkey, self.hotkey_pressed.emit, args=(name,))
+                print("[热键] 已回退到 ctrl+1")
+            self._hotkey_handles[hotkey] = (name, handle)
+            print(f"[热键] 已注册全局快捷键: {hotkey} → {name}")
 
     # ------------------------------------------------------------------ #
     #  UI
@@ -300,59 +456,187 @@ class MainWindow(QMainWindow):
             self._region_label.setText(f"({r['x']}, {r['y']}) {r['width']}x{r['height']}")
             self._region_label.setStyleSheet("color: #a6e3a1; font-size: 12px;")
 
-    def _save_ui_to_config(self):
-        new_hotkey = self._hotkey_input.text().strip() or "ctrl+1"
-        old_hotkey = self.config.hotkey
-
-        self.config.update(
-            api_base=self._api_base_input.text().strip(),
-            api_key=self._api_key_input.text().strip(),
-            model=self._model_input.text().strip() or "qwen3.5-plus",
-            source_lang=self._source_lang_combo.currentText(),
-            target_lang=self._target_lang_combo.currentText(),
-            overlay_font_size=self._font_size_spin.value(),
-            overlay_opacity=self._opacity_slider.value() / 100.0,
-            hotkey=new_hotkey,
-            save_screenshot=self._save_screenshot_cb.isChecked(),
+    def _bind_ui_to_config(self):
+        """控件变化即时写入 Config（只标脏、延迟写盘），截图热路径不再读取控件"""
+        cfg = self.config
+        self._api_base_input.textEdited.connect(
+            lambda t: cfg.set("api_base", t.strip()))
+        self._api_key_input.textEdited.connect(
+            lambda t: cfg.set("api_key", t.strip()))
+        self._model_input.textEdited.connect(
+            lambda t: cfg.set("model", t.strip() or "qwen3.5-plus"))
+        self._source_lang_combo.currentTextChanged.connect(
+            lambda t: cfg.set("source_lang", t))
+        self._target_lang_combo.currentTextChanged.connect(
+            lambda t: cfg.set("target_lang", t))
+        self._font_size_spin.valueChanged.connect(
+            lambda v: cfg.set("overlay_font_size", v))
+        self._opacity_slider.valueChanged.connect(
+            lambda v: cfg.set("overlay_opacity", v / 100.0))
+        # 快捷键输完（回车/失焦）再生效，避免输入过程中注册半截热键
+        self._hotkey_input.editingFinished.connect(
+            lambda: cfg.set("hotkey", self._hotkey_input.text().strip() or "ctrl+1"))
+        self._save_screenshot_cb.toggled.connect(
+            lambda checked: cfg.set("save_screenshot", checked))
+
+    def _subscribe_config(self):
+        """按键订阅配置变更：各消费者只在自己的配置变化时重建"""
+        self.config.subscribe(
+            ("api_key", "api_base", "endpoints", "hedge_percentile",
+             "timeout_connect", "timeout_first_token", "timeout_total", "max_retries",
+             "light_model", "output_format", "backend", "service_url",
+             "rate_limit_rpm", "rate_limit_tpm", "rate_limit_max_wait", "parallel_strips"),
+            self._on_api_config_changed,
+        )
+        # 预设重新解析；语言、区域或输出设置变了的预设换新的滚动跟踪器
+        self.config.subscribe(PRESET_KEYS, self._on_preset_config_changed)
+        self.config.subscribe(("overlay_opacity", "overlay_font_size"), self._on_overlay_config_changed)
+        self.config.subscribe(("history_max_entries", "history_hotkey"), self._on_history_config_changed)
+        self.config.subscribe(("speculative", "speculative_settle", "speculative_budget"),
+                              self._on_speculative_config_changed)
+        self.config.subscribe(("subtitle_preset", "subtitle_hotkey"), self._on_subtitle_config_changed)
+
+    def _on_api_config_changed(self, changed: dict):
+        self._presets.invalidate_translators()
+        self._warm_timer.start()
+
+    def _on_preset_config_changed(self, changed: dict):
+        self._presets.rebuild()
+        if "hotkey" in changed or "presets" in changed:
+            self._sync_hotkeys()
+        if "model" in changed or "presets" in changed:
+            self._warm_timer.start()
+
+    def _on_history_config_changed(self, changed: dict):
+        if "history_max_entries" in changed:
+            if self._history is not None and self.config.history_max_entries <= 0:
+                self._history.close()
+                self._history = None
+                self._history_cursor = None
+            elif self._history is None:
+                self._history = self._open_history()
+            else:
+                self._history.max_entries = self.config.history_max_entries
+        self._sync_hotkeys()
+
+    def _start_speculator(self):
+        """开启了预翻译时启动后台采样线程"""
+        if not self.config.speculative:
+            return None
+        speculator = Speculator(self._presets, self.config.speculative_settle,
+                                self.config.speculative_budget)
+        speculator.start()
+        return speculator
+
+    def _on_speculative_config_changed(self, changed: dict):
+        # 设置变了就换一个新的（统计和预算从头算）
+        if self._speculator is not None:
+            self._speculator.stop()
+        self._speculator = self._start_speculator()
+        self._sync_obstruction_timer()
+
+    def _sync_obstruction_timer(self):
+        if self._speculator is None:
+            self._obstruction_timer.stop()
+        else:
+            self._update_speculator_obstructions()
+            self._obstruction_timer.start()
+
+    def _update_speculator_obstructions(self):
+        """主窗口和悬浮窗可见时的外框（物理像素），采样线程据此跳过被挡住的区域"""
+        if self._speculator is None:
+            return
+        windows = (self, self._overlay)
+        self._speculator.set_obstructions(
+            RegionSelector.to_physical(w.frameGeometry())[:4]
+            for w in windows if w is not None and w.isVisible()
         )
-        self.config.save()
 
-        # 如果快捷键变了，重新注册全局热键
-        if new_hotkey != old_hotkey:
-            self._register_hotkey(new_hotkey)
+    def _on_subtitle_config_changed(self, changed: dict):
+        if "subtitle_hotkey" in changed:
+            self._sync_hotkeys()
+        if "subtitle_preset" in changed and self._subtitle_worker is not None:
+            # 换了预设（区域 / 语言）：按新预设重新开始
+            self._stop_subtitles()
+            self._toggle_subtitles()
+
+    def _on_overlay_config_changed(self, changed: dict):
+        if self._overlay:
+            self._overlay.update_style(
+                opacity=changed.get("overlay_opacity"),
+                font_size=changed.get("overlay_font_size"),
+            )
 
     # ------------------------------------------------------------------ #
     #  区域选择
     # ------------------------------------------------------------------ #
     def _on_select_region(self):
-        self._selector = RegionSelector()
+        if self._selector is not None and self._selector.isVisible():
+            return
+        # 先隐藏主窗口和悬浮窗，冻结画面里不要有它们
+        self.hide()
+        self._restore_overlay = bool(self._overlay and self._overlay.isVisible())
+        if self._restore_overlay:
+            self._overlay.hide()
+        from PyQt5.QtCore import QTimer
+        QTimer.singleShot(100, self._open_selector)
+
+    def _open_selector(self):
+        if self._capture is None:
+            try:
+                self._capture = ScreenCapture()
+            except ImportError as e:
+                print(f"[区域] {e}")
+        self._selector = RegionSelector(self._capture)
         self._selector.region_selected.connect(self._on_region_selected)
-        self._selector.showFullScreen()
+        self._selector.closed.connect(self._on_selector_closed)
+        self._selector.show()
+        self._selector.activateWindow()
+
+    def _on_selector_closed(self):
+        """框选结束（包括按 Esc 取消、选区后没有开始翻译）：恢复主窗口和原来可见的悬浮窗"""
+        self.show()
+        if self._restore_overlay and self._overlay is not None:
+            self._overlay.show()
+        self._restore_overlay = False
 
-    def _on_region_selected(self, x, y, w, h):
+    def _on_region_selected(self, x, y, w, h, frame=None):
         self.config.set("region", {"x": x, "y": y, "width": w, "height": h})
-        self.config.save()
         self._region_label.setText(f"({x}, {y}) {w}x{h}")
         self._region_label.setStyleSheet("color: #a6e3a1; font-size: 12px;")
         self._status_bar_label.setText(f"✅ 已选择区域: ({x}, {y}) {w}x{h}  — 按 Ctrl+1 截图翻译")
 
+        # 选择器已经截好了选区的画面，直接用默认预设翻译，不再截第二次
+        if frame is None or self._is_translating or not (self.config.api_key or self.config.service_url):
+            return
+        preset = self._presets.get(DEFAULT_PRESET)
+        self._pending_preset = preset
+        self._is_translating = True
+        self._translate_btn.setEnabled(False)
+        self._translate_btn.setText("⏳ 翻译中…")
+        self._start_worker(preset, frame)
+
     # ------------------------------------------------------------------ #
     #  截图翻译（按键 / 按钮触发）
     # ------------------------------------------------------------------ #
-    from PyQt5.QtCore import pyqtSlot
-    @pyqtSlot()
     def _on_translate(self):
+        """按钮触发：使用默认预设"""
+        self._on_preset_hotkey(DEFAULT_PRESET)
+
+    def _on_preset_hotkey(self, name: str):
         if self._is_translating:
             return  # 防止重复触发
 
-        self._save_ui_to_config()
-
-        if not self.config.api_key:
-            QMessageBox.warning(self, "提示", "请输入 API 密钥！")
+        preset = self._presets.get(name)
+        if preset is None:
+            return
+        if not (self.config.api_key or self.config.service_url):
+            QMessageBox.warning(self, "提示", "请输入 API 密钥（或配置共享服务地址）！")
             return
-        if not self.config.region:
+        if preset.capture_rect is None:
             QMessageBox.warning(self, "提示", "请先选择屏幕区域！")
             return
+        self._pending_preset = preset
 
         self._is_translating = True
         self._translate_btn.setEnabled(False)
@@ -369,40 +653,100 @@ class MainWindow(QMainWindow):
 
     def _do_translate(self):
         """实际执行截图翻译（窗口已隐藏后调用）"""
-        # 1. 在窗口隐藏状态下先截图
-        region = self.config.region
-        capture = ScreenCapture()
-        img = capture.capture_region(
-            region["x"], region["y"],
-            region["width"], region["height"],
-        )
-        capture.close()
+        # 1. 在窗口隐藏状态下按预设的区域截图
+        preset = self._pending_preset
+        if self._capture is None:
+            self._capture = ScreenCapture()
+        try:
+            img = self._capture.capture_region(*preset.capture_rect)
+        except ValueError as e:
+            # 区域所在的屏幕已断开等：恢复窗口和按钮，提示重新框选
+            self.show()
+            self._on_worker_finished()
+            self._on_error(f"{e}，请重新选择区域")
+            return
 
         # 2. 截图完成，恢复主窗口
         self.show()
+        self._start_worker(preset, img)
 
-        # 确保悬浮窗
-        if self._overlay is None:
-            self._overlay = OverlayWindow(
-                opacity=self.config.overlay_opacity,
-                font_size=self.config.overlay_font_size,
-            )
-        else:
-            self._overlay.update_style(
-                opacity=self.config.overlay_opacity,
-                font_size=self.config.overlay_font_size,
-            )
+    def _start_worker(self, preset, img):
+        """用已截好的图片启动翻译线程"""
+        # 确保悬浮窗（样式变化由配置订阅推送，这里不再每次重设）
+        self._ensure_overlay()
         self._overlay.show()
-        self._overlay.set_status("🤖 截图翻译中…")
-
-        # 工作线程（单次任务，传入已截好的图片）
-        self._worker = TranslationWorker(self.config, img)
+        self._overlay.set_status(f"🤖 截图翻译中…（{preset.name}）")
+
+        # 工作线程（单次任务，传入已截好的图片和已解析的预设）
+        self._overlay.set_languages(preset.target_langs)
+        self._worker = TranslationWorker(self.config, img, preset,
+                                         self._presets.translator_for(preset),
+                                         self._presets.results, self._history, self._speculator)
+        self._streamed = set()
         self._worker.translation_ready.connect(self._on_translation)
+        self._worker.segments_update.connect(self._on_segments)
+        self._worker.scroll_appended.connect(self._on_scroll_appended)
         self._worker.error_occurred.connect(self._on_error)
         self._worker.status_update.connect(self._on_status)
+        self._worker.history_saved.connect(self._on_history_saved)
         self._worker.finished.connect(self._on_worker_finished)
         self._worker.start()
 
+    def _ensure_overlay(self) -> OverlayWindow:
+        if self._overlay is None:
+            self._overlay = OverlayWindow(
+                opacity=self.config.overlay_opacity,
+                font_size=self.config.overlay_font_size,
+            )
+            self._overlay.history_step.connect(self._history_step)
+            self._overlay.history_search.connect(self._on_history_search)
+            self._overlay.history_open.connect(self._on_history_open)
+        return self._overlay
+
+    # ------------------------------------------------------------------ #
+    #  字幕模式
+    # ------------------------------------------------------------------ #
+    def _toggle_subtitles(self):
+        """开关字幕模式：高频采样字幕区域，新字幕稳定后翻译，悬浮窗滚动显示"""
+        if self._subtitle_worker is not None:
+            self._stop_subtitles()
+            self._on_status("⏹ 字幕模式已关闭")
+            return
+        name = self.config.subtitle_preset or DEFAULT_PRESET
+        preset = self._presets.get(name)
+        if preset is None or preset.capture_rect is None:
+            self._on_error(f"字幕模式：预设 {name} 不存在或没有区域")
+            return
+        if not (self.config.api_key or self.config.service_url):
+            self._on_error("字幕模式：请先填写 API 密钥")
+            return
+        overlay = self._ensure_overlay()
+        overlay.set_languages(preset.target_langs)
+        overlay.clear_subtitles()
+        overlay.show()
+        worker = SubtitleWorker(preset, self._presets.translator_for(preset))
+        worker.line_ready.connect(self._on_subtitle_line)
+        worker.status_update.connect(self._on_status)
+        worker.error_occurred.connect(self._on_error)
+        worker.finished.connect(self._on_subtitles_finished)
+        self._subtitle_worker = worker
+        worker.start()
+
+    def _stop_subtitles(self):
+        worker, self._subtitle_worker = self._subtitle_worker, None
+        if worker is not None:
+            worker.stop()
+            worker.wait(2000)
+
+    def _on_subtitles_finished(self):
+        # 线程自己退出（区域不可用等）时清掉引用，下次热键重新开启
+        if self._subtitle_worker is not None and self._subtitle_worker.isFinished():
+            self._subtitle_worker = None
+
+    def _on_subtitle_line(self, lang: str, translated: str):
+        if self._overlay:
+            self._overlay.append_subtitle(translated, lang, self.config.subtitle_lines)
+
     def _on_worker_finished(self):
         """工作线程完成后恢复按钮"""
         self._is_translating = False
@@ -412,11 +756,24 @@ class MainWindow(QMainWindow):
     # ------------------------------------------------------------------ #
     #  信号
     # ------------------------------------------------------------------ #
-    def _on_translation(self, translated: str):
+    def _on_translation(self, lang: str, translated: str):
+        if self._overlay:
+            # 流式显示过的语言已是最终片段；命中缓存等没有流式过的语言要在这里显示
+            if lang not in self._streamed:
+                self._overlay.set_translation(translated, lang)
+            self._overlay.show()
+
+    def _on_scroll_appended(self, lang: str, translated: str, shift_fraction: float):
         if self._overlay:
-            self._overlay.set_translation(translated)
+            self._overlay.append_translation(translated, shift_fraction, lang)
             self._overlay.show()
 
+    def _on_segments(self, lang: str, pairs):
+        """jsonl / 多目标模式：每闭合一个片段立即显示"""
+        self._streamed.add(lang)
+        if self._overlay:
+            self._overlay.show_pairs(pairs, lang)
+
     def _on_error(self, msg: str):
         self._status_bar_label.setText(f"❌ {msg}")
         if self._overlay:
@@ -427,11 +784,66 @@ class MainWindow(QMainWindow):
         if self._overlay:
             self._overlay.set_status(status)
 
+    # ------------------------------------------------------------------ #
+    #  翻译历史
+    # ------------------------------------------------------------------ #
+    def _open_history(self):
+        if self.config.history_max_entries <= 0:
+            return None
+        try:
+            return TranslationHistory(max_entries=self.config.history_max_entries)
+        except Exception as e:
+            print(f"[历史] 无法打开翻译历史: {e}")
+            return None
+
+    def _on_history_saved(self, entry_id: int):
+        self._history_cursor = entry_id
+
+    def _history_step(self, step: int):
+        """step=-1 上一条（更早），+1 下一条"""
+        if self._history is None:
+            return
+        if step < 0:
+            entry = self._history.previous(self._history_cursor)
+        elif self._history_cursor is not None:
+            entry = self._history.next(self._history_cursor)
+        else:
+            entry = None
+        overlay = self._ensure_overlay()
+        overlay.show()
+        if entry is None:
+            overlay.set_status("🕘 已是最早一条" if step < 0 else "🕘 已是最新一条")
+            return
+        self._show_history_entry(entry)
+
+    def _on_history_search(self, query: str):
+        if self._history is None:
+            return
+        self._ensure_overlay().show_search_results(query, self._history.search(query))
+
+    def _on_history_open(self, entry_id: int):
+        if self._history is None:
+            return
+        entry = self._history.get(entry_id)
+        if entry is not None:
+            self._show_history_entry(entry)
+
+    def _show_history_entry(self, entry):
+        self._history_cursor = entry.id
+        self._ensure_overlay().show_history_entry(entry, *self._history.position(entry.id))
+
     def closeEvent(self, event):
         keyboard.unhook_all()
+        if self._speculator is not None:
+            self._speculator.stop()
+        self._stop_subtitles()
+        if self._capture is not None:
+            self._capture.close()
         if self._worker and self._worker.isRunning():
             self._worker.wait(5000)
-        self._save_ui_to_config()
+        self.config.flush()
+        if self._history is not None:
+            self._history.close()
         if self._overlay:
             self._overlay.close()
         event.accept()
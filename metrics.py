@@ -0,0 +1,52 @@
+"""
+翻译统计模块
+累计请求数、token 用量、前缀缓存命中、max_tokens 节省等计数，打印一行摘要
+"""
+
+import threading
+
+
+class Metrics:
+    """线程安全的累计计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def add(self, name: str, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str, default=0):
+        with self._lock:
+            return self._counters.get(name, default)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def record_usage(self, usage, max_tokens: int, ceiling: int, truncated: bool = False):
+        """
+        记录一次请求的 usage（OpenAI 兼容格式，可能为 None）和 max_tokens 节省
+        :param truncated: 输出被 max_tokens 截断、随后按上限重发的请求：消耗照计，不算节省
+        """
+        self.add("requests")
+        self.add("max_tokens_requested", max_tokens)
+        if not truncated:
+            self.add("max_tokens_saved", max(0, ceiling - max_tokens))
+        if usage is None:
+            return
+        self.add("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+        self.add("completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+        self.add("cached_prompt_tokens", cached or 0)
+
+    def summary(self) -> str:
+        s = self.snapshot()
+        prompt = s.get("prompt_tokens", 0)
+        cached = s.get("cached_prompt_tokens", 0)
+        hit = f"{cached / prompt:.0%}" if prompt else "-"
+        return (f"请求 {s.get('requests', 0)} 次, 输入 {prompt} tok (缓存命中 {cached}, {hit}), "
+                f"输出 {s.get('completion_tokens', 0)} tok, "
+                f"max_tokens 累计申请 {s.get('max_tokens_requested', 0)} / 节省 {s.get('max_tokens_saved', 0)}")
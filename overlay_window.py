@@ -2,14 +2,22 @@
 翻译悬浮窗
 中英对照显示，无边框、置顶、圆角、半透明
 支持拖拽移动、滚动查看、关闭、调整大小
+多个目标语言时每种语言一个标签页，各自保留内容，切换不需要重新翻译
+标题栏的 ◀ ▶ 翻看翻译历史，🔍 全文搜索历史（数据由主窗口从 history.py 读取）
+字幕模式下滚动显示最近几行字幕的译文，最新的在最下面
 """
 
+import html
+from collections import deque
+
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QTextBrowser, QPushButton, QSizeGrip, QApplication,
+    QTextBrowser, QPushButton, QSizeGrip, QApplication, QTabWidget, QLineEdit,
 )
-from PyQt5.QtCore import Qt, QPoint, QRectF
-from PyQt5.QtGui import QFont, QColor, QPainter, QPainterPath, QBrush
+from PyQt5.QtCore import Qt, QPoint, QRectF, QUrl, pyqtSignal
+from PyQt5.QtGui import QFont, QColor, QPainter, QPainterPath, QBrush, QTextCursor, QImage, QTextDocument
+
+from profiling import profiled
 
 
 class OverlayWindow(QWidget):
@@ -17,11 +25,19 @@ class OverlayWindow(QWidget):
 
     BG_COLOR = QColor(30, 30, 46)       # #1e1e2e
     TITLE_COLOR = QColor(35, 35, 52)    # 稍浅
+    THUMB_URL = QUrl("history://thumb")
+
+    history_step = pyqtSignal(int)      # -1 上一条，+1 下一条
+    history_search = pyqtSignal(str)    # 搜索关键词
+    history_open = pyqtSignal(int)      # 点击搜索结果：历史记录 id
 
     def __init__(self, opacity: float = 0.92, font_size: int = 15, parent=None):
         super().__init__(parent)
         self._drag_pos = QPoint()
         self._font_size = font_size
+        self._views = {}          # {目标语言: QTextBrowser}，标签页顺序即目标语言顺序
+        self._pairs = {}          # {目标语言: 当前显示的结构化片段 [(原文, 译文)]}
+        self._subtitles = {}      # 字幕模式：{目标语言: deque(最近几行译文)}
 
         self.setWindowTitle("翻译结果")
         self.setWindowFlags(
@@ -69,6 +85,14 @@ class OverlayWindow(QWidget):
         )
         title_layout.addWidget(self._status_label)
 
+        for text, tip, step in (("◀", "上一条翻译历史", -1), ("▶", "下一条翻译历史", 1)):
+            btn = self._title_button(text, tip, "#89b4fa")
+            btn.clicked.connect(lambda _=False, step=step: self.history_step.emit(step))
+            title_layout.addWidget(btn)
+        search_btn = self._title_button("🔍", "搜索翻译历史", "#89b4fa")
+        search_btn.clicked.connect(self._toggle_search)
+        title_layout.addWidget(search_btn)
+
         clear_btn = QPushButton("🗑")
         clear_btn.setFixedSize(26, 26)
         clear_btn.setToolTip("清空内容")
@@ -95,11 +119,59 @@ class OverlayWindow(QWidget):
         title_layout.addWidget(close_btn)
         root.addWidget(title_bar)
 
-        # ---- 内容区（HTML 富文本，支持中英对照排版）----
-        self._text_area = QTextBrowser()
-        self._text_area.setOpenExternalLinks(False)
-        self._text_area.setFont(QFont("Microsoft YaHei", self._font_size))
-        self._text_area.setStyleSheet("""
+        # ---- 历史搜索框（默认隐藏）----
+        self._search_box = QLineEdit()
+        self._search_box.setPlaceholderText("搜索翻译历史，回车确认…")
+        self._search_box.setStyleSheet("""
+            QLineEdit {
+                color: #cdd6f4; background: #313244; border: none;
+                border-radius: 4px; padding: 4px 8px; margin: 0 14px 4px 14px;
+            }
+        """)
+        self._search_box.returnPressed.connect(
+            lambda: self.history_search.emit(self._search_box.text()))
+        self._search_box.hide()
+        root.addWidget(self._search_box)
+
+        # ---- 内容区（每个目标语言一个标签页；只有一种语言时隐藏标签栏）----
+        self._tabs = QTabWidget()
+        self._tabs.setTabBarAutoHide(True)
+        self._tabs.setDocumentMode(True)
+        self._tabs.setStyleSheet("""
+            QTabWidget::pane { border: none; background: transparent; }
+            QTabBar::tab {
+                color: #a6adc8; background: transparent;
+                padding: 4px 12px; margin-left: 10px; border: none;
+                font-size: 12px;
+            }
+            QTabBar::tab:selected { color: #cdd6f4; border-bottom: 2px solid #89b4fa; }
+            QTabBar::tab:hover { color: #cdd6f4; }
+        """)
+        self._text_area = self._new_view()
+        self._views = {"": self._text_area}
+        self._tabs.addTab(self._text_area, "")
+        root.addWidget(self._tabs)
+
+        # ---- 底栏 ----
+        bottom = QWidget()
+        bottom.setFixedHeight(14)
+        bottom.setStyleSheet("background: transparent;")
+        bl = QHBoxLayout(bottom)
+        bl.setContentsMargins(0, 0, 2, 2)
+        bl.addStretch()
+        grip = QSizeGrip(self)
+        grip.setStyleSheet("background: transparent;")
+        bl.addWidget(grip)
+        root.addWidget(bottom)
+
+    def _new_view(self) -> QTextBrowser:
+        """内容区（HTML 富文本，支持中英对照排版）"""
+        view = QTextBrowser()
+        view.setOpenExternalLinks(False)
+        view.setOpenLinks(False)
+        view.anchorClicked.connect(self._on_anchor)
+        view.setFont(QFont("Microsoft YaHei", self._font_size))
+        view.setStyleSheet("""
             QTextBrowser {
                 background: transparent;
                 color: #cdd6f4;
@@ -117,20 +189,22 @@ class OverlayWindow(QWidget):
                 height: 0px;
             }
         """)
-        self._text_area.setPlaceholderText("翻译结果将显示在这里…")
-        root.addWidget(self._text_area)
+        view.setPlaceholderText("翻译结果将显示在这里…")
+        return view
 
-        # ---- 底栏 ----
-        bottom = QWidget()
-        bottom.setFixedHeight(14)
-        bottom.setStyleSheet("background: transparent;")
-        bl = QHBoxLayout(bottom)
-        bl.setContentsMargins(0, 0, 2, 2)
-        bl.addStretch()
-        grip = QSizeGrip(self)
-        grip.setStyleSheet("background: transparent;")
-        bl.addWidget(grip)
-        root.addWidget(bottom)
+    @staticmethod
+    def _title_button(text: str, tip: str, color: str) -> QPushButton:
+        btn = QPushButton(text)
+        btn.setFixedSize(26, 26)
+        btn.setToolTip(tip)
+        btn.setStyleSheet(f"""
+            QPushButton {{
+                color: {color}; background: transparent;
+                border: none; font-size: 13px;
+            }}
+            QPushButton:hover {{ background-color: #45475a; border-radius: 4px; }}
+        """)
+        return btn
 
     # ------------------------------------------------------------------ #
     #  绘制圆角背景（避免白色直角）
@@ -148,18 +222,155 @@ class OverlayWindow(QWidget):
     # ------------------------------------------------------------------ #
     def _on_clear(self):
         """清空翻译内容"""
-        self._text_area.clear()
+        self._pairs = {}
+        self._subtitles = {}
+        for view in self._views.values():
+            view.clear()
         self._status_label.setText("⏸ 已清空")
 
-    def set_translation(self, text: str):
+    def set_languages(self, langs):
+        """
+        设置目标语言（标签页）；已有语言的标签页和内容保留，顺序按 langs
+        只有一种语言时沿用唯一的内容区，不显示标签栏
+        """
+        langs = list(langs) or [""]
+        if langs == list(self._views):
+            return
+        old = self._views
+        if len(langs) == 1 and len(old) == 1:
+            view = next(iter(old.values()))
+            if langs[0] not in old:
+                view.clear()
+                self._pairs = {}
+            self._views = {langs[0]: view}
+            self._tabs.setTabText(0, langs[0])
+            return
+        views = {}
+        for lang in langs:
+            view = old.pop(lang, None)
+            if view is None:
+                view = self._new_view()
+            views[lang] = view
+        self._tabs.clear()
+        for lang, view in views.items():
+            self._tabs.addTab(view, lang)
+        for view in old.values():
+            view.deleteLater()
+        self._views = views
+        self._pairs = {lang: p for lang, p in self._pairs.items() if lang in views}
+        self._text_area = next(iter(views.values()))
+
+    def _view(self, lang: str = None) -> QTextBrowser:
+        """目标语言对应的内容区；未指定或未知语言时为第一个"""
+        return self._views.get(lang, self._text_area) if lang is not None else self._text_area
+
+    @profiled("overlay")
+    def set_translation(self, text: str, lang: str = None):
         """设置翻译结果（纯文本格式，自动转为 HTML 中英对照样式）"""
-        html = self._format_bilingual_html(text)
-        self._text_area.setHtml(html)
+        self._pairs.pop(lang, None)
+        self._view(lang).setHtml(self._format_bilingual_html(text))
+
+    @profiled("overlay")
+    def show_pairs(self, pairs, lang: str = None):
+        """
+        显示结构化的 (原文, 译文) 片段列表
+        新列表以当前列表为前缀时只追加新片段，否则整体重绘
+        """
+        view = self._view(lang)
+        pairs = list(pairs)
+        shown = self._pairs.get(lang, [])
+        n = len(shown)
+        if n and pairs[:n] == shown:
+            cursor = view.textCursor()
+            cursor.movePosition(QTextCursor.End)
+            for src, tgt in pairs[n:]:
+                cursor.insertHtml(self.PAIR_SEPARATOR + self._pair_html(src, tgt))
+        else:
+            view.setHtml(
+                self.PAIR_SEPARATOR.join(self._pair_html(s, t) for s, t in pairs)
+            )
+        self._pairs[lang] = pairs
+
+    @profiled("overlay")
+    def append_translation(self, text: str, shift_fraction: float, lang: str = None):
+        """
+        滚动增量翻译：新条带的译文追加到末尾，
+        原有译文按页面滚动的比例（相对截图高度）跟着上移
+        """
+        view = self._view(lang)
+        bar = view.verticalScrollBar()
+        before = bar.value()
+        cursor = view.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertHtml(self.PAIR_SEPARATOR + self._format_bilingual_html(text))
+        self._pairs.pop(lang, None)
+        bar.setValue(min(bar.maximum(), before + int(shift_fraction * bar.pageStep())))
+
+    @profiled("overlay")
+    def append_subtitle(self, text: str, lang: str = None, keep: int = 4):
+        """字幕模式：追加一行字幕译文，只保留最近 keep 行，滚到最下面"""
+        lines = self._subtitles.get(lang)
+        if lines is None or lines.maxlen != keep:
+            lines = self._subtitles[lang] = deque(lines or (), maxlen=keep)
+        lines.append(text)
+        view = self._view(lang)
+        view.setHtml(self.PAIR_SEPARATOR.join(self._format_bilingual_html(t) for t in lines))
+        bar = view.verticalScrollBar()
+        bar.setValue(bar.maximum())
+        self._pairs.pop(lang, None)
+
+    def clear_subtitles(self):
+        self._subtitles = {}
 
     def set_raw_parts(self, original: str, translated: str):
         """直接传入原文和译文，格式化为对照 HTML"""
-        html = self._build_contrast_html(original, translated)
-        self._text_area.setHtml(html)
+        self._pairs = {}
+        self._text_area.setHtml(self._build_contrast_html(original, translated))
+
+    # ---- 翻译历史 ----
+    def _toggle_search(self):
+        visible = not self._search_box.isVisible()
+        self._search_box.setVisible(visible)
+        if visible:
+            self._search_box.setFocus()
+            self._search_box.selectAll()
+
+    def _on_anchor(self, url: QUrl):
+        """搜索结果里的链接：history:<id>"""
+        if url.scheme() == "history" and url.path().isdigit():
+            self.history_open.emit(int(url.path()))
+
+    def show_history_entry(self, entry, index: int, total: int):
+        """显示一条历史记录：时间 / 语言对 / 缩略图 + 译文；显示在该目标语言的标签页（没有则第一个）"""
+        view = self._view(entry.target_lang)
+        self._tabs.setCurrentWidget(view)
+        self._pairs.pop(entry.target_lang, None)
+        header = html.escape(f"{entry.time_text}  {entry.source_lang} → {entry.target_lang}"
+                             + (f"  [{entry.preset}]" if entry.preset else ""))
+        parts = [f'<div style="color:#a6adc8; font-size:12px;">🕘 {header}</div>']
+        image = QImage()
+        if entry.thumb and image.loadFromData(entry.thumb):
+            # 缩略图作为文档资源，不写临时文件
+            view.document().addResource(QTextDocument.ImageResource, self.THUMB_URL, image)
+            parts.append(f'<div style="margin:6px 0;"><img src="{self.THUMB_URL.toString()}"></div>')
+        view.setHtml("".join(parts) + self._format_bilingual_html(entry.text))
+        self._status_label.setText(f"🕘 历史 {index}/{total}")
+
+    def show_search_results(self, query: str, entries):
+        """在当前标签页列出搜索结果，点击打开对应记录"""
+        view = self._tabs.currentWidget() or self._text_area
+        self._pairs = {k: v for k, v in self._pairs.items() if self._views.get(k) is not view}
+        rows = [f'<div style="color:#a6adc8; font-size:12px;">🔍 “{html.escape(query)}”：'
+                f'{len(entries)} 条结果</div>']
+        for e in entries:
+            snippet = " ".join(e.text.split())[:80]
+            rows.append(
+                f'<div style="margin:6px 0;"><a href="history:{e.id}" style="color:#89b4fa;">'
+                f'{html.escape(e.time_text)}  {html.escape(e.source_lang)} → {html.escape(e.target_lang)}'
+                f'</a><br><span style="color:#cdd6f4;">{html.escape(snippet)}</span></div>'
+            )
+        view.setHtml(self.PAIR_SEPARATOR.join(rows))
+        self._status_label.setText(f"🔍 {len(entries)} 条")
 
     def set_status(self, status: str):
         self._status_label.setText(status)
@@ -169,7 +380,8 @@ class OverlayWindow(QWidget):
             self.setWindowOpacity(opacity)
         if font_size is not None:
             self._font_size = font_size
-            self._text_area.setFont(QFont("Microsoft YaHei", font_size))
+            for view in self._views.values():
+                view.setFont(QFont("Microsoft YaHei", font_size))
 
     # ------------------------------------------------------------------ #
     #  格式化
@@ -205,6 +417,18 @@ class OverlayWindow(QWidget):
         separator = '<hr style="border:none; border-top:1px solid #45475a; margin:6px 0;">'
         return separator.join(parts)
 
+    PAIR_SEPARATOR = '<hr style="border:none; border-top:1px solid #45475a; margin:6px 0;">'
+
+    @staticmethod
+    def _pair_html(src: str, tgt: str) -> str:
+        """单个结构化片段：原文蓝色、译文绿色（内容做 HTML 转义）"""
+        src_html = html.escape(src).replace("\n", "<br>")
+        tgt_html = html.escape(tgt).replace("\n", "<br>")
+        return (
+            f'<div style="color:#89b4fa; font-size:{14}px; margin:8px 0 2px 0;">{src_html}</div>'
+            f'<div style="color:#a6e3a1; font-size:{14}px; margin:2px 0 8px 0;">{tgt_html}</div>'
+        )
+
     @staticmethod
     def _build_contrast_html(original: str, translated: str) -> str:
         """并排显示原文和译文"""
@@ -0,0 +1,124 @@
+"""
+请求体构造模块
+原来的热路径上，约 1.3MB 的图片数据要被复制好几次：
+BytesIO.getvalue() → b64encode 的 bytes → decode 的 str → f-string 拼 data URL → SDK 序列化 JSON
+这里改为：
+- 编码器输出的 BytesIO 直接交给 EncodedImage 持有，不调用 getvalue()
+- messages 里先放一个短占位符，整个请求（不含图片）序列化成 JSON 后按占位符切成前后两段
+- 请求体 = 前段 + 逐块 base64 编码的图片 + 后段，逐块写进预分配的缓冲区，是唯一的一份大内存；
+  同一图片的多次尝试（对冲 / 重试）参数相同时复用同一份请求体
+- 以 bytes 形式交给 SDK 原样发送，不再序列化：post() 有 content 参数的 SDK 用 content；
+  没有 content、但 >= 1.99 的 SDK 用 body（bytes 的 body 原样发送）；
+  更早的版本退回把完整 data URL 填进 messages、由 SDK 序列化
+"""
+
+import io
+import json
+import inspect
+import binascii
+import threading
+
+IMAGE_PLACEHOLDER = "__SCREEN_TRANSLATOR_IMAGE__"
+_PLACEHOLDER_BYTES = IMAGE_PLACEHOLDER.encode("ascii")
+B64_CHUNK = 3 * 16 * 1024      # 每次编码 48KB 原始字节（3 的倍数，块之间无需填充）
+RAW_BODY_MIN_SDK = (1, 99)
+
+
+def _raw_body_param():
+    """
+    SDK 接收原始请求体的 post() 参数名
+    新版 SDK 有 content 参数（用 body 传 bytes 已弃用、将被移除）；1.99 起到引入 content 前用 body；
+    更早的版本会把 bytes 的 body 当成 JSON 对象再序列化而失败，返回 None
+    """
+    try:
+        import openai
+        if "content" in inspect.signature(openai.OpenAI.post).parameters:
+            return "content"
+        version = tuple(int(part) for part in openai.__version__.split(".")[:2])
+    except (ImportError, AttributeError, ValueError, TypeError):
+        return None
+    return "body" if version >= RAW_BODY_MIN_SDK else None
+
+
+RAW_BODY_PARAM = _raw_body_param()
+RAW_BODY_SUPPORTED = RAW_BODY_PARAM is not None
+
+
+class EncodedImage:
+    """编码器产出的图片：持有编码缓冲区本身，按需逐块 base64"""
+
+    def __init__(self, buf: io.BytesIO, mime: str, size):
+        self._buf = buf
+        self.mime = mime
+        self.size = size               # (宽, 高)，发送给模型的实际分辨率
+        self.nbytes = buf.tell()
+
+    @property
+    def placeholder_url(self) -> str:
+        """放进 messages 的 data URL，图片数据部分是占位符"""
+        return f"data:{self.mime};base64,{IMAGE_PLACEHOLDER}"
+
+    def b64_chunks(self):
+        """逐块产出 base64 bytes；只读编码缓冲区的内存视图，不复制整段数据"""
+        view = self._buf.getbuffer()
+        try:
+            for i in range(0, self.nbytes, B64_CHUNK):
+                yield binascii.b2a_base64(view[i:i + B64_CHUNK], newline=False)
+        finally:
+            view.release()
+
+    def b64_string(self) -> str:
+        """兼容路径：完整的 base64 字符串（需要 str 的调用方使用）"""
+        with self._buf.getbuffer() as view:
+            return binascii.b2a_base64(view[:self.nbytes], newline=False).decode("ascii")
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{self.b64_string()}"
+
+
+class RequestBodyBuilder:
+    """按请求参数生成包含图片的 JSON 请求体（bytes），相同参数复用"""
+
+    def __init__(self, image: EncodedImage):
+        self.image = image
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def inline(self, value):
+        """兼容路径：把参数中的占位符 URL 换成完整的 data URL（交给 SDK 自己序列化）"""
+        if isinstance(value, dict):
+            return {k: self.inline(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.inline(v) for v in value]
+        if value == self.image.placeholder_url:
+            return self.image.data_url()
+        return value
+
+    def build(self, kwargs: dict) -> bytes:
+        """
+        :param kwargs: chat.completions.create 的参数（messages 中含占位符 URL）；
+                       extra_body 会像 SDK 一样合并到顶层
+        """
+        body = {k: v for k, v in kwargs.items() if k != "extra_body"}
+        body.update(kwargs.get("extra_body") or {})
+        text = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                return cached
+        prefix, found, suffix = text.partition(_PLACEHOLDER_BYTES)
+        if not found:
+            raise ValueError("请求参数中没有图片占位符")
+        # base64 字符不需要 JSON 转义，直接拼接
+        # 预分配恰好大小的缓冲区逐块写入：CPython 的 BytesIO 独占初始 bytes 时原地写、
+        # getvalue() 直接返回该对象，整个过程只有这一份请求体大小的内存
+        length = len(prefix) + 4 * ((self.image.nbytes + 2) // 3) + len(suffix)
+        out = io.BytesIO(bytes(length))
+        out.write(prefix)
+        for chunk in self.image.b64_chunks():
+            out.write(chunk)
+        out.write(suffix)
+        data = out.getvalue()
+        with self._lock:
+            self._cache[text] = data
+        return data
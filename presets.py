@@ -0,0 +1,171 @@
+"""
+翻译预设模块
+每个预设有自己的区域、语言对、模型和热键；默认预设来自主窗口的设置，
+其余来自 config.json 的 presets 列表（缺省字段沿用主设置）
+- 预设可以有多个目标语言（target_lang + extra_target_langs），一次请求同时翻译
+- 配置变化时重新解析：截图区域、提示词模板、滚动跟踪器都提前准备好
+- 翻译器按模型缓存复用，API 设置变化时整体失效；配置了 service_url 时改用共享服务的瘦客户端
+- 整帧翻译结果按语言分别缓存（所有预设共用），同一画面再翻译已有的语言时不再请求
+- 热键按下时只需按名称取出已解析的预设，直接截图，不读界面、不写配置
+"""
+
+import threading
+
+from config import Config
+from prompts import get_template
+from scroll import ScrollTracker
+from translator import build_translator
+from service import ServiceClient, ResultCache, image_key
+
+DEFAULT_PRESET = "默认"
+
+# 这些配置变化时需要重新解析预设
+PRESET_KEYS = ("region", "source_lang", "target_lang", "extra_target_langs", "model", "hotkey",
+               "presets", "output_format", "scroll_incremental")
+RESULT_CACHE_ENTRIES = 64
+
+
+class Preset:
+    """解析完成的预设"""
+
+    def __init__(self, name: str, hotkey: str, region: dict, source_lang: str,
+                 target_lang: str, model: str, output_format: str = "text",
+                 scroll_incremental: bool = True, extra_target_langs=()):
+        self.name = name
+        self.hotkey = hotkey
+        self.region = region
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.target_langs = tuple(dict.fromkeys((target_lang,) + tuple(extra_target_langs or ())))
+        self.output_format = output_format
+        self.model = model
+        self.scroll_incremental = scroll_incremental
+        if region:
+            self.capture_rect = (region["x"], region["y"], region["width"], region["height"])
+            self.region_key = tuple(sorted(region.items()))
+        else:
+            self.capture_rect = None
+            self.region_key = None
+        # 预编译提示词（lru_cache），翻译时直接命中
+        self.template = get_template(source_lang, target_lang, output_format)
+        self.scroll_tracker = ScrollTracker()
+        self.translator = None     # 由 PresetRegistry.translator_for() 填充
+
+    def signature(self):
+        """影响翻译结果的字段；不变时沿用旧预设的滚动跟踪器"""
+        return (self.region_key, self.source_lang, self.target_langs, self.model,
+                self.template.output_format, self.scroll_incremental)
+
+    @property
+    def multi_target(self) -> bool:
+        return len(self.target_langs) > 1
+
+    def result_keys(self, img) -> dict:
+        """{目标语言: 结果缓存 key}；按整帧像素计算"""
+        pixels = img.tobytes()
+        return {lang: image_key(pixels, img.width, img.height, self.source_lang, lang,
+                                f"{self.model}|{self.output_format}")
+                for lang in self.target_langs}
+
+    def __repr__(self):
+        targets = "、".join(self.target_langs)
+        return f"Preset({self.name}, {self.hotkey}, {self.source_lang}→{targets}, {self.model})"
+
+
+class PresetRegistry:
+    """
+    管理所有预设及按模型共享的翻译器
+    rebuild() / invalidate_translators() 在主线程的配置回调中调用；
+    get() 只做字典查找，可在热键路径上使用
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._presets = {}
+        self._translators = {}
+        self.results = ResultCache(RESULT_CACHE_ENTRIES)
+        self.rebuild()
+
+    # ---- 预设 ----
+    def rebuild(self):
+        cfg = self.config
+        presets = [Preset(DEFAULT_PRESET, cfg.hotkey, cfg.region, cfg.source_lang,
+                          cfg.target_lang, cfg.model, cfg.output_format, cfg.scroll_incremental,
+                          cfg.extra_target_langs)]
+        for i, entry in enumerate(cfg.presets):
+            presets.append(Preset(
+                name=entry.get("name") or f"预设{i + 1}",
+                hotkey=entry.get("hotkey", ""),
+                region=entry.get("region") or cfg.region,
+                source_lang=entry.get("source_lang") or cfg.source_lang,
+                target_lang=entry.get("target_lang") or cfg.target_lang,
+                model=entry.get("model") or cfg.model,
+                output_format=cfg.output_format,
+                scroll_incremental=cfg.scroll_incremental,
+                extra_target_langs=entry.get("extra_target_langs", cfg.extra_target_langs),
+            ))
+
+        with self._lock:
+            old = self._presets
+            self._presets = {}
+            for p in presets:
+                if p.name in self._presets:
+                    print(f"[预设] 名称重复，已忽略: {p.name}")
+                    continue
+                prev = old.get(p.name)
+                if prev is not None and prev.signature() == p.signature():
+                    p.scroll_tracker = prev.scroll_tracker
+                p.translator = self._translators.get(p.model)
+                self._presets[p.name] = p
+        return list(self._presets.values())
+
+    def get(self, name: str = DEFAULT_PRESET) -> Preset:
+        return self._presets.get(name)
+
+    def all(self):
+        return list(self._presets.values())
+
+    def hotkeys(self) -> dict:
+        """{热键: 预设名}；同一热键只绑定第一个预设"""
+        mapping = {}
+        for p in self._presets.values():
+            if p.hotkey and p.hotkey not in mapping:
+                mapping[p.hotkey] = p.name
+        return mapping
+
+    # ---- 翻译器 ----
+    def translator_for(self, preset: Preset):
+        """取预设的翻译器（或共享服务客户端）；尚未创建时按模型创建并缓存"""
+        if preset.translator is not None:
+            return preset.translator
+        with self._lock:
+            translator = self._translators.get(preset.model)
+            if translator is None:
+                if self.config.service_url:
+                    translator = ServiceClient(self.config.service_url, preset.model)
+                else:
+                    translator = build_translator(self.config, preset.model)
+                self._translators[preset.model] = translator
+            for p in self._presets.values():
+                if p.model == preset.model:
+                    p.translator = translator
+        return translator
+
+    def invalidate_translators(self):
+        # API 设置（端点、输出格式等）变了，旧结果不再可信
+        self.results = ResultCache(RESULT_CACHE_ENTRIES)
+        with self._lock:
+            for t in self._translators.values():
+                if isinstance(t, ServiceClient):
+                    t.close()
+            self._translators = {}
+            for p in self._presets.values():
+                p.translator = None
+
+    def warm(self):
+        """为所有预设提前创建翻译器（同时触发端点能力探测）"""
+        if not (self.config.api_key or self.config.service_url):
+            return
+        for p in self.all():
+            self.translator_for(p)
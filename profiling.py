@@ -0,0 +1,212 @@
+"""
+性能剖析模块（可选）
+用户反馈"变慢了"时，打开剖析模式跑几次翻译，把报告文件夹发回来即可，不用改代码
+- 配置 profile_jobs > 0 或设置环境变量 TRANSLATER_PROFILE=N 开启，剖析接下来的 N 次翻译
+- @profiled("阶段名") 包住翻译线程、图片压缩、悬浮窗渲染等阶段：
+  每个阶段单独计 cProfile（嵌套阶段执行时暂停外层，报告互不重叠）+ tracemalloc 快照差分
+- N 次翻译结束后每个阶段写一份报告：耗时最多的函数 + 分配内存最多的代码行，另存 .prof 供 snakeviz 查看
+- Python 3.12+ 每个进程同时只能有一个 cProfile 在运行：其他线程的阶段正在剖析时，
+  本阶段只记耗时和内存，不计 cProfile（报告中注明次数）
+- 未开启时装饰器只多一次布尔判断
+"""
+
+import os
+import time
+import cProfile
+import pstats
+import functools
+import threading
+import tracemalloc
+
+PROFILE_ENV = "TRANSLATER_PROFILE"
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 25
+
+
+class _StageStats:
+    """一个阶段在剖析期间的累计数据"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.stats = None            # pstats.Stats，多次调用累加
+        self.alloc = {}              # {"文件:行号": [净增字节, 次数]}
+        self.peak = 0                # 单次调用期间内存峰值相对开始时的最大增量（含已释放的临时对象）
+        self.unprofiled = 0          # 没能开启 cProfile 的调用次数
+
+    def add(self, profile, seconds: float, alloc_diff, peak: int):
+        """:param profile: 本次的 cProfile.Profile；没能开启时为 None，只累计耗时和内存"""
+        self.calls += 1
+        self.seconds += seconds
+        self.peak = max(self.peak, peak)
+        if profile is None:
+            self.unprofiled += 1
+        elif self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+        for stat in alloc_diff:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            key = f"{frame.filename}:{frame.lineno}"
+            entry = self.alloc.setdefault(key, [0, 0])
+            entry[0] += stat.size_diff
+            entry[1] += stat.count_diff
+
+
+class Profiler:
+    """进程内唯一的剖析器；通过 configure() 开启"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {}
+        self._jobs_left = 0
+        self._jobs_total = 0
+        self._out_dir = PROFILE_DIR
+
+    def configure(self, jobs: int = 0, out_dir: str = ""):
+        """
+        :param jobs: 剖析接下来多少次翻译；环境变量 TRANSLATER_PROFILE 优先
+        :param out_dir: 报告目录，默认项目下 profiles/
+        """
+        env = os.environ.get(PROFILE_ENV, "").strip()
+        if env:
+            try:
+                jobs = int(env)
+            except ValueError:
+                print(f"[剖析] 忽略无效的 {PROFILE_ENV}={env}")
+        with self._lock:
+            if jobs <= 0 or self.enabled:
+                return
+            self._jobs_left = self._jobs_total = jobs
+            self._out_dir = out_dir or PROFILE_DIR
+            self._stages = {}
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(1)
+            self.enabled = True
+        print(f"[剖析] 已开启，将剖析接下来 {jobs} 次翻译，报告写入 {self._out_dir}")
+
+    def wrap(self, stage: str, func, job: bool = False):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            return self._run(stage, job, func, args, kwargs)
+        return wrapper
+
+    def _run(self, stage: str, job: bool, func, args, kwargs):
+        active = getattr(self._local, "stack", None)
+        if active is None:
+            active = self._local.stack = []
+        # 同名阶段嵌套（如 encode_image → compress_image）算作同一次
+        if active and active[-1][0] == stage:
+            return func(*args, **kwargs)
+
+        # 同一线程只能有一个 cProfile 在运行：暂停外层阶段
+        if active and active[-1][1] is not None:
+            active[-1][1].disable()
+        entry = [stage, None]
+        active.append(entry)
+        before = None
+        base = 0
+        start = time.perf_counter()
+        try:
+            if tracemalloc.is_tracing():
+                before = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            entry[1] = _start_profile()
+            return func(*args, **kwargs)
+        finally:
+            profile = entry[1]
+            if profile is not None:
+                profile.disable()
+            seconds = time.perf_counter() - start
+            diff = []
+            peak = 0
+            if before is not None and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1] - base
+                diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+            active.pop()
+            if active and active[-1][1] is not None:
+                _resume_profile(active[-1][1])
+            self._record(stage, profile, seconds, diff, peak, job)
+
+    def _record(self, stage, profile, seconds, diff, peak, job):
+        with self._lock:
+            if not self.enabled:
+                return
+            self._stages.setdefault(stage, _StageStats()).add(profile, seconds, diff, peak)
+            if not job:
+                return
+            self._jobs_left -= 1
+            print(f"[剖析] 第 {self._jobs_total - self._jobs_left}/{self._jobs_total} 次翻译: {seconds:.2f}s")
+            if self._jobs_left > 0:
+                return
+            self.enabled = False
+            stages = self._stages
+            self._stages = {}
+        tracemalloc.stop()
+        self._write_reports(stages)
+
+    def _write_reports(self, stages: dict):
+        out = os.path.join(self._out_dir, time.strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(out, exist_ok=True)
+        for stage, s in stages.items():
+            if s.stats is not None:
+                s.stats.dump_stats(os.path.join(out, f"{stage}.prof"))
+            with open(os.path.join(out, f"{stage}.txt"), "w", encoding="utf-8") as f:
+                f.write(f"阶段: {stage}\n调用次数: {s.calls}\n")
+                f.write(f"累计耗时: {s.seconds:.3f}s, 平均 {s.seconds / s.calls * 1000:.1f}ms\n")
+                f.write(f"单次内存峰值增量: {s.peak / 1024 / 1024:.1f} MiB（含阶段内已释放的临时副本）\n\n")
+                f.write(f"==== 耗时最多的函数（累计时间前 {TOP_FUNCTIONS}）====\n")
+                if s.unprofiled:
+                    f.write(f"其中 {s.unprofiled} 次调用时其他线程正在剖析（Python 3.12+ 限制），未计入下表\n")
+                if s.stats is not None:
+                    s.stats.stream = f
+                    s.stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+                f.write(f"\n==== 净分配内存最多的代码行（前 {TOP_ALLOCATIONS}，tracemalloc）====\n")
+                f.write("注意：其他线程同时运行的阶段分配的内存也会计入\n")
+                top = sorted(s.alloc.items(), key=lambda kv: kv[1][0], reverse=True)[:TOP_ALLOCATIONS]
+                for where, (size, count) in top:
+                    f.write(f"{size / 1024:>10.1f} KiB  {count:>7} 块  {where}\n")
+        print(f"[剖析] 报告已写入: {out}")
+
+
+def _start_profile():
+    """
+    新建并开启一个 cProfile；Python 3.12+ 其他线程已有 cProfile 在运行时开启会抛 ValueError，
+    此时返回 None，该阶段只记耗时和内存
+    """
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return None
+    return profile
+
+
+def _resume_profile(profile: cProfile.Profile):
+    """内层阶段结束后恢复外层阶段；期间别的线程占用了剖析器时外层只保留已采集的部分"""
+    try:
+        profile.enable()
+    except ValueError:
+        pass
+
+
+profiler = Profiler()
+
+
+def profiled(stage: str, job: bool = False):
+    """
+    装饰器：剖析开启时单独记录该阶段
+    :param job: 该阶段每结束一次计为一次翻译（用于计数 N 次后写报告）
+    """
+    def decorator(func):
+        return profiler.wrap(stage, func, job)
+    return decorator
@@ -0,0 +1,156 @@
+"""
+提示词模板模块
+- 系统提示词与语言无关、逐字节固定，所有语言对共用，服务端前缀缓存可以命中
+- 语言对相关的内容放在图片之后的用户指令里，按语言对预编译并缓存
+- 根据本地估计的文字量给出 max_tokens，文字少的帧尽快结束、释放连接
+"""
+
+from functools import lru_cache
+
+MAX_TOKENS_CEILING = 4096
+MAX_TOKENS_FLOOR = 256
+
+# 注意：修改此常量会让服务端已缓存的前缀全部失效
+SYSTEM_PROMPT = (
+    "你是一位专业翻译和 OCR 专家。请仔细阅读图片中的所有文字内容，"
+    "并按用户消息中指定的源语言和目标语言进行翻译。\n"
+    "要求：\n"
+    "1. 输出【原文/译文对照】格式：每一行先显示原文，下一行显示对应翻译，"
+    "原文和译文之间用空行分隔，每对之间用分隔线 --- 分开。\n"
+    "2. 保持原文的段落结构和顺序。\n"
+    "3. 只翻译文字内容，不要描述图片本身。\n"
+    "4. 如果图片中没有文字，只回复：（无文字内容）\n"
+    "5. 不要附加任何额外解释。\n\n"
+    "示例输出格式（英语 → 中文）：\n"
+    "Hello World\n"
+    "你好世界\n\n"
+    "---\n\n"
+    "This is a test.\n"
+    "这是一个测试。"
+)
+
+# JSON 行协议：每个原文片段一个对象，便于流式逐条解析，不依赖字符集猜测哪行是译文
+SYSTEM_PROMPT_JSONL = (
+    "你是一位专业翻译和 OCR 专家。请仔细阅读图片中的所有文字内容，"
+    "并按用户消息中指定的源语言和目标语言进行翻译。\n"
+    "要求：\n"
+    "1. 按阅读顺序，每个原文片段（一行或一段）输出一行 JSON 对象："
+    '{"src": "原文", "tgt": "译文"}\n'
+    "2. 每行只有一个对象，不要输出数组、代码块标记或其他任何文字。\n"
+    "3. 只翻译文字内容，不要描述图片本身。\n"
+    "4. 如果图片中没有文字，不输出任何内容。\n\n"
+    "示例输出（英语 → 中文）：\n"
+    '{"src": "Hello World", "tgt": "你好世界"}\n'
+    '{"src": "This is a test.", "tgt": "这是一个测试。"}'
+)
+
+# 多目标语言：一次读图同时输出所有目标语言的译文，译文按语言名放在 tgt 对象里
+SYSTEM_PROMPT_MULTI = (
+    "你是一位专业翻译和 OCR 专家。请仔细阅读图片中的所有文字内容，"
+    "并按用户消息中指定的源语言和多个目标语言进行翻译。\n"
+    "要求：\n"
+    "1. 按阅读顺序，每个原文片段（一行或一段）输出一行 JSON 对象，"
+    "tgt 中按用户消息给出的顺序、以目标语言名为键给出每种语言的译文："
+    '{"src": "原文", "tgt": {"目标语言1": "译文", "目标语言2": "译文"}}\n'
+    "2. 每行只有一个对象，不要输出数组、代码块标记或其他任何文字。\n"
+    "3. 只翻译文字内容，不要描述图片本身。\n"
+    "4. 如果图片中没有文字，不输出任何内容。\n\n"
+    "示例输出（英语 → 中文、日语）：\n"
+    '{"src": "Hello World", "tgt": {"中文": "你好世界", "日语": "こんにちは世界"}}\n'
+    '{"src": "This is a test.", "tgt": {"中文": "这是一个测试。", "日语": "これはテストです。"}}'
+)
+
+OUTPUT_TEXT = "text"
+OUTPUT_JSONL = "jsonl"
+OUTPUT_MULTI = "multi"     # 内部格式：多目标语言时自动使用，不作为配置项
+
+_SYSTEM_MESSAGES = {
+    OUTPUT_TEXT: {"role": "system", "content": SYSTEM_PROMPT},
+    OUTPUT_JSONL: {"role": "system", "content": SYSTEM_PROMPT_JSONL},
+    OUTPUT_MULTI: {"role": "system", "content": SYSTEM_PROMPT_MULTI},
+}
+_FORMAT_HINTS = {
+    OUTPUT_TEXT: "用原文/译文对照格式输出。",
+    OUTPUT_JSONL: "每个片段输出一行 JSON 对象。",
+}
+
+
+class PromptTemplate:
+    """某个语言对 + 输出格式的预编译提示词"""
+
+    def __init__(self, source_lang: str, target_lang: str, output_format: str = OUTPUT_TEXT):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.output_format = output_format
+        self.system_message = _SYSTEM_MESSAGES[output_format]
+        self.instruction = {
+            "type": "text",
+            "text": (f"源语言：{source_lang}\n目标语言：{target_lang}\n"
+                     f"请识别并翻译图片中的所有{source_lang}文字为{target_lang}，"
+                     f"{_FORMAT_HINTS[output_format]}"),
+        }
+
+    def build_messages(self, image_url: str):
+        """组装 messages；系统消息和指令都是共享的预编译对象，只有图片部分是新建的"""
+        return [
+            self.system_message,
+            {
+                "role": "user",
+                "content": [
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                    self.instruction,
+                ],
+            },
+        ]
+
+
+class MultiTargetTemplate(PromptTemplate):
+    """一个源语言 + 多个目标语言的预编译提示词（JSON 行协议）"""
+
+    def __init__(self, source_lang: str, target_langs):
+        self.source_lang = source_lang
+        self.target_langs = tuple(target_langs)
+        self.target_lang = self.target_langs[0]
+        self.output_format = OUTPUT_MULTI
+        self.system_message = _SYSTEM_MESSAGES[OUTPUT_MULTI]
+        targets = "、".join(self.target_langs)
+        self.instruction = {
+            "type": "text",
+            "text": (f"源语言：{source_lang}\n目标语言：{targets}\n"
+                     f"请识别图片中的所有{source_lang}文字，并分别翻译为{targets}，"
+                     f"每个片段输出一行 JSON 对象，tgt 的键依次为：{targets}。"),
+        }
+
+
+@lru_cache(maxsize=64)
+def get_template(source_lang: str, target_lang: str,
+                 output_format: str = OUTPUT_TEXT) -> PromptTemplate:
+    if output_format not in _FORMAT_HINTS:
+        output_format = OUTPUT_TEXT
+    return PromptTemplate(source_lang, target_lang, output_format)
+
+
+@lru_cache(maxsize=64)
+def get_multi_template(source_lang: str, target_langs: tuple) -> MultiTargetTemplate:
+    return MultiTargetTemplate(source_lang, target_langs)
+
+
+def estimate_max_tokens(features, output_format: str = OUTPUT_TEXT, targets: int = 1) -> int:
+    """
+    按文字行数估计输出 token 上限
+    每行字符数按区域宽度 / 12px 估计，原文 + 译文约为字符数的 2.5/4 个 token，再留 30% 余量；
+    JSON 行协议每行另加约 12 个 token 的键名和引号
+    多目标语言时每多一种语言多一份译文和键名
+    没有文字量特征时返回上限
+    """
+    if features is None:
+        return MAX_TOKENS_CEILING
+    if features.lines == 0:
+        return MAX_TOKENS_FLOOR
+    per_line = max(24.0, features.width / 12.0 / 4.0 * 2.5)
+    if output_format == OUTPUT_MULTI:
+        per_line = per_line * (1 + targets) / 2 + 12 + 6 * targets
+    elif output_format == OUTPUT_JSONL:
+        per_line += 12
+    budget = int((64 + features.lines * per_line) * 1.3)
+    return max(MAX_TOKENS_FLOOR, min(MAX_TOKENS_CEILING, budget))
@@ -0,0 +1,234 @@
+"""
+限流调度模块
+服务商对每个 API Key + 模型有每分钟请求数（RPM）和每分钟 token 数（TPM）限制，
+连按热键或自动化调用时很容易撞上 429，每次都白白浪费一个完整往返
+- RateGovernor：每个端点 + 模型一个，RPM / TPM 两个令牌桶
+  请求前按估计的图片 + 提示词 + 输出 token 预约额度，不够时排队等待，等待过久则直接放弃（转给其他端点）
+- 从响应的 x-ratelimit-* 头自动校准桶容量和剩余额度；遇到 429 按 retry-after 暂停
+- 请求结束后按实际 usage 多退少补
+"""
+
+import re
+import math
+import time
+import threading
+
+# 每个图片 token 大致覆盖的像素边长（Qwen-VL 为 28x28；OpenAI 的 512 分块折算后量级相近）
+IMAGE_PATCH = 28
+PROMPT_OVERHEAD_TOKENS = 300
+
+
+class RateLimitShed(Exception):
+    """预计排队时间超过上限，放弃本次请求（不发出去白等 429）"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_request_tokens(width: int, height: int, max_tokens: int) -> int:
+    """估计一次请求占用的 token：图片 + 提示词 + 输出上限"""
+    image = math.ceil(width / IMAGE_PATCH) * math.ceil(height / IMAGE_PATCH)
+    return image + PROMPT_OVERHEAD_TOKENS + max_tokens
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value) -> float:
+    """解析 "1s" / "6m0s" / "20ms" / "1.5" 这类重置时间，返回秒；无法解析返回 None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    unit = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * unit[u] for n, u in parts)
+
+
+# ====================================================================== #
+#  令牌桶
+# ====================================================================== #
+class TokenBucket:
+    """
+    每分钟 per_minute 个令牌、容量 per_minute 的令牌桶；per_minute 为 0 表示不限
+    预约制：wait_for() 算出需要等待的秒数后立即 take() 扣减（余额可为负），后来者排在后面，先到先得
+    """
+
+    def __init__(self, per_minute: float = 0):
+        self.per_minute = 0.0
+        self.level = 0.0
+        self._updated = time.monotonic()
+        self.set_limit(per_minute)
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+    def set_limit(self, per_minute: float):
+        """调整容量；首次设置时桶是满的"""
+        per_minute = float(per_minute or 0)
+        self._refill()
+        if self.per_minute <= 0 < per_minute:
+            self.level = per_minute
+        self.per_minute = per_minute
+        self.level = min(self.level, per_minute)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.per_minute > 0:
+            self.level = min(self.per_minute, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """按当前余额预约 amount 需要等待的秒数（不扣减）"""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        # 单次需求超过桶容量时按满桶计，否则永远等不到
+        amount = min(amount, self.per_minute)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if self.per_minute > 0:
+            self._refill()
+            self.level -= min(amount, self.per_minute)
+
+    def refund(self, amount: float):
+        if self.per_minute > 0:
+            self._refill()
+            self.level = min(self.per_minute, self.level + amount)
+
+    def observe_remaining(self, remaining: float):
+        """服务端报告的剩余额度比本地估计少时以服务端为准"""
+        if self.per_minute > 0:
+            self._refill()
+            self.level = min(self.level, float(remaining))
+
+
+# ====================================================================== #
+#  限流调度
+# ====================================================================== #
+class RateGovernor:
+    """一个端点 + 模型的 RPM / TPM 限流"""
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0):
+        self.name = name
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._configured = (float(rpm or 0), float(tpm or 0))
+        self._blocked_until = 0.0
+        self.shed_count = 0
+        self.queued_seconds = 0.0
+
+    def configure(self, rpm: float = 0, tpm: float = 0):
+        """配置的上限；为 0 时保留从响应头校准得到的值"""
+        with self._lock:
+            self._configured = (float(rpm or 0), float(tpm or 0))
+            if rpm:
+                self.requests.set_limit(rpm)
+            if tpm:
+                self.tokens.set_limit(tpm)
+
+    def acquire(self, tokens: int, max_wait: float, cancelled: threading.Event = None) -> int:
+        """
+        预约一次请求的额度，必要时排队
+        :param tokens: 估计的 token 数
+        :param max_wait: 最多排队多少秒，超过则抛出 RateLimitShed（不扣减额度）
+        :param cancelled: 被设置时提前结束排队（调用方检查后用 settle(..., requests_used=0) 退回额度）
+        :return: 预约的 token 数（请求结束后传给 settle）
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._blocked_until - now,
+                       self.requests.wait_for(1),
+                       self.tokens.wait_for(tokens))
+            if wait > max_wait:
+                self.shed_count += 1
+                raise RateLimitShed(
+                    f"{self.name} 限流：需排队 {wait:.1f}s，超过上限 {max_wait:.1f}s", wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        if wait > 0:
+            print(f"[限流] {self.name} 排队 {wait:.2f}s")
+            self.queued_seconds += wait
+            if cancelled is not None:
+                cancelled.wait(wait)
+            else:
+                time.sleep(wait)
+        return tokens
+
+    def settle(self, reserved: int, actual: int = None, requests_used: int = 1):
+        """
+        按实际用量修正预约：actual 为 None（服务端未返回 usage）时不修正 token 桶
+        requests_used=0 表示请求没有发出，退回请求额度
+        """
+        with self._lock:
+            if actual is not None and reserved > actual:
+                self.tokens.refund(reserved - actual)
+            elif actual is not None and actual > reserved:
+                self.tokens.take(actual - reserved)
+            if requests_used == 0:
+                self.requests.refund(1)
+
+    def calibrate(self, headers):
+        """从响应头校准：x-ratelimit-limit/remaining-requests|tokens（OpenAI 等通用格式）"""
+        if headers is None:
+            return
+        get = headers.get
+        with self._lock:
+            for bucket, kind, configured in ((self.requests, "requests", self._configured[0]),
+                                             (self.tokens, "tokens", self._configured[1])):
+                limit = _to_float(get(f"x-ratelimit-limit-{kind}"))
+                remaining = _to_float(get(f"x-ratelimit-remaining-{kind}"))
+                if limit and not configured and limit != bucket.per_minute:
+                    bucket.set_limit(limit)
+                    print(f"[限流] {self.name} 按响应头校准 {kind} 上限: {limit:.0f}/min")
+                if remaining is not None:
+                    bucket.observe_remaining(remaining)
+
+    def penalize(self, headers=None, default_wait: float = 5.0):
+        """收到 429：按 retry-after（或重置时间）暂停该端点"""
+        wait = None
+        if headers is not None:
+            wait = (parse_duration(headers.get("retry-after"))
+                    or parse_duration(headers.get("x-ratelimit-reset-requests"))
+                    or parse_duration(headers.get("x-ratelimit-reset-tokens")))
+        wait = wait or default_wait
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + wait)
+        print(f"[限流] {self.name} 收到 429，暂停 {wait:.1f}s")
+
+    def summary(self) -> str:
+        return (f"RPM={self.requests.per_minute:.0f} TPM={self.tokens.per_minute:.0f} "
+                f"放弃={self.shed_count} 累计排队={self.queued_seconds:.1f}s")
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(api_base: str, model: str, rpm: float = 0, tpm: float = 0) -> RateGovernor:
+    """同一端点 + 模型在进程内共用一个调度器（多个预设、共享服务的所有客户端）"""
+    key = (api_base.rstrip("/"), model)
+    with _governors_lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = _governors[key] = RateGovernor(f"{model}@{api_base}", rpm, tpm)
+            return governor
+    if rpm or tpm:
+        governor.configure(rpm, tpm)
+    return governor
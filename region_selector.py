@@ -1,22 +1,58 @@
 """
 区域选择器
-全屏透明覆盖层，用户可以拖动鼠标选择屏幕区域
+全屏覆盖层，用户可以拖动鼠标选择屏幕区域
+- 打开时把每块屏幕截一次图，缓存为 QPixmap 作为冻结的背景；选择期间不再截图
+- 拖动时只重绘新旧选框（含边框和尺寸标签）的并集，多块 4K 屏上也不卡顿
+- 选择完成时从冻结的画面中裁出选区一并发出，翻译可以直接使用，不用再截一次
 """
 
+from PIL import Image
 from PyQt5.QtWidgets import QWidget, QApplication
-from PyQt5.QtCore import Qt, QRect, QPoint, pyqtSignal
-from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QCursor
+from PyQt5.QtCore import Qt, QRect, QRectF, QPoint, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QFontMetrics, QCursor, QImage, QPixmap, QRegion
+
+MASK_COLOR = QColor(0, 0, 0, 80)
+BORDER_COLOR = QColor(0, 200, 80)
+BORDER_WIDTH = 2
+HINT_TEXT = "\n\n🖱️ 按住鼠标拖动选择翻译区域  |  按 ESC 取消"
+
+
+def screen_physical_rect(screen) -> QRect:
+    """屏幕在 mss 物理像素坐标中的矩形（Qt5 高 DPI 下原点为物理坐标、尺寸按缩放比换算）"""
+    geo = screen.geometry()
+    ratio = screen.devicePixelRatio()
+    return QRect(geo.x(), geo.y(), round(geo.width() * ratio), round(geo.height() * ratio))
+
+
+class _FrozenScreen:
+    """一块屏幕的冻结画面"""
+
+    def __init__(self, screen, pixmap: QPixmap):
+        self.geometry = screen.geometry()              # 逻辑坐标
+        self.ratio = screen.devicePixelRatio()
+        self.physical = screen_physical_rect(screen)   # 物理坐标
+        self.pixmap = pixmap                           # 物理分辨率
+
+    def source_rect(self, logical: QRect) -> QRectF:
+        """屏幕内的逻辑矩形 → pixmap 中的像素矩形"""
+        r = self.ratio
+        return QRectF((logical.x() - self.geometry.x()) * r, (logical.y() - self.geometry.y()) * r,
+                      logical.width() * r, logical.height() * r)
 
 
 class RegionSelector(QWidget):
     """
-    全屏半透明覆盖层
+    全屏覆盖层
     用户拖动鼠标框选需要翻译的屏幕区域
-    选择完成后发出 region_selected 信号
+    选择完成后发出 region_selected 信号（物理坐标 + 冻结画面中的选区图片）
     """
-    region_selected = pyqtSignal(int, int, int, int)  # x, y, w, h
+    region_selected = pyqtSignal(int, int, int, int, object)  # x, y, w, h, PIL.Image（截图失败时为 None）
+    closed = pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, capture=None, parent=None):
+        """
+        :param capture: ScreenCapture；为 None 或截图失败时退化为半透明遮罩（不提供冻结画面）
+        """
         super().__init__(parent)
         self.setWindowTitle("选择翻译区域")
         self.setWindowFlags(
@@ -24,77 +60,185 @@ class RegionSelector(QWidget):
             | Qt.WindowStaysOnTopHint
             | Qt.Tool
         )
-        self.setAttribute(Qt.WA_TranslucentBackground)
         self.setCursor(QCursor(Qt.CrossCursor))
 
         # 获取所有屏幕的合并几何区域
         screen_geo = QApplication.desktop().geometry()
         self.setGeometry(screen_geo)
 
-        self._start_pos = QPoint()
+        self._start_pos = QPoint()   # 全局逻辑坐标
         self._end_pos = QPoint()
         self._selecting = False
+        self._dirty = QRect()        # 上一次绘制的选框区域（窗口坐标）
+        self._label_font = QFont("Microsoft YaHei", 10)
+        self._hint_font = QFont("Microsoft YaHei", 14)
+        self._label_metrics = QFontMetrics(self._label_font)
+
+        self._screens = self._freeze(capture) if capture is not None else []
+        if self._screens:
+            # 冻结画面完全覆盖窗口，不需要合成透明背景，也不需要 Qt 先擦除
+            self.setAttribute(Qt.WA_OpaquePaintEvent)
+        else:
+            self.setAttribute(Qt.WA_TranslucentBackground)
+
+    # ------------------------------------------------------------------ #
+    #  冻结画面
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _freeze(capture):
+        """每块屏幕按物理分辨率截一次图，转成 QPixmap 缓存"""
+        screens = []
+        try:
+            for screen in QApplication.screens():
+                phys = screen_physical_rect(screen)
+                img = capture.capture_region(phys.x(), phys.y(), phys.width(), phys.height())
+                data = img.tobytes("raw", "BGRX")
+                # QImage 不持有 data；copy() 得到 Qt 自己的缓冲区（光栅后端的 QPixmap 会直接共享它）
+                qimg = QImage(data, img.width, img.height, img.width * 4, QImage.Format_RGB32).copy()
+                screens.append(_FrozenScreen(screen, QPixmap.fromImage(qimg)))
+        except Exception as e:
+            print(f"[区域] 冻结画面截图失败，改用透明遮罩: {e}")
+            return []
+        return screens
+
+    def frame_region(self, x: int, y: int, w: int, h: int):
+        """
+        从冻结画面中取物理坐标矩形的像素（跨屏时按各屏物理坐标拼接，与 mss 截同一矩形一致）
+        :return: PIL.Image；没有冻结画面时返回 None
+        """
+        if not self._screens:
+            return None
+        target = QRect(x, y, w, h)
+        out = QImage(w, h, QImage.Format_RGB32)
+        out.fill(Qt.black)
+        painter = QPainter(out)
+        for s in self._screens:
+            part = target.intersected(s.physical)
+            if part.isEmpty():
+                continue
+            painter.drawPixmap(part.topLeft() - target.topLeft(), s.pixmap,
+                               part.translated(-s.physical.topLeft()))
+        painter.end()
+        bits = out.constBits()
+        bits.setsize(out.byteCount())
+        return Image.frombytes("RGB", (w, h), bits.asstring(), "raw", "BGRX", out.bytesPerLine(), 1)
+
+    # ------------------------------------------------------------------ #
+    #  绘制
+    # ------------------------------------------------------------------ #
+    def _selection(self) -> QRect:
+        """当前选框（窗口坐标）"""
+        origin = self.geometry().topLeft()
+        return QRect(self._start_pos - origin, self._end_pos - origin).normalized()
+
+    def _label_rect(self, rect: QRect) -> QRect:
+        fm = self._label_metrics
+        text = f"{rect.width()} × {rect.height()}"
+        return QRect(rect.x(), rect.y() - 6 - fm.ascent(), fm.horizontalAdvance(text) + 2, fm.height())
+
+    def _selection_dirty_rect(self, rect: QRect) -> QRect:
+        """选框 + 边框 + 尺寸标签占用的区域"""
+        pad = BORDER_WIDTH
+        return rect.adjusted(-pad, -pad, pad, pad).united(self._label_rect(rect))
+
+    def _refresh_selection(self):
+        """只重绘新旧选框的并集"""
+        new = self._selection_dirty_rect(self._selection()) if self._selecting else QRect()
+        self.update(new.united(self._dirty))
+        self._dirty = new
 
     def paintEvent(self, event):
         painter = QPainter(self)
-
-        # 半透明遮罩
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 80))
-
-        if self._selecting and not self._start_pos.isNull() and not self._end_pos.isNull():
-            rect = QRect(self._start_pos, self._end_pos).normalized()
-
-            # 清除选区内的遮罩（让选区变亮）
-            painter.setCompositionMode(QPainter.CompositionMode_Clear)
-            painter.fillRect(rect, Qt.transparent)
+        area = event.rect()
+        selecting = self._selecting and not self._start_pos.isNull() and not self._end_pos.isNull()
+        rect = self._selection() if selecting else QRect()
+
+        if self._screens:
+            # 冻结画面 + 选区外的遮罩，只画需要更新的部分
+            origin = self.geometry().topLeft()
+            for s in self._screens:
+                part = s.geometry.translated(-origin).intersected(area)
+                if not part.isEmpty():
+                    painter.drawPixmap(QRectF(part), s.pixmap, s.source_rect(part.translated(origin)))
+            mask = QRegion(area)
+            if not rect.isEmpty():
+                mask = mask.subtracted(QRegion(rect))
+            painter.save()
+            painter.setClipRegion(mask)
+            painter.fillRect(area, MASK_COLOR)
+            painter.restore()
+        else:
+            # 半透明遮罩，清除选区内的遮罩（让选区变亮）
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.fillRect(area, MASK_COLOR)
+            if not rect.isEmpty():
+                painter.fillRect(rect.intersected(area), Qt.transparent)
             painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
 
+        if not rect.isEmpty():
             # 绿色边框
-            pen = QPen(QColor(0, 200, 80), 2, Qt.SolidLine)
+            pen = QPen(BORDER_COLOR, BORDER_WIDTH, Qt.SolidLine)
             painter.setPen(pen)
             painter.drawRect(rect)
 
             # 显示尺寸标签
             size_text = f"{rect.width()} × {rect.height()}"
             painter.setPen(QColor(255, 255, 255))
-            painter.setFont(QFont("Microsoft YaHei", 10))
+            painter.setFont(self._label_font)
             painter.drawText(rect.x(), rect.y() - 6, size_text)
 
-        # 提示文字
+        # 提示文字（绘制自动裁剪到更新区域）
         painter.setPen(QColor(255, 255, 255, 200))
-        painter.setFont(QFont("Microsoft YaHei", 14))
-        painter.drawText(self.rect(), Qt.AlignTop | Qt.AlignHCenter,
-                         "\n\n🖱️ 按住鼠标拖动选择翻译区域  |  按 ESC 取消")
+        painter.setFont(self._hint_font)
+        painter.drawText(self.rect(), Qt.AlignTop | Qt.AlignHCenter, HINT_TEXT)
 
+    # ------------------------------------------------------------------ #
+    #  鼠标 / 键盘
+    # ------------------------------------------------------------------ #
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self._start_pos = event.globalPos()
             self._end_pos = event.globalPos()
             self._selecting = True
-            self.update()
+            self._refresh_selection()
 
     def mouseMoveEvent(self, event):
         if self._selecting:
             self._end_pos = event.globalPos()
-            self.update()
+            self._refresh_selection()
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton and self._selecting:
             self._selecting = False
             rect = QRect(self._start_pos, self._end_pos).normalized()
             if rect.width() > 10 and rect.height() > 10:
-                # 获取 DPI 缩放比例，将逻辑坐标转为物理像素坐标
-                # mss 使用物理像素，Qt 高 DPI 模式下返回逻辑坐标
-                ratio = self.devicePixelRatioF()
-                px = int(rect.x() * ratio)
-                py = int(rect.y() * ratio)
-                pw = int(rect.width() * ratio)
-                ph = int(rect.height() * ratio)
+                px, py, pw, ph, ratio = self.to_physical(rect)
                 print(f"[区域] 逻辑坐标: ({rect.x()}, {rect.y()}) {rect.width()}x{rect.height()}")
                 print(f"[区域] 物理像素: ({px}, {py}) {pw}x{ph}  (缩放比: {ratio})")
-                self.region_selected.emit(px, py, pw, ph)
+                self.region_selected.emit(px, py, pw, ph, self.frame_region(px, py, pw, ph))
             self.close()
 
+    @staticmethod
+    def to_physical(rect: QRect):
+        """
+        逻辑坐标 → mss 使用的物理像素坐标
+        按选区中心所在屏幕的缩放比换算；Qt5 高 DPI 模式下每块屏幕的原点保持物理坐标、
+        尺寸按该屏幕缩放，所以要以屏幕原点为基准缩放偏移量，而不是整体乘一个缩放比
+        :return: (x, y, w, h, ratio)
+        """
+        screen = QApplication.screenAt(rect.center()) or QApplication.primaryScreen()
+        geo = screen.geometry()
+        ratio = screen.devicePixelRatio()
+        px = geo.x() + round((rect.x() - geo.x()) * ratio)
+        py = geo.y() + round((rect.y() - geo.y()) * ratio)
+        return px, py, round(rect.width() * ratio), round(rect.height() * ratio), ratio
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape:
             self.close()
+
+    def closeEvent(self, event):
+        # 释放冻结画面（多块 4K 屏时约数百 MB）
+        self._screens = []
+        self.closed.emit()
+        super().closeEvent(event)
@@ -0,0 +1,172 @@
+"""
+请求韧性模块
+- Deadline：一次翻译的分阶段时限（连接 / 首 token / 总耗时）
+- RetryBudget：重试预算，重试次数不超过请求量的固定比例，避免故障时重试风暴
+- CircuitBreaker：端点连续失败后熔断，冷却期内直接快速失败
+- backoff_delay / is_transient：带抖动的指数退避、瞬时错误判定
+"""
+
+import time
+import random
+import threading
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+
+class DeadlineExceeded(Exception):
+    """超过本次翻译的总时限"""
+
+
+class FirstTokenTimeout(Exception):
+    """在首 token 时限内没有收到任何内容"""
+
+
+class CircuitOpenError(Exception):
+    """端点已熔断，快速失败"""
+
+
+# ====================================================================== #
+#  分阶段时限
+# ====================================================================== #
+class Deadline:
+    """
+    一次翻译请求的时限
+    :param connect: 建立连接的时限（秒）
+    :param first_token: 发出请求到收到首个内容的时限（秒）
+    :param total: 整个翻译（含重试）的总时限（秒）
+    """
+
+    def __init__(self, connect: float = 3.0, first_token: float = 15.0, total: float = 45.0):
+        self.connect = connect
+        self.first_token = first_token
+        self.total = total
+        self._expires_at = time.monotonic() + total
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"超过总时限 {self.total:.0f}s")
+
+
+# ====================================================================== #
+#  重试预算
+# ====================================================================== #
+class RetryBudget:
+    """
+    令牌式重试预算：每个请求存入 ratio 个令牌，每次重试消耗 1 个
+    最多累积 max_tokens 个，保证故障期间重试流量有上限
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 5.0, initial: float = 2.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min(initial, max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+# ====================================================================== #
+#  熔断器
+# ====================================================================== #
+class CircuitBreaker:
+    """
+    closed → 连续失败 failure_threshold 次 → open（冷却 cooldown 秒，期间直接拒绝）
+    → half_open（只放行一个探测请求）→ 成功则 closed，失败则重新 open
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """是否放行本次请求"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """探测请求被取消、没有结果时调用，让下一个请求可以重新探测"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+# ====================================================================== #
+#  工具函数
+# ====================================================================== #
+def backoff_delay(retry_index: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """全抖动指数退避：[0, min(cap, base * 2^n)] 内均匀随机"""
+    return random.uniform(0.0, min(cap, base * (2 ** retry_index)))
+
+
+def is_transient(exc: BaseException) -> bool:
+    """判断是否值得重试的瞬时错误（超时、连接失败、429、5xx）"""
+    if isinstance(exc, (FirstTokenTimeout, TimeoutError, ConnectionError)):
+        return True
+    if openai is not None:
+        if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError,
+                            openai.RateLimitError, openai.InternalServerError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
@@ -0,0 +1,187 @@
+"""
+模型路由模块
+按截图的文字量选择模型：文字少的帧走小而快的视觉模型，文字多的帧走大模型
+- 先用默认阈值（行数 / 密度）决策
+- 每次翻译记录耗时和粗略质量分，按行数分桶统计；
+  某个桶里小模型质量达标且确实更快就继续用小模型，否则切回大模型
+- 统计按文件在进程内只有一份（RoutingStats），配置变更重建的路由器共用它，不会互相覆盖
+"""
+
+import os
+import json
+import random
+import threading
+
+from config import atomic_write_json
+from image_analysis import TextFeatures
+
+ROUTING_STATS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_stats.json")
+
+# 行数分桶上界（含）；最后一桶为无穷大
+LINE_BUCKETS = (1, 3, 7, 15, 31)
+NO_TEXT_REPLY = "（无文字内容）"
+
+
+def line_bucket(lines: int) -> str:
+    for upper in LINE_BUCKETS:
+        if lines <= upper:
+            return f"<={upper}"
+    return f">{LINE_BUCKETS[-1]}"
+
+
+def estimate_quality(features: TextFeatures, result: str) -> float:
+    """
+    粗略质量分（0~1）：模型输出的原文行数与本地估计的文字行数之比
+    有字却回复"无文字"、或者漏译大量行时分数低
+    """
+    if features is None or features.lines == 0:
+        return 1.0
+    text = result.strip()
+    if not text or text == NO_TEXT_REPLY:
+        return 0.0
+    # 输出是 "原文/译文" 成对出现，行数约为文字行数的 2 倍
+    out_lines = sum(1 for l in text.splitlines() if l.strip() and l.strip() != "---")
+    return min(1.0, (out_lines / 2.0) / features.lines)
+
+
+class _BucketStats:
+    """某个行数桶内某个模型的滑动平均耗时 / 质量"""
+
+    ALPHA = 0.2   # 指数滑动平均系数
+
+    def __init__(self, n=0, latency=0.0, quality=0.0):
+        self.n = n
+        self.latency = latency
+        self.quality = quality
+
+    def add(self, latency: float, quality: float):
+        if self.n == 0:
+            self.latency, self.quality = latency, quality
+        else:
+            self.latency += self.ALPHA * (latency - self.latency)
+            self.quality += self.ALPHA * (quality - self.quality)
+        self.n += 1
+
+    def to_dict(self):
+        return {"n": self.n, "latency": round(self.latency, 3), "quality": round(self.quality, 3)}
+
+
+class RoutingStats:
+    """
+    路由统计：{行数桶: {模型: _BucketStats}}，读写加锁，每次记录后整体原子写回文件
+    同一文件在进程内只应有一个实例，用 stats_store() 获取
+    """
+
+    def __init__(self, path: str = ROUTING_STATS_FILE):
+        self.path = path
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._load()
+
+    def get(self, bucket: str, model: str):
+        with self._lock:
+            return self._stats.get(bucket, {}).get(model)
+
+    def add(self, bucket: str, model: str, latency: float, quality: float):
+        with self._save_lock:
+            with self._lock:
+                self._stats.setdefault(bucket, {}).setdefault(model, _BucketStats()).add(latency, quality)
+                snapshot = {b: {m: s.to_dict() for m, s in ms.items()} for b, ms in self._stats.items()}
+            # 在 _save_lock 内写：并发记录时后取的快照一定后写，文件不会退回旧状态
+            try:
+                atomic_write_json(self.path, snapshot)
+            except Exception as e:
+                print(f"[路由] 统计保存失败: {e}")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self._stats = {
+                b: {m: _BucketStats(**s) for m, s in ms.items()} for b, ms in saved.items()
+            }
+        except Exception:
+            self._stats = {}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def stats_store(path: str = ROUTING_STATS_FILE) -> RoutingStats:
+    """进程内按文件共享的统计实例"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = RoutingStats(path)
+        return store
+
+
+class ModelRouter:
+    """
+    :param heavy_model: 大模型（默认配置的 model）
+    :param light_model: 小模型；为空时不做路由，始终用大模型
+    :param max_lines / max_density: 统计不足时的默认阈值，不超过则走小模型
+    """
+
+    MIN_SAMPLES = 3
+    MIN_QUALITY = 0.8
+    EXPLORE_RATE = 0.1    # 有统计后仍按此概率试另一个模型，避免某个桶的结论永远不更新
+
+    def __init__(self, heavy_model: str, light_model: str = "",
+                 max_lines: int = 6, max_density: float = 0.06,
+                 stats_path: str = ROUTING_STATS_FILE):
+        self.heavy_model = heavy_model
+        self.light_model = light_model
+        self.max_lines = max_lines
+        self.max_density = max_density
+        self._stats = stats_store(stats_path)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.light_model) and self.light_model != self.heavy_model
+
+    # ---- 决策 ----
+    def route(self, features: TextFeatures) -> str:
+        """返回本帧应使用的模型名，并打印路由原因"""
+        if not self.enabled or features is None:
+            return self.heavy_model
+        bucket = line_bucket(features.lines)
+        light = self._stats.get(bucket, self.light_model)
+        heavy = self._stats.get(bucket, self.heavy_model)
+
+        if light is not None and light.n >= self.MIN_SAMPLES:
+            if light.quality < self.MIN_QUALITY:
+                model, reason = self.heavy_model, f"小模型质量 {light.quality:.2f} 不达标"
+            elif heavy is not None and heavy.n >= self.MIN_SAMPLES and light.latency >= heavy.latency:
+                model, reason = self.heavy_model, "小模型并不更快"
+            else:
+                model, reason = self.light_model, f"小模型质量 {light.quality:.2f} 达标"
+            if random.random() < self.EXPLORE_RATE:
+                model = self.light_model if model == self.heavy_model else self.heavy_model
+                reason = "探索"
+        elif features.lines <= self.max_lines and features.density <= self.max_density:
+            model, reason = self.light_model, "默认阈值：文字较少"
+        else:
+            model, reason = self.heavy_model, "默认阈值：文字较多"
+
+        print(f"[路由] {features.lines} 行, 密度 {features.density:.3f} (桶 {bucket}) "
+              f"→ {model}（{reason}）")
+        return model
+
+    # ---- 学习 ----
+    def record(self, features: TextFeatures, model: str, latency: float, result: str):
+        """
+        记录一次翻译的耗时和质量，用于后续阈值调整
+        :param model: 实际给出结果的模型（对冲到显式配置了模型的备用端点时与路由选的不同）
+        """
+        if not self.enabled or features is None:
+            return
+        quality = estimate_quality(features, result)
+        bucket = line_bucket(features.lines)
+        print(f"[路由] 记录 {model} 桶 {bucket}: 耗时 {latency:.2f}s, 质量 {quality:.2f}")
+        self._stats.add(bucket, model, latency, quality)
@@ -0,0 +1,145 @@
+"""
+滚动检测模块
+连续阅读长页面时，用户往下滚几行再按热键，新截图大部分是上一帧整体上移后的内容
+- 用分块行剖面做 FFT 互相关，一次求出所有位移下的误差，取最小者再逐行比对灰度图确认
+- 确认是向下滚动后，只把新露出的底部条带发给模型，悬浮窗在原译文后追加
+"""
+
+from PIL import Image
+
+from image_analysis import np, to_gray_array, row_ink_profile, find_text_lines
+
+
+class ScrollPlan:
+    """
+    本次截图的翻译计划
+    kind: "full"  整帧翻译
+          "same"  与上一帧相同，直接沿用上次结果
+          "strip" 只翻译 strip（新露出的底部条带），shift 为内容上移的像素数
+    """
+
+    def __init__(self, kind: str, image: Image.Image, shift: int = 0):
+        self.kind = kind
+        self.image = image
+        self.shift = shift
+
+    def __repr__(self):
+        return f"ScrollPlan({self.kind}, shift={self.shift}, size={self.image.size})"
+
+
+def _row_signature(gray, blocks: int = 32):
+    """行剖面：每行按列分成 blocks 段取均值，得到 (h, blocks) 的行签名"""
+    h, w = gray.shape
+    blocks = max(1, min(blocks, w))
+    bw = w // blocks
+    return gray[:, :bw * blocks].reshape(h, blocks, bw).mean(axis=2)
+
+
+def _lag_mse(prev_sig, new_sig):
+    """
+    所有位移下的行签名均方误差（FFT 互相关，一次算完）
+    mse[s] = mean((prev[s + n] - new[n])^2)，n ∈ [0, h - s)
+    """
+    h, b = prev_sig.shape
+    n = 2 * h   # 补零到 2h，避免循环相关回绕
+    cross = np.fft.irfft(
+        (np.fft.rfft(prev_sig, n=n, axis=0) * np.conj(np.fft.rfft(new_sig, n=n, axis=0))).sum(axis=1),
+        n=n,
+    )[:h]
+    p2 = (prev_sig ** 2).sum(axis=1)
+    q2 = (new_sig ** 2).sum(axis=1)
+    p_suffix = np.cumsum(p2[::-1])[::-1]           # Σ_{i>=s} p2[i]
+    q_prefix = np.cumsum(q2)                        # Σ_{i<=k} q2[i]
+    lags = np.arange(h)
+    ssd = p_suffix + q_prefix[h - lags - 1] - 2.0 * cross
+    return np.maximum(ssd, 0.0) / ((h - lags) * b)
+
+
+def _nearly_equal(a, b, pixel_tolerance: int = 32, max_diff_pixels: int = 64) -> bool:
+    """
+    确认滚动重叠用：明显不同的像素不超过 max_diff_pixels 个
+    （容忍闪烁的光标之类的小改动；不能用来判断"内容未变"，改一两个字也在容忍范围内）
+    """
+    return int((np.abs(a - b) > pixel_tolerance).sum()) <= max_diff_pixels
+
+
+def _identical(a, b, pixel_tolerance: int = 2) -> bool:
+    """两帧内容相同：每个像素都只有渲染抖动级别的差异，改一个字就不算相同"""
+    return int(np.abs(a - b).max(initial=0)) <= pixel_tolerance
+
+
+def detect_scroll(prev, new, max_fraction: float = 0.8, min_overlap_rows: int = 12):
+    """
+    检测 new 相对 prev 的向上位移行数（内容上移 = 页面向下滚动）
+    :param prev, new: 同尺寸的灰度数组（int16）
+    :return: 位移行数；0 表示两帧相同；None 表示无法可靠匹配
+    """
+    if prev.shape != new.shape:
+        return None
+    h = prev.shape[0]
+    if _identical(prev, new):
+        return 0
+    max_shift = min(h - min_overlap_rows, int(h * max_fraction))
+    if max_shift < 1:
+        return None
+
+    mse = _lag_mse(_row_signature(prev).astype(np.float64), _row_signature(new).astype(np.float64))
+    shift = int(np.argmin(mse[1:max_shift + 1])) + 1
+
+    # 整图确认：重叠部分必须有文字（全空白无法判断位移），且逐像素几乎一致
+    overlap_new = new[:h - shift]
+    if not (row_ink_profile(overlap_new) > 0.01).any():
+        return None
+    if not _nearly_equal(prev[shift:], overlap_new):
+        return None
+    return shift
+
+
+class ScrollTracker:
+    """记住上一次成功翻译的帧，为下一次截图生成翻译计划"""
+
+    def __init__(self):
+        self._gray = None
+        self._factor = 1
+        self._key = None
+
+    def reset(self):
+        self._gray = None
+        self._key = None
+
+    def plan(self, img: Image.Image, region_key) -> ScrollPlan:
+        """
+        :param region_key: 截图区域标识；区域变化时总是整帧翻译
+        """
+        if np is None or self._gray is None or region_key != self._key:
+            return ScrollPlan("full", img)
+        gray, factor = to_gray_array(img)
+        if factor != self._factor:
+            return ScrollPlan("full", img)
+        shift = detect_scroll(self._gray, gray)
+        if shift is None:
+            return ScrollPlan("full", img)
+        if shift == 0:
+            return ScrollPlan("same", img)
+
+        # 新露出的条带从 h - shift 行开始（即上一帧的底边）；若有文字行跨越这条边，
+        # 说明上一帧只截到了它的上半部分，条带上扩到该行顶部
+        h = gray.shape[0]
+        boundary = h - shift
+        for start, end in find_text_lines(row_ink_profile(gray)):
+            if start < boundary < end:
+                boundary = start
+                break
+        top = max(0, boundary - 2) * factor
+        if top <= 0:
+            return ScrollPlan("full", img)
+        strip = img.crop((0, top, img.width, img.height))
+        print(f"[滚动] 内容上移 {shift * factor}px，只翻译底部 {img.height - top}px 条带")
+        return ScrollPlan("strip", strip, shift * factor)
+
+    def commit(self, img: Image.Image, region_key):
+        """翻译成功后记录这一帧，作为下一次比对的基准"""
+        if np is None:
+            return
+        self._gray, self._factor = to_gray_array(img)
+        self._key = region_key
@@ -0,0 +1,104 @@
+"""
+JSON 行输出协议解析模块
+模型每个原文片段输出一个 JSON 对象：{"src": "原文", "tgt": "译文"}
+JsonLinesParser 边接收流式文本边解析，每个对象一闭合就产出一对 (原文, 译文)
+- 容忍代码块标记、对象前后的杂散文字、对象跨 chunk 或一行多个对象
+- 解析不出任何对象时由调用方回退到原来的纯文本格式
+"""
+
+import json
+
+SRC_KEYS = ("src", "source", "original", "o")
+TGT_KEYS = ("tgt", "target", "translation", "t")
+
+
+def _pick(obj: dict, keys):
+    for k in keys:
+        v = obj.get(k)
+        if isinstance(v, str):
+            return v
+    return None
+
+
+class JsonLinesParser:
+    """
+    增量解析器：feed() 返回本次新闭合的 (原文, 译文) 列表
+    指定 targets（多目标语言）时译文为 {目标语言: 译文}，tgt 是以语言名为键的对象
+    """
+
+    def __init__(self, targets=None):
+        self.targets = tuple(targets) if targets else None
+        self.pairs = []
+        self._buf = []
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+
+    def feed(self, text: str):
+        new_pairs = []
+        for ch in text:
+            if self._depth == 0:
+                # 对象外：跳过代码块标记、换行、杂散文字，直到遇到 "{"
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                continue
+
+            self._buf.append(ch)
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    pair = self._parse_object("".join(self._buf))
+                    self._buf = []
+                    if pair is not None:
+                        self.pairs.append(pair)
+                        new_pairs.append(pair)
+        return new_pairs
+
+    def _parse_object(self, raw: str):
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            return None
+        if not isinstance(obj, dict):
+            return None
+        if self.targets is not None:
+            return self._parse_multi(obj)
+        src, tgt = _pick(obj, SRC_KEYS), _pick(obj, TGT_KEYS)
+        if src is None and tgt is None:
+            return None
+        return (src or "").strip(), (tgt or "").strip()
+
+
+    def _parse_multi(self, obj: dict):
+        """{"src": ..., "tgt": {语言: 译文}}；模型把语言键直接放在顶层时也接受"""
+        src = _pick(obj, SRC_KEYS)
+        tgt = next((obj[k] for k in TGT_KEYS if isinstance(obj.get(k), dict)), obj)
+        texts = {}
+        for lang in self.targets:
+            value = tgt.get(lang)
+            texts[lang] = value.strip() if isinstance(value, str) else ""
+        if src is None and not any(texts.values()):
+            return None
+        return (src or "").strip(), texts
+
+
+def split_by_target(pairs, targets) -> dict:
+    """多目标语言的 [(原文, {语言: 译文})] → {语言: [(原文, 译文)]}"""
+    return {lang: [(src, texts.get(lang, "")) for src, texts in pairs] for lang in targets}
+
+
+def pairs_to_text(pairs) -> str:
+    """把 (原文, 译文) 列表转成原有的纯文本对照格式，供只认文本的调用方使用"""
+    return "\n\n---\n\n".join(f"{src}\n{tgt}" for src, tgt in pairs)
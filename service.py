@@ -0,0 +1,404 @@
+"""
+本地共享翻译服务
+多人共用一台机器（共享终端、远程桌面会话）时，各实例各自建连接、各自翻译同样的画面
+以守护进程方式运行本模块，所有客户端共用：
+- 一组翻译器（每个模型一个，内部复用同一个 HTTP 连接池）
+- 一个结果缓存（按图片像素 + 语言对 + 模型；多目标语言的结果按语言分别缓存）
+- 单飞合并：相同的图片同时提交时只发一次上游请求，其余请求等待并共享结果
+
+协议（HTTP/1.1，保持连接）：
+  POST /translate?source_lang=英语&target_lang=中文&model=xxx&width=W&height=H
+       请求体为 RGB 原始像素（W*H*3 字节），本机回环传输比先编码 PNG 更快
+       返回 {"text": 译文, "cached": 是否命中缓存, "shared": 是否合并到他人的请求}
+       target_lang 重复多次（多目标语言）时一次请求翻译所有语言，只有缓存缺的语言才发上游，
+       返回 {"texts": {目标语言: 译文}, "cached": [命中缓存的语言], "shared": ...}
+  GET  /stats  返回计数
+
+启动：python service.py [--host 127.0.0.1] [--port 8765]
+GUI 在配置中设置 service_url（如 http://127.0.0.1:8765）后作为瘦客户端使用
+"""
+
+import sys
+import json
+import hashlib
+import argparse
+import threading
+import http.client
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, urlencode, parse_qs
+
+from PIL import Image
+
+from config import Config
+from metrics import Metrics
+from translator import build_translator
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024   # 单次请求最大像素数据（约 7680x2800 RGB）
+
+
+# ====================================================================== #
+#  单飞合并 + 结果缓存
+# ====================================================================== #
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """相同 key 的并发调用只执行一次，其余调用等待并共享结果（或异常）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """:return: (结果, 是否共享了他人的调用)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class ResultCache:
+    """线程安全的 LRU 缓存"""
+
+    def __init__(self, max_entries: int = 256):
+        self._max = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def image_key(pixels: bytes, width: int, height: int, source_lang: str, target_lang: str,
+              model: str) -> str:
+    """图片像素 + 翻译参数的摘要，作为缓存和合并的 key"""
+    h = hashlib.blake2b(pixels, digest_size=16)
+    h.update(f"|{width}x{height}|{source_lang}|{target_lang}|{model}".encode("utf-8"))
+    return h.hexdigest()
+
+
+# ====================================================================== #
+#  服务端
+# ====================================================================== #
+class TranslationService:
+    """共享的翻译器、缓存和单飞合并；HTTP 处理器只负责收发"""
+
+    def __init__(self, config: Config, cache_entries: int = 256):
+        self.config = config
+        self.cache = ResultCache(cache_entries)
+        self.flight = SingleFlight()
+        self.metrics = Metrics()
+        self._lock = threading.Lock()
+        self._translators = {}
+
+    def translator(self, model: str):
+        model = model or self.config.model
+        with self._lock:
+            t = self._translators.get(model)
+            if t is None:
+                t = self._translators[model] = build_translator(self.config, model)
+            return t
+
+    def translate(self, pixels: bytes, width: int, height: int,
+                  source_lang: str, target_lang: str, model: str = ""):
+        """:return: (译文, 是否命中缓存, 是否合并到他人的请求)"""
+        model = model or self.config.model
+        key = image_key(pixels, width, height, source_lang, target_lang, model)
+        self.metrics.add("requests")
+        text = self.cache.get(key)
+        if text is not None:
+            self.metrics.add("cache_hits")
+            return text, True, False
+
+        def run():
+            img = Image.frombuffer("RGB", (width, height), pixels, "raw", "RGB", 0, 1)
+            result = self.translator(model).translate_image(img, source_lang, target_lang)
+            self.cache.put(key, result)
+            self.metrics.add("upstream_requests")
+            return result
+
+        text, shared = self.flight.do(key, run)
+        if shared:
+            self.metrics.add("coalesced")
+        return text, False, shared
+
+    def translate_multi(self, pixels: bytes, width: int, height: int,
+                        source_lang: str, target_langs, model: str = ""):
+        """
+        多目标语言：逐语言查缓存，缺的语言合并成一次上游请求
+        :return: ({目标语言: 译文}, [命中缓存的语言], 是否合并到他人的请求)
+        """
+        model = model or self.config.model
+        targets = tuple(dict.fromkeys(target_langs))
+        keys = {lang: image_key(pixels, width, height, source_lang, lang, model) for lang in targets}
+        self.metrics.add("requests")
+        texts = {}
+        for lang in targets:
+            text = self.cache.get(keys[lang])
+            if text is not None:
+                texts[lang] = text
+        cached = list(texts)
+        missing = tuple(lang for lang in targets if lang not in texts)
+        if not missing:
+            self.metrics.add("cache_hits")
+            return texts, cached, False
+
+        def run():
+            img = Image.frombuffer("RGB", (width, height), pixels, "raw", "RGB", 0, 1)
+            result = self.translator(model).translate_image_multi(img, source_lang, missing)
+            for lang, text in result.items():
+                self.cache.put(keys[lang], text)
+            self.metrics.add("upstream_requests")
+            return result
+
+        flight_key = "|".join([keys[lang] for lang in missing])
+        result, shared = self.flight.do(flight_key, run)
+        if shared:
+            self.metrics.add("coalesced")
+        texts.update(result)
+        return {lang: texts[lang] for lang in targets}, cached, shared
+
+    def stats(self) -> dict:
+        s = self.metrics.snapshot()
+        s["cache_entries"] = len(self.cache)
+        s["in_flight"] = self.flight.in_flight()
+        return s
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: TranslationService = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/stats":
+            self._reply(200, self.service.stats())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/translate":
+            self._reply(404, {"error": "not found"})
+            return
+        query = parse_qs(url.query)
+        q = {k: v[0] for k, v in query.items()}
+        try:
+            width, height = int(q["width"]), int(q["height"])
+            length = int(self.headers.get("Content-Length") or 0)
+        except (KeyError, ValueError):
+            self._reply(400, {"error": "需要 width / height 参数和 Content-Length"})
+            return
+        if length != width * height * 3 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._reply(400, {"error": f"像素数据长度 {length} 与 {width}x{height} RGB 不符"})
+            return
+        pixels = self.rfile.read(length)
+        targets = query.get("target_lang", [])
+        if len(targets) > 1:
+            try:
+                texts, cached, shared = self.service.translate_multi(
+                    pixels, width, height,
+                    q.get("source_lang", self.service.config.source_lang),
+                    targets, q.get("model", ""),
+                )
+            except Exception as e:
+                print(f"[服务] 翻译失败: {e}")
+                self._reply(502, {"error": str(e)[:500]})
+                return
+            self._reply(200, {"texts": texts, "cached": cached, "shared": shared})
+            return
+        try:
+            text, cached, shared = self.service.translate(
+                pixels, width, height,
+                q.get("source_lang", self.service.config.source_lang),
+                q.get("target_lang", self.service.config.target_lang),
+                q.get("model", ""),
+            )
+        except Exception as e:
+            print(f"[服务] 翻译失败: {e}")
+            self._reply(502, {"error": str(e)[:500]})
+            return
+        self._reply(200, {"text": text, "cached": cached, "shared": shared})
+
+
+def serve(config: Config, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    """启动服务（阻塞）；返回前不会退出"""
+    service = TranslationService(config)
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"[服务] 共享翻译服务已启动: http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[服务] 已停止, 统计: {service.stats()}")
+
+
+# ====================================================================== #
+#  瘦客户端
+# ====================================================================== #
+class ServiceError(Exception):
+    """共享服务返回错误"""
+
+
+class ServiceClient:
+    """
+    与 AITranslator.translate_image 同签名的瘦客户端，GUI 可直接替换使用
+    一个客户端保持一条连接；不支持流式片段回调（结果一次返回）
+    """
+
+    def __init__(self, url: str, model: str = "", timeout: float = 60.0):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or DEFAULT_PORT
+        self.model = model
+        self.timeout = timeout
+        self._lock = threading.Lock()   # 一条连接同一时间只发一个请求
+        self._conn = None
+        self._closed = False
+
+    def translate_image(self, img: Image.Image, source_lang: str, target_lang: str,
+                        on_segments=None) -> str:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        query = urlencode({
+            "source_lang": source_lang, "target_lang": target_lang, "model": self.model,
+            "width": img.width, "height": img.height,
+        })
+        status, payload = self._request(f"/translate?{query}", img.tobytes())
+        if status != 200:
+            raise ServiceError(payload.get("error") or f"HTTP {status}")
+        tag = "缓存" if payload.get("cached") else ("合并" if payload.get("shared") else "上游")
+        print(f"[服务] 翻译完成（{tag}）")
+        return payload["text"]
+
+    def translate_image_multi(self, img: Image.Image, source_lang: str, target_langs,
+                              on_segments=None) -> dict:
+        """多目标语言：一次提交，服务端按语言分别缓存"""
+        targets = list(dict.fromkeys(target_langs))
+        if len(targets) == 1:
+            return {targets[0]: self.translate_image(img, source_lang, targets[0])}
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        query = urlencode({
+            "source_lang": source_lang, "target_lang": targets, "model": self.model,
+            "width": img.width, "height": img.height,
+        }, doseq=True)
+        status, payload = self._request(f"/translate?{query}", img.tobytes())
+        if status != 200:
+            raise ServiceError(payload.get("error") or f"HTTP {status}")
+        cached = payload.get("cached") or []
+        print(f"[服务] 翻译完成（{len(targets)} 种语言，缓存命中: {'、'.join(cached) or '无'}）")
+        return payload["texts"]
+
+    def _request(self, path: str, body: bytes):
+        with self._lock:
+            try:
+                return self._post(path, body)
+            finally:
+                if self._closed:
+                    self._drop()       # 请求期间被 close()：用完即关
+
+    def _post(self, path: str, body: bytes):
+        """发送请求；复用的连接已被服务端关闭时重连一次"""
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request("POST", path, body=body,
+                                   headers={"Content-Type": "application/octet-stream"})
+                resp = self._conn.getresponse()
+                return resp.status, json.loads(resp.read() or b"{}")
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self._drop()
+                if attempt:
+                    raise
+            except Exception:
+                self._drop()
+                raise
+
+    def _drop(self):
+        """关闭连接；调用方须持有 _lock"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self):
+        """
+        关闭连接；可在其他线程的请求进行中调用（如 API 设置变化时由主线程调用）：
+        这时不打断、也不等待，由那次请求结束时关闭
+        """
+        self._closed = True
+        if self._lock.acquire(blocking=False):
+            try:
+                self._drop()
+            finally:
+                self._lock.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地共享翻译服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    serve(Config(), args.host, args.port)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+预翻译模块（可选）
+按下热键后仍要等一个完整的模型往返；开启后在后台提前翻译：
+- 每 0.5 秒截取默认预设的区域，用缩小的灰度图比较前后两帧
+- 画面变化后又稳定了 settle 秒、且结果缓存里还没有这一帧，就在后台翻译，结果放进按语言的结果缓存
+- 之后按热键截到的画面与之逐像素相同时直接命中缓存，立即显示
+- 按热键截图前会隐藏主窗口和悬浮窗；区域被这两个窗口挡住时的采样不可能与之相同，
+  而且悬浮窗每次刷新都像"画面变了又稳定"，所以被挡住期间不采样，移开后重新计时
+- 预算：预翻译消耗的（估计）输入 token 不超过总消耗的 budget 比例，超出就等用户自己的请求把比例拉下来
+- 统计按热键次数、命中次数、预翻译次数和浪费次数，每次按热键打印一行
+"""
+
+import time
+import threading
+
+from capture import ScreenCapture
+from image_analysis import np, to_gray_array
+from ratelimit import estimate_request_tokens
+from presets import DEFAULT_PRESET
+
+SAMPLE_INTERVAL = 0.5       # 采样间隔（秒）
+SAMPLE_HEIGHT = 120         # 比较用的灰度图高度上限
+PIXEL_TOLERANCE = 24        # 灰度差超过该值的像素视为变化
+MAX_CHANGED_PIXELS = 8      # 缩小后的灰度图中变化像素不超过该数视为画面未变（容忍光标闪烁）
+
+
+def frames_equal(a, b) -> bool:
+    if a.shape != b.shape:
+        return False
+    return int((np.abs(a - b) > PIXEL_TOLERANCE).sum()) <= MAX_CHANGED_PIXELS
+
+
+def rects_intersect(a, b) -> bool:
+    """两个 (x, y, 宽, 高) 矩形是否重叠"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def request_cost(img) -> int:
+    """一次请求的估计输入 token（图片 + 提示词），预算和统计都按它计"""
+    return estimate_request_tokens(img.width, img.height, 0)
+
+
+class Speculator:
+    """
+    后台预翻译：一个采样线程，同一时间最多一个预翻译请求
+    note_press() / record_user_request() 由翻译线程调用，set_obstructions() 由主线程调用
+    """
+
+    def __init__(self, presets, settle: float = 1.0, budget: float = 0.5):
+        """
+        :param presets: PresetRegistry；使用其中的默认预设、翻译器和结果缓存
+        :param settle: 画面变化后需要保持不变的秒数
+        :param budget: 预翻译消耗占总消耗的比例上限（0~1）；严格执行，例如 0.5 时
+                       预翻译的消耗不会超过按热键实际发出的请求
+        """
+        self.presets = presets
+        self.settle = settle
+        self.budget = min(max(budget, 0.0), 0.95)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._speculated = set()   # 最近一帧预翻译的结果 key（还没被按热键用掉的）
+        self._obstructions = ()    # 本程序可见窗口的矩形（物理像素）
+        self.presses = 0
+        self.hits = 0
+        self.speculations = 0
+        self.wasted = 0                     # 被后续画面取代、从未命中的预翻译
+        self.spec_cost = 0
+        self.user_cost = 0
+
+    # ---- 生命周期 ----
+    def start(self):
+        if np is None:
+            print("[预翻译] 需要 numpy，未开启")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="speculative", daemon=True)
+        self._thread.start()
+        print(f"[预翻译] 已开启：画面稳定 {self.settle:.1f}s 后预翻译，预算 {self.budget:.0%}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    # ---- 预算 ----
+    def _within_budget(self, cost: int) -> bool:
+        """加上这次之后预翻译占比仍不超过 budget：spec + cost <= budget * (spec + cost + user)"""
+        with self._lock:
+            spec = self.spec_cost + cost
+            return spec <= self.budget * (spec + self.user_cost)
+
+    def record_user_request(self, img):
+        """按热键后实际发出的请求（未命中缓存），计入总消耗"""
+        with self._lock:
+            self.user_cost += request_cost(img)
+
+    # ---- 本程序的窗口 ----
+    def set_obstructions(self, rects):
+        """:param rects: 主窗口、悬浮窗等当前可见窗口的 (x, y, 宽, 高)，物理像素坐标"""
+        with self._lock:
+            self._obstructions = tuple(rects)
+
+    def _obstructed(self, rect) -> bool:
+        with self._lock:
+            return any(rects_intersect(rect, r) for r in self._obstructions)
+
+    # ---- 命中统计 ----
+    def note_press(self, preset_name: str, keys) -> bool:
+        """
+        按热键：本帧的结果 key 中有预翻译过的即为命中；:return: 是否命中
+        只采样默认预设，其他预设的按键从不可能命中，不计入命中率
+        """
+        if preset_name != DEFAULT_PRESET:
+            return False
+        with self._lock:
+            self.presses += 1
+            hit = False
+            for key in keys:
+                if key in self._speculated:
+                    self._speculated.discard(key)
+                    hit = True
+            if hit:
+                self.hits += 1
+        print(f"[预翻译] {'命中' if hit else '未命中'}，{self.summary()}")
+        return hit
+
+    def summary(self) -> str:
+        with self._lock:
+            rate = f"{self.hits / self.presses:.0%}" if self.presses else "-"
+            total = self.spec_cost + self.user_cost
+            share = f"{self.spec_cost / total:.0%}" if total else "-"
+            return (f"命中率 {self.hits}/{self.presses} ({rate}), 预翻译 {self.speculations} 次, "
+                    f"浪费 {self.wasted} 次, 预算占比 {share}/{self.budget:.0%}")
+
+    # ---- 采样线程 ----
+    def _run(self):
+        try:
+            capture = ScreenCapture()     # mss 对象不能跨线程使用，采样线程自己建
+        except ImportError as e:
+            print(f"[预翻译] {e}")
+            return
+        last = None            # 上一次采样的灰度图
+        changed_at = None      # 画面最近一次变化的时间；None 表示已处理过当前画面
+        region_key = None
+        try:
+            while not self._stop.wait(SAMPLE_INTERVAL):
+                preset = self.presets.get(DEFAULT_PRESET)
+                if preset is None or preset.capture_rect is None:
+                    continue
+                if preset.region_key != region_key:
+                    region_key, last, changed_at = preset.region_key, None, time.monotonic()
+                if self._obstructed(preset.capture_rect):
+                    last, changed_at = None, None
+                    continue
+                try:
+                    img = capture.capture_region(*preset.capture_rect)
+                except ValueError:
+                    continue           # 区域不在任何屏幕上（屏幕已断开）
+                gray, _ = to_gray_array(img, SAMPLE_HEIGHT)
+                now = time.monotonic()
+                if last is None or not frames_equal(last, gray):
+                    last, changed_at = gray, now
+                    continue
+                if changed_at is None or now - changed_at < self.settle:
+                    continue
+                changed_at = None      # 这一帧只尝试一次
+                self._speculate(preset, img)
+        finally:
+            capture.close()
+
+    def _speculate(self, preset, img):
+        results = self.presets.results
+        keys = preset.result_keys(img)
+        missing = [lang for lang in preset.target_langs if results.get(keys[lang]) is None]
+        if not missing:
+            return
+        cost = request_cost(img)
+        if not self._within_budget(cost):
+            print(f"[预翻译] 超出预算，跳过（{self.summary()}）")
+            return
+        with self._lock:
+            self.spec_cost += cost
+            self.speculations += 1
+            # 上一帧的预翻译结果没被用到就被新画面取代了
+            if self._speculated:
+                self.wasted += 1
+            self._speculated = set()
+        started = time.monotonic()
+        try:
+            translator = self.presets.translator_for(preset)
+            fresh = translator.translate_image_multi(img, preset.source_lang, missing)
+        except Exception as e:
+            print(f"[预翻译] 失败: {e}")
+            return
+        with self._lock:
+            for lang in missing:
+                results.put(keys[lang], fresh[lang])
+                self._speculated.add(keys[lang])
+        print(f"[预翻译] 已就绪（{'、'.join(missing)}，{time.monotonic() - started:.2f}s）")
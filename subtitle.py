@@ -0,0 +1,181 @@
+"""
+字幕模式
+把一个窄条区域（视频 / 游戏的字幕行）以 10 Hz 采样，字幕一换、稳定下来就翻译，悬浮窗滚动显示
+- 每次采样只算一个很小的签名：灰度图按整数倍缩到 SIGNATURE_HEIGHT 行以内，
+  取每行、每列段的笔画边缘占比（行 / 列剖面），比较签名而不是整帧像素
+- 签名连续 SETTLE_SAMPLES 次不变视为字幕已稳定；空白（没有笔画）不翻译
+- 去重：与最近翻译过的字幕签名相近、或返回的译文与最近的相同，都不再发送 / 显示
+- 翻译在单独的单线程队列中按顺序进行，采样不被请求阻塞；积压超过 MAX_PENDING 行时丢弃最旧的
+- 采样线程每次先睡到下一个节拍；1920x160 的窄条算一次签名不到 1ms，游戏旁边运行基本不占 CPU
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from capture import ScreenCapture
+from image_analysis import np, to_gray_array, edge_mask
+
+SAMPLE_INTERVAL = 0.1       # 采样间隔（秒），10 Hz
+SETTLE_SAMPLES = 3          # 签名连续相同的次数（约 0.3 秒）视为字幕稳定
+SIGNATURE_HEIGHT = 32       # 签名用灰度图的高度上限
+COLUMN_BLOCKS = 48          # 列剖面分段数
+EDGE_THRESHOLD = 60         # 字幕描边对比强，阈值比截图分析高，少受画面背景影响
+SIGNATURE_TOLERANCE = 0.002 # 签名平均差不超过该值视为同一行字幕（背景变化约 0.001，只差一个标点约 0.004）
+BLANK_INK = 0.002           # 行剖面平均边缘占比低于该值视为没有字幕
+RECENT_LINES = 16           # 去重时比较的最近字幕数
+MAX_PENDING = 2             # 翻译队列中最多积压的字幕行
+
+
+def strip_signature(img):
+    """
+    行 / 列剖面签名
+    :return: ([每行边缘占比..., 每列段边缘占比...], 行剖面长度)
+    """
+    gray, _ = to_gray_array(img, SIGNATURE_HEIGHT)
+    mask = edge_mask(gray, EDGE_THRESHOLD)
+    rows = mask.mean(axis=1)
+    w = mask.shape[1]
+    blocks = max(1, min(COLUMN_BLOCKS, w))
+    bw = w // blocks
+    cols = mask[:, :bw * blocks].reshape(mask.shape[0], blocks, bw).mean(axis=(0, 2))
+    return np.concatenate((rows, cols)).astype(np.float32), len(rows)
+
+
+def signatures_similar(a, b) -> bool:
+    if a.shape != b.shape:
+        return False
+    return float(np.abs(a - b).mean()) <= SIGNATURE_TOLERANCE
+
+
+def is_blank(sig, rows: int) -> bool:
+    return float(sig[:rows].mean()) < BLANK_INK
+
+
+class SubtitleDetector:
+    """按采样顺序喂入签名，判断何时出现了一行新的、稳定的字幕（不依赖时间，便于单独验证）"""
+
+    def __init__(self, settle: int = SETTLE_SAMPLES, recent: int = RECENT_LINES):
+        self.settle = settle
+        self._last = None
+        self._stable = 0
+        self._handled = False          # 当前这段稳定画面已经处理过
+        self._recent = deque(maxlen=recent)
+        self.lines = 0
+        self.duplicates = 0
+
+    def feed(self, sig, rows: int) -> bool:
+        """
+        :param rows: 签名中行剖面的长度（其余为列剖面）
+        :return: True 表示一行新字幕刚稳定下来且最近没有翻译过，应当翻译
+        """
+        if self._last is None or not signatures_similar(self._last, sig):
+            self._last, self._stable, self._handled = sig, 1, False
+            return False
+        self._stable += 1
+        if self._handled or self._stable < self.settle:
+            return False
+        self._handled = True
+        if is_blank(sig, rows):
+            return False
+        if any(signatures_similar(sig, r) for r in self._recent):
+            self.duplicates += 1
+            return False
+        self._recent.append(sig)
+        self.lines += 1
+        return True
+
+
+class SubtitleWorker(QThread):
+    """字幕模式的采样线程；stop() 后结束"""
+    line_ready = pyqtSignal(str, str)    # 目标语言, 一行字幕的翻译
+    status_update = pyqtSignal(str)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, preset, translator, parent=None):
+        super().__init__(parent)
+        self._preset = preset
+        self._translator = translator
+        self._stop = threading.Event()
+        self._pending = deque()              # 已提交、尚未完成的翻译
+        self._recent_texts = deque(maxlen=RECENT_LINES)
+        self.samples = 0
+        self.sample_seconds = 0.0
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        if np is None:
+            self.error_occurred.emit("字幕模式需要 numpy")
+            return
+        try:
+            capture = ScreenCapture()        # mss 对象不能跨线程使用，采样线程自己建
+        except ImportError as e:
+            self.error_occurred.emit(str(e))
+            return
+        detector = SubtitleDetector()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="subtitle")
+        rect = self._preset.capture_rect
+        self.status_update.emit(f"🎬 字幕模式（{self._preset.name}）")
+        next_tick = time.monotonic()
+        try:
+            while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+                next_tick += SAMPLE_INTERVAL
+                started = time.perf_counter()
+                try:
+                    img = capture.capture_region(*rect)
+                except ValueError as e:
+                    self.error_occurred.emit(f"字幕区域不可用: {e}")
+                    return
+                fire = detector.feed(*strip_signature(img))
+                self.samples += 1
+                self.sample_seconds += time.perf_counter() - started
+                if fire:
+                    self._submit(executor, img)
+                # 处理慢了（机器很忙）就不补拍，从现在重新计时
+                next_tick = max(next_tick, time.monotonic())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            capture.close()
+            avg = self.sample_seconds / self.samples * 1000 if self.samples else 0.0
+            print(f"[字幕] 已停止：采样 {self.samples} 次（平均 {avg:.2f}ms），"
+                  f"翻译 {detector.lines} 行，重复跳过 {detector.duplicates} 行")
+
+    def _submit(self, executor, img):
+        self._pending = deque(f for f in self._pending if not f.done())
+        # 积压太多时丢弃最旧的还没开始的一行（字幕已经过去了，不值得再等）
+        if len(self._pending) >= MAX_PENDING:
+            for future in self._pending:
+                if future.cancel():
+                    self._pending.remove(future)
+                    print("[字幕] 翻译积压，丢弃最旧的一行")
+                    break
+        self._pending.append(executor.submit(self._translate, img))
+
+    def _translate(self, img):
+        preset = self._preset
+        started = time.monotonic()
+        try:
+            if preset.multi_target:
+                results = self._translator.translate_image_multi(
+                    img, preset.source_lang, preset.target_langs)
+            else:
+                lang = preset.target_langs[0]
+                results = {lang: self._translator.translate_image(img, preset.source_lang, lang)}
+        except Exception as e:
+            self.error_occurred.emit(f"字幕翻译出错: {e}")
+            return
+        if self._stop.is_set():
+            return                           # 字幕模式已关闭，不再显示
+        key = tuple(" ".join(results[lang].split()) for lang in preset.target_langs)
+        if not any(key) or key in self._recent_texts:
+            print("[字幕] 译文与最近的字幕相同，跳过")
+            return
+        self._recent_texts.append(key)
+        print(f"[字幕] 新字幕已翻译（{time.monotonic() - started:.2f}s）")
+        for lang in preset.target_langs:
+            self.line_ready.emit(lang, results[lang])
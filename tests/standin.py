@@ -0,0 +1,174 @@
+"""
+测试用的本地替身服务器：OpenAI 兼容的 /chat/completions，可按请求注入延迟和故障
+每个请求按到达顺序取一个 Reply（列表用完后重复最后一个），据此决定返回什么
+"""
+
+import json
+import time
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import backends
+from backends import Capabilities, CapabilityCache
+
+MODEL = "standin-vl"
+
+
+class Reply:
+    """
+    一次请求的应答
+    :param text: 返回的内容（流式时分两段发送）；也可以是 text(请求 JSON) -> str，按请求内容生成
+    :param delay: 发送首个内容前等待的秒数
+    :param status: 非 200 时直接返回该状态码的错误
+    :param chunk_delay: 大于 0 时流式应答逐行发送，每行之间等待这么多秒（模拟按输出长度计的生成耗时）
+    :param finish_reason: 结束原因，"length" 模拟输出被 max_tokens 截断
+    :param usage: {"prompt_tokens", "completion_tokens"}；非流式应答、或请求了
+                  stream_options.include_usage 的流式应答带上它
+    """
+
+    def __init__(self, text="Hello\n你好", delay: float = 0.0, status: int = 200,
+                 chunk_delay: float = 0.0, finish_reason: str = "stop", usage: dict = None):
+        self.text = text
+        self.delay = delay
+        self.status = status
+        self.chunk_delay = chunk_delay
+        self.finish_reason = finish_reason
+        self.usage = usage
+
+    def usage_payload(self):
+        if self.usage is None:
+            return None
+        usage = dict(self.usage)
+        usage["total_tokens"] = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        return usage
+
+    def render(self, request: dict) -> str:
+        return self.text(request) if callable(self.text) else self.text
+
+    def parts(self, text: str) -> list:
+        if self.chunk_delay > 0:
+            return text.splitlines(keepends=True) or [text]
+        half = len(text) // 2
+        return [text[:half], text[half:]]
+
+
+class StandInServer:
+    """with StandInServer([Reply(...), ...]) as server: server.base_url / server.requests"""
+
+    def __init__(self, replies=None):
+        self.replies = list(replies or [Reply()])
+        self.requests = 0
+        self.bodies = []
+        self.disconnects = 0          # 客户端在应答发完前断开的次数（对冲落败被取消）
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def _next_reply(self, body: bytes) -> Reply:
+        with self._lock:
+            index = self.requests
+            self.requests += 1
+            self.bodies.append(body)
+        return self.replies[min(index, len(self.replies) - 1)]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                reply = server._next_reply(body)
+                if reply.status != 200:
+                    self._send_json(reply.status, {"error": {"message": f"injected {reply.status}"}})
+                    return
+                time.sleep(reply.delay)
+                request = json.loads(body)
+                try:
+                    if request.get("stream"):
+                        with_usage = (request.get("stream_options") or {}).get("include_usage")
+                        self._send_stream(reply, reply.render(request), with_usage)
+                    else:
+                        self._send_json(200, {
+                            "id": "standin", "object": "chat.completion", "created": 0, "model": MODEL,
+                            "choices": [{"index": 0, "finish_reason": reply.finish_reason,
+                                         "message": {"role": "assistant", "content": reply.render(request)}}],
+                            "usage": reply.usage_payload(),
+                        })
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.disconnects += 1
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, reply: Reply, text: str, with_usage: bool = False):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                parts = reply.parts(text)
+                for i, part in enumerate(parts):
+                    if i:
+                        time.sleep(reply.chunk_delay)
+                    finish = reply.finish_reason if i == len(parts) - 1 else None
+                    chunk = {"id": "standin", "object": "chat.completion.chunk", "created": 0,
+                             "model": MODEL, "choices": [{"index": 0, "delta": {"content": part},
+                                                          "finish_reason": finish}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                if with_usage and reply.usage is not None:
+                    chunk = {"id": "standin", "object": "chat.completion.chunk", "created": 0,
+                             "model": MODEL, "choices": [], "usage": reply.usage_payload()}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class IsolatedCapabilities:
+    """
+    测试期间把能力缓存换成临时文件（不写项目下的 capabilities.json），
+    并为替身服务器预先填好能力，免得后台探测请求混进请求计数
+    """
+
+    def __init__(self, *servers):
+        self._servers = servers
+        self._saved = None
+
+    def __enter__(self):
+        self._dir = tempfile.TemporaryDirectory()
+        cache = CapabilityCache(f"{self._dir.name}/capabilities.json")
+        for server in self._servers:
+            cache.put(server.base_url, MODEL, Capabilities(probed_at=time.time()))
+        with backends._default_cache_lock:
+            self._saved, backends._default_cache = backends._default_cache, cache
+        return cache
+
+    def __exit__(self, *exc):
+        with backends._default_cache_lock:
+            backends._default_cache = self._saved
+        self._dir.cleanup()
@@ -0,0 +1,42 @@
+"""端点能力按（端点, 模型）区分：路由到的小模型单独探测、单独决定图片形式"""
+
+import json
+import time
+import unittest
+
+from backends import Capabilities
+from translator import AITranslator
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+LIGHT_MODEL = "light-vl"
+
+
+class PerModelCapabilitiesTest(unittest.TestCase):
+
+    def test_light_model_is_probed_with_its_own_name(self):
+        with StandInServer([Reply("ok")]) as server, IsolatedCapabilities(server) as cache:
+            AITranslator(api_key="test", api_base=server.base_url, model=MODEL,
+                         light_model=LIGHT_MODEL, max_retries=0)
+            deadline = time.monotonic() + 5.0
+            while cache.get(server.base_url, LIGHT_MODEL) is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertIsNotNone(cache.get(server.base_url, LIGHT_MODEL))
+        models = {json.loads(body)["model"] for body in server.bodies}
+        self.assertEqual(models, {LIGHT_MODEL})      # 默认模型有缓存，不再探测
+
+    def test_image_shape_follows_the_routed_model(self):
+        with StandInServer([Reply("ok")]) as server, IsolatedCapabilities(server) as cache:
+            cache.put(server.base_url, LIGHT_MODEL, Capabilities(
+                max_image_edge=1024, image_formats=("png",), probed_at=time.time()))
+            translator = AITranslator(api_key="test", api_base=server.base_url, model=MODEL,
+                                      light_model=LIGHT_MODEL, max_retries=0)
+            endpoint = translator.endpoints[0]
+            self.assertEqual(endpoint.capabilities_for(LIGHT_MODEL).max_image_edge, 1024)
+            self.assertEqual(endpoint.capabilities.max_image_edge, 1920)
+            self.assertEqual(translator._image_shape(LIGHT_MODEL), ("png", 1024))
+            self.assertEqual(translator._image_shape(MODEL), ("jpeg", 1920))
+        self.assertEqual(server.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
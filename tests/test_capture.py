@@ -0,0 +1,109 @@
+"""按屏幕截图：用假的 mss 对象模拟多屏布局"""
+
+import unittest
+
+from PIL import Image
+
+from capture import ScreenCapture, _intersect
+
+PRIMARY_COLOR = (0, 255, 0)
+SECOND_COLOR = (0, 0, 255)
+
+
+class _Shot:
+    def __init__(self, img):
+        self.size = img.size
+        self.raw = bytearray(img.convert("RGBA").tobytes("raw", "BGRA"))
+
+
+class FakeSct:
+    """主屏 1920x1080（绿）+ 右侧 3840x2160（蓝，顶部对齐，底部比主屏低）"""
+
+    monitors = [
+        {"left": 0, "top": 0, "width": 5760, "height": 2160},
+        {"left": 0, "top": 0, "width": 1920, "height": 1080},
+        {"left": 1920, "top": 0, "width": 3840, "height": 2160},
+    ]
+
+    def __init__(self):
+        self.grabs = []
+
+    def grab(self, rect):
+        self.grabs.append((rect["left"], rect["top"], rect["width"], rect["height"]))
+        for monitor, color in zip(self.monitors[1:], (PRIMARY_COLOR, SECOND_COLOR)):
+            if _intersect(rect, monitor) == rect:
+                return _Shot(Image.new("RGB", (rect["width"], rect["height"]), color))
+        raise AssertionError(f"截取范围不在单块屏幕内: {rect}")
+
+    def close(self):
+        pass
+
+
+def _capture():
+    capture = ScreenCapture.__new__(ScreenCapture)
+    capture._sct = FakeSct()
+    return capture
+
+
+class IntersectTest(unittest.TestCase):
+
+    def test_overlap(self):
+        a = {"left": 0, "top": 0, "width": 100, "height": 100}
+        b = {"left": 50, "top": 80, "width": 100, "height": 100}
+        self.assertEqual(_intersect(a, b), {"left": 50, "top": 80, "width": 50, "height": 20})
+
+    def test_touching_edges_do_not_intersect(self):
+        a = {"left": 0, "top": 0, "width": 100, "height": 100}
+        b = {"left": 100, "top": 0, "width": 100, "height": 100}
+        self.assertIsNone(_intersect(a, b))
+
+
+class CaptureRegionTest(unittest.TestCase):
+
+    def test_region_on_one_monitor_is_a_single_grab(self):
+        capture = _capture()
+        img = capture.capture_region(100, 100, 400, 300)
+        self.assertEqual(img.size, (400, 300))
+        self.assertEqual(img.getpixel((0, 0)), PRIMARY_COLOR)
+        self.assertEqual(capture._sct.grabs, [(100, 100, 400, 300)])
+
+    def test_region_spanning_two_monitors_is_stitched(self):
+        capture = _capture()
+        img = capture.capture_region(1800, 900, 400, 300)
+        self.assertEqual(img.size, (400, 300))
+        self.assertEqual(capture._sct.grabs, [(1800, 900, 120, 180), (1920, 900, 280, 300)])
+        self.assertEqual(img.getpixel((0, 0)), PRIMARY_COLOR)      # 主屏部分
+        self.assertEqual(img.getpixel((119, 179)), PRIMARY_COLOR)
+        self.assertEqual(img.getpixel((120, 0)), SECOND_COLOR)     # 右屏部分
+        self.assertEqual(img.getpixel((399, 299)), SECOND_COLOR)
+        self.assertEqual(img.getpixel((0, 299)), (0, 0, 0))        # 主屏下方没有屏幕，填黑
+
+    def test_region_partly_off_screen_is_clipped(self):
+        capture = _capture()
+        img = capture.capture_region(-100, 1000, 300, 200)
+        self.assertEqual(img.size, (300, 200))
+        self.assertEqual(capture._sct.grabs, [(0, 1000, 200, 80)])
+        self.assertEqual(img.getpixel((100, 0)), PRIMARY_COLOR)
+        self.assertEqual(img.getpixel((0, 0)), (0, 0, 0))
+        self.assertEqual(img.getpixel((150, 199)), (0, 0, 0))
+
+    def test_region_fully_off_screen_raises(self):
+        capture = _capture()
+        with self.assertRaises(ValueError):
+            capture.capture_region(9000, 0, 10, 10)
+        self.assertEqual(capture._sct.grabs, [])
+
+    def test_monitor_for_picks_largest_overlap(self):
+        capture = _capture()
+        self.assertEqual(capture.monitor_for(1800, 900, 400, 300)["left"], 1920)
+        self.assertEqual(capture.monitor_for(1700, 0, 300, 100)["left"], 0)
+        self.assertIsNone(capture.monitor_for(-500, -500, 10, 10))
+
+    def test_full_screen_grabs_one_monitor(self):
+        capture = _capture()
+        self.assertEqual(capture.capture_full_screen().size, (1920, 1080))
+        self.assertEqual(capture.capture_full_screen(1).size, (3840, 2160))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""配置写盘：原子写入保留文件权限、延迟写盘只用一个定时器"""
+
+import os
+import json
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+from config import Config, atomic_write_json
+
+
+class AtomicWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "config.json")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    @unittest.skipIf(os.name == "nt", "Windows 没有 POSIX 权限位")
+    def test_existing_file_mode_is_kept(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{}")
+        os.chmod(self.path, 0o644)
+        atomic_write_json(self.path, {"a": 1})
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"a": 1})
+
+    def test_no_temp_files_left(self):
+        atomic_write_json(self.path, {"a": 1})
+        atomic_write_json(self.path, {"a": 2})
+        self.assertEqual(os.listdir(self._dir.name), ["config.json"])
+
+
+class ScheduleSaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "config.json")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_burst_of_changes_uses_one_timer_and_one_write(self):
+        config = Config(self.path, save_delay=0.2)
+        threads_before = threading.active_count()
+        config.set("overlay_font_size", 10)
+        timer = config._save_timer
+        for size in range(11, 40):
+            config.set("overlay_font_size", size)
+        self.assertIs(config._save_timer, timer)
+        self.assertLessEqual(threading.active_count(), threads_before + 1)
+        timer.join(2.0)
+        self.assertIsNone(config._save_timer)
+        self.assertEqual(config.dirty_keys, set())
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["overlay_font_size"], 39)
+
+    def test_change_after_save_is_rescheduled(self):
+        config = Config(self.path, save_delay=0.1)
+        config.set("overlay_font_size", 10)
+        config.flush()
+        config.set("overlay_font_size", 12)
+        self.assertIsNotNone(config._save_timer)
+        time.sleep(0.3)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["overlay_font_size"], 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
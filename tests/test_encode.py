@@ -0,0 +1,45 @@
+"""图片压缩：各种图片模式都能缩小并编码"""
+
+import base64
+import io
+import unittest
+
+from PIL import Image
+
+from translator import compress_image, downscale_image, encode_image
+
+MODES = ("RGB", "RGBA", "L", "LA", "P", "PA", "1", "I", "I;16", "F", "CMYK")
+
+
+class DownscaleTest(unittest.TestCase):
+
+    def test_every_mode_is_downscaled_and_encoded(self):
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                img = Image.new(mode, (4000, 2000))
+                small = downscale_image(img)
+                self.assertEqual(small.size, (1920, 960))
+                for fmt in ("jpeg", "png"):
+                    encoded = encode_image(img, fmt)
+                    self.assertEqual(encoded.size, (1920, 960))
+                data = base64.b64decode(compress_image(img))
+                self.assertEqual(Image.open(io.BytesIO(data)).size, (1920, 960))
+
+    def test_palette_is_averaged_by_colour_not_index(self):
+        img = Image.new("P", (3840, 2160))
+        img.putpalette([0, 0, 0, 255, 255, 255] + [255, 0, 0] * 254)
+        img.paste(1, (0, 0, 3840, 2160))
+        for x in range(0, 3840, 2):
+            img.paste(0, (x, 0, x + 1, 2160))     # 黑白竖线交替
+        small = downscale_image(img)
+        self.assertEqual(small.mode, "RGB")
+        r, g, b = small.getpixel((100, 100))
+        self.assertTrue(100 < r < 160 and r == g == b)       # 平均成灰色，而不是索引 0 / 1 之间的红色
+
+    def test_small_image_is_returned_unchanged(self):
+        img = Image.new("P", (800, 600))
+        self.assertIs(downscale_image(img), img)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""多端点对冲：对冲延迟、慢主端点被备用端点超过、失败立即转移（本地替身服务器注入延迟）"""
+
+import time
+import unittest
+
+from PIL import Image
+
+from endpoints import HedgedExecutor, LatencyTracker
+from translator import AITranslator
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+HEDGE_DELAY = 0.3
+
+
+def _translator(primary: StandInServer, *secondaries: StandInServer) -> AITranslator:
+    translator = AITranslator(
+        api_key="test", api_base=primary.base_url, model=MODEL,
+        endpoints=[{"api_base": s.base_url, "name": f"backup{i}"} for i, s in enumerate(secondaries)],
+        timeouts={"connect": 1.0, "first_token": 5.0, "total": 10.0},
+        max_retries=0,
+    )
+    translator._executor.default_delay = HEDGE_DELAY     # 样本不足时的对冲延迟，测试里缩短
+    return translator
+
+
+def _image():
+    return Image.new("RGB", (200, 80), "white")
+
+
+class HedgeDelayTest(unittest.TestCase):
+
+    def test_default_delay_until_enough_samples(self):
+        executor = HedgedExecutor([object()], default_delay=2.0)
+        endpoint = type("E", (), {"latency": LatencyTracker()})()
+        self.assertEqual(executor.hedge_delay(endpoint), 2.0)
+
+    def test_adaptive_delay_follows_percentile_and_is_clamped(self):
+        executor = HedgedExecutor([object()], hedge_percentile=0.95, min_delay=0.3, max_delay=8.0)
+        endpoint = type("E", (), {"latency": LatencyTracker()})()
+        for seconds in (0.5, 0.6, 0.7, 0.8, 1.2):
+            endpoint.latency.record_first_token(seconds)
+        self.assertAlmostEqual(executor.hedge_delay(endpoint), 1.2)
+        fast = type("E", (), {"latency": LatencyTracker()})()
+        for _ in range(5):
+            fast.latency.record_first_token(0.01)
+        self.assertEqual(executor.hedge_delay(fast), 0.3)
+
+
+class HedgedTranslateTest(unittest.TestCase):
+
+    def test_fast_primary_is_not_hedged(self):
+        with StandInServer([Reply("primary")]) as primary, \
+                StandInServer([Reply("backup")]) as backup, IsolatedCapabilities(primary, backup):
+            result = _translator(primary, backup).translate_image(_image(), "英文", "中文")
+        self.assertEqual(result, "primary")
+        self.assertEqual(backup.requests, 0)
+
+    def test_slow_primary_is_hedged_and_backup_wins(self):
+        with StandInServer([Reply("primary", delay=3.0)]) as primary, \
+                StandInServer([Reply("backup")]) as backup, IsolatedCapabilities(primary, backup):
+            translator = _translator(primary, backup)
+            started = time.monotonic()
+            result = translator.translate_image(_image(), "英文", "中文")
+            elapsed = time.monotonic() - started
+        self.assertEqual(result, "backup")
+        self.assertEqual((primary.requests, backup.requests), (1, 1))
+        self.assertGreaterEqual(elapsed, HEDGE_DELAY)
+        self.assertLess(elapsed, 2.0)                   # 没有等慢的主端点
+        self.assertEqual(translator.endpoints[1].latency.successes, 1)
+        self.assertEqual(translator.endpoints[0].latency.successes, 0)
+
+    def test_failed_primary_fails_over_without_waiting(self):
+        with StandInServer([Reply(status=500)]) as primary, \
+                StandInServer([Reply("backup")]) as backup, IsolatedCapabilities(primary, backup):
+            translator = _translator(primary, backup)
+            translator._executor.default_delay = 5.0     # 失败转移不应等对冲延迟
+            started = time.monotonic()
+            result = translator.translate_image(_image(), "英文", "中文")
+            elapsed = time.monotonic() - started
+        self.assertEqual(result, "backup")
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(translator.endpoints[0].latency.failures, 1)
+
+    def test_first_token_latency_is_tracked_per_endpoint(self):
+        with StandInServer([Reply("primary", delay=0.1)]) as primary, IsolatedCapabilities(primary):
+            translator = _translator(primary)
+            for _ in range(3):
+                translator.translate_image(_image(), "英文", "中文")
+        latency = translator.endpoints[0].latency
+        self.assertEqual(latency.sample_count(), 3)
+        self.assertGreaterEqual(latency.percentile(0.5), 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
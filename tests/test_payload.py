@@ -0,0 +1,56 @@
+"""请求体：图片直接 base64 进预构造的 JSON，按 SDK 支持的参数原样发送"""
+
+import json
+import inspect
+import warnings
+import unittest
+
+import openai
+from PIL import Image
+
+import payload
+from payload import RequestBodyBuilder
+from translator import AITranslator, encode_image
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+
+class RawBodyParamTest(unittest.TestCase):
+
+    def test_param_matches_installed_sdk(self):
+        if "content" in inspect.signature(openai.OpenAI.post).parameters:
+            self.assertEqual(payload.RAW_BODY_PARAM, "content")
+        else:
+            self.assertIn(payload.RAW_BODY_PARAM, ("body", None))
+
+    def test_built_body_equals_inline_json(self):
+        image = encode_image(Image.new("RGB", (64, 32), "white"))
+        body = RequestBodyBuilder(image)
+        kwargs = {"model": MODEL, "messages": [{"role": "user", "content": [
+            {"type": "image_url", "image_url": {"url": image.placeholder_url}}]}],
+                  "extra_body": {"enable_thinking": False}}
+        expected = body.inline(kwargs)
+        expected.update(expected.pop("extra_body"))
+        self.assertEqual(json.loads(body.build(kwargs)), expected)
+
+
+class RawBodyRequestTest(unittest.TestCase):
+
+    def test_streaming_request_sends_prebuilt_body_without_deprecation(self):
+        with StandInServer([Reply("ok")]) as server, IsolatedCapabilities(server):
+            translator = AITranslator(api_key="test", api_base=server.base_url, model=MODEL,
+                                      max_retries=0)
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", DeprecationWarning)
+                result = translator.translate_image(Image.new("RGB", (200, 80), "white"), "英文", "中文")
+        self.assertEqual(result, "ok")
+        request = json.loads(server.bodies[0])
+        self.assertTrue(request["stream"])
+        url, = [part["image_url"]["url"] for message in request["messages"]
+                if isinstance(message["content"], list)
+                for part in message["content"] if part.get("type") == "image_url"]
+        self.assertTrue(url.startswith("data:image/jpeg;base64,"))
+        self.assertNotIn(payload.IMAGE_PLACEHOLDER, url)
+
+
+if __name__ == "__main__":
+    unittest.main()
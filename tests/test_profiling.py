@@ -0,0 +1,84 @@
+"""分阶段剖析：Python 3.12+ 每个进程只能有一个 cProfile 在运行时，阶段照常执行并计时"""
+
+import os
+import cProfile
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import profiling
+from profiling import Profiler
+
+
+class _SingleProfile(cProfile.Profile):
+    """模拟 3.12+ 的限制：进程内已有一个在运行时 enable() 抛 ValueError"""
+
+    active = None
+    lock = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        with self.lock:
+            if _SingleProfile.active not in (None, self):
+                raise ValueError("Another profiling tool is already active")
+            _SingleProfile.active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with self.lock:
+            if _SingleProfile.active is self:
+                _SingleProfile.active = None
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.profiler = Profiler()
+        self.profiler.configure(jobs=1, out_dir=self._dir.name)
+        patcher = mock.patch.object(profiling.cProfile, "Profile", _SingleProfile)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_concurrent_stage_runs_without_cprofile(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def worker():
+            entered.set()
+            release.wait(5.0)
+            return "worker"
+
+        job = self.profiler.wrap("worker", worker, job=True)
+        overlay = self.profiler.wrap("overlay", lambda: "overlay")
+        thread = threading.Thread(target=job)
+        thread.start()
+        entered.wait(5.0)
+        self.assertEqual(overlay(), "overlay")          # 不再抛 ValueError
+        self.assertEqual(self.profiler._local.stack, [])
+        release.set()
+        thread.join(5.0)
+
+        self.assertFalse(self.profiler.enabled)          # 一次翻译后写报告
+        reports = os.listdir(self._dir.name)
+        self.assertEqual(len(reports), 1)
+        files = set(os.listdir(os.path.join(self._dir.name, reports[0])))
+        self.assertEqual(files, {"worker.prof", "worker.txt", "overlay.txt"})
+        with open(os.path.join(self._dir.name, reports[0], "overlay.txt"), encoding="utf-8") as f:
+            report = f.read()
+        self.assertIn("调用次数: 1", report)
+        self.assertIn("其中 1 次调用时其他线程正在剖析", report)
+
+    def test_nested_stage_pauses_and_resumes_outer(self):
+        inner = self.profiler.wrap("inner", lambda: sum(range(100)))
+        outer = self.profiler.wrap("outer", lambda: inner() + 1, job=True)
+        self.assertEqual(outer(), 4951)
+        self.assertEqual(self.profiler._local.stack, [])
+        self.assertIsNone(_SingleProfile.active)
+
+
+if __name__ == "__main__":
+    unittest.main()
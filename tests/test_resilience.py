@@ -0,0 +1,125 @@
+"""分阶段时限、重试预算、熔断器（本地替身服务器注入故障）"""
+
+import time
+import unittest
+
+from PIL import Image
+
+from resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, RetryBudget, is_transient,
+)
+from translator import AITranslator
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+
+def _translator(server: StandInServer, max_retries: int = 2, **timeouts) -> AITranslator:
+    limits = {"connect": 1.0, "first_token": 5.0, "total": 10.0}
+    limits.update(timeouts)
+    return AITranslator(api_key="test", api_base=server.base_url, model=MODEL,
+                        timeouts=limits, max_retries=max_retries)
+
+
+def _image():
+    return Image.new("RGB", (200, 80), "white")
+
+
+class RetryBudgetTest(unittest.TestCase):
+
+    def test_budget_is_bounded_and_refilled_by_requests(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=2.0, initial=1.0)
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+        budget.deposit()
+        self.assertFalse(budget.try_acquire())
+        budget.deposit()
+        self.assertTrue(budget.try_acquire())
+        for _ in range(10):
+            budget.deposit()
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())     # 最多累积 max_tokens 个
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_opens_after_threshold_and_probes_after_cooldown(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=0.2)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.25)
+        self.assertTrue(breaker.allow())            # 半开：只放行一个探测请求
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.1)
+        breaker.record_failure()
+        time.sleep(0.15)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class TranslatorResilienceTest(unittest.TestCase):
+
+    def test_transient_failure_is_retried(self):
+        with StandInServer([Reply(status=503), Reply("ok")]) as server, IsolatedCapabilities(server):
+            result = _translator(server).translate_image(_image(), "英文", "中文")
+        self.assertEqual(result, "ok")
+        self.assertEqual(server.requests, 2)
+
+    def test_client_error_is_not_retried(self):
+        with StandInServer([Reply(status=400), Reply("ok")]) as server, IsolatedCapabilities(server):
+            with self.assertRaises(Exception) as ctx:
+                _translator(server).translate_image(_image(), "英文", "中文")
+        self.assertFalse(is_transient(ctx.exception))
+        self.assertEqual(server.requests, 1)
+
+    def test_exhausted_retry_budget_stops_retries(self):
+        with StandInServer([Reply(status=503), Reply("ok")]) as server, IsolatedCapabilities(server):
+            translator = _translator(server)
+            translator._retry_budget = RetryBudget(ratio=0.0, initial=0.0)
+            with self.assertRaises(Exception):
+                translator.translate_image(_image(), "英文", "中文")
+        self.assertEqual(server.requests, 1)
+
+    def test_first_token_timeout(self):
+        with StandInServer([Reply("late", delay=3.0)]) as server, IsolatedCapabilities(server):
+            translator = _translator(server, max_retries=0, first_token=0.5)
+            started = time.monotonic()
+            with self.assertRaises(Exception) as ctx:
+                translator.translate_image(_image(), "英文", "中文")
+            elapsed = time.monotonic() - started
+        self.assertTrue(is_transient(ctx.exception))
+        self.assertLess(elapsed, 2.0)
+
+    def test_total_deadline(self):
+        with StandInServer([Reply("late", delay=3.0)]) as server, IsolatedCapabilities(server):
+            translator = _translator(server, max_retries=2, first_token=10.0, total=0.8)
+            started = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                translator.translate_image(_image(), "英文", "中文")
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(server.requests, 1)
+
+    def test_breaker_fails_fast_when_endpoint_is_down(self):
+        with StandInServer([Reply(status=500)]) as server, IsolatedCapabilities(server):
+            translator = _translator(server, max_retries=0)
+            threshold = translator.endpoints[0].breaker.failure_threshold
+            for _ in range(threshold):
+                with self.assertRaises(Exception):
+                    translator.translate_image(_image(), "英文", "中文")
+            started = time.monotonic()
+            with self.assertRaises(CircuitOpenError):
+                translator.translate_image(_image(), "英文", "中文")
+            self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(server.requests, threshold)   # 熔断后不再发请求
+
+
+if __name__ == "__main__":
+    unittest.main()
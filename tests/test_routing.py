@@ -0,0 +1,65 @@
+"""模型路由：进程内共享统计、记录实际给出结果的模型"""
+
+import os
+import json
+import time
+import tempfile
+import unittest
+
+from PIL import Image
+
+from backends import Capabilities
+from image_analysis import TextFeatures
+from routing import ModelRouter, line_bucket, stats_store
+from translator import AITranslator
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+BACKUP_MODEL = "backup-vl"
+
+
+def _features(lines: int = 2) -> TextFeatures:
+    return TextFeatures(lines=lines, density=0.01, width=200, height=80)
+
+
+class RoutingStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, "routing_stats.json")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_routers_share_one_store_per_file(self):
+        first = ModelRouter("heavy", "light", stats_path=self.path)
+        second = ModelRouter("heavy", "light", stats_path=self.path)   # 配置变更后重建的路由器
+        self.assertIs(first._stats, second._stats)
+        first.record(_features(), "light", 0.5, "a\nb\nc\nd")
+        second.record(_features(), "heavy", 1.5, "a\nb\nc\nd")
+        with open(self.path, encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertEqual(set(saved[line_bucket(2)]), {"light", "heavy"})   # 后写的没有覆盖先写的
+
+    def test_hedged_backup_records_its_own_model(self):
+        with StandInServer([Reply("primary", delay=3.0)]) as primary, \
+                StandInServer([Reply("backup")]) as backup, \
+                IsolatedCapabilities(primary, backup) as cache:
+            cache.put(backup.base_url, BACKUP_MODEL, Capabilities(probed_at=time.time()))
+            translator = AITranslator(
+                api_key="test", api_base=primary.base_url, model=MODEL,
+                endpoints=[{"api_base": backup.base_url, "model": BACKUP_MODEL, "name": "backup"}],
+                timeouts={"connect": 1.0, "first_token": 5.0, "total": 10.0},
+                max_retries=0, light_model="light-vl",
+            )
+            translator._executor.default_delay = 0.3
+            translator.router = ModelRouter(MODEL, "light-vl", stats_path=self.path)
+            result = translator.translate_image(Image.new("RGB", (200, 80), "white"), "英文", "中文")
+        self.assertEqual(result, "backup")
+        store = stats_store(self.path)
+        bucket = line_bucket(0)
+        self.assertIsNotNone(store.get(bucket, BACKUP_MODEL))
+        self.assertIsNone(store.get(bucket, "light-vl"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""滚动检测：内容未变 / 改了一个字 / 向下滚动"""
+
+import unittest
+
+from PIL import Image, ImageDraw, ImageFont
+
+from scroll import ScrollTracker, detect_scroll, np
+
+REGION = ("region",)
+
+
+def _font(size: int = 14):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def _page(lines, width: int = 800, height: int = 400, top: int = 0):
+    """白底黑字的页面，每行 20px；top 为页面向上滚过的像素数"""
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    font = _font()
+    for i, text in enumerate(lines):
+        draw.text((10, 4 + i * 20 - top), text, fill="black", font=font)
+    return img
+
+
+LINES = [f"Line {i}: the quick brown fox jumps over the lazy dog, item 21" for i in range(40)]
+
+
+@unittest.skipIf(np is None, "需要 numpy")
+class ScrollTrackerTest(unittest.TestCase):
+
+    def _tracker(self, img):
+        tracker = ScrollTracker()
+        tracker.commit(img, REGION)
+        return tracker
+
+    def test_identical_frame_is_same(self):
+        tracker = self._tracker(_page(LINES))
+        self.assertEqual(tracker.plan(_page(LINES), REGION).kind, "same")
+
+    def test_one_glyph_change_is_not_same(self):
+        tracker = self._tracker(_page(LINES))
+        edited = list(LINES)
+        edited[5] = edited[5].replace("21", "27")
+        plan = tracker.plan(_page(edited), REGION)
+        self.assertNotEqual(plan.kind, "same")
+
+    def test_scroll_down_translates_strip(self):
+        tracker = self._tracker(_page(LINES))
+        plan = tracker.plan(_page(LINES, top=100), REGION)
+        self.assertEqual(plan.kind, "strip")
+        self.assertEqual(plan.shift, 100)
+        self.assertLess(plan.image.height, 400)
+
+    def test_region_change_is_full(self):
+        tracker = self._tracker(_page(LINES))
+        self.assertEqual(tracker.plan(_page(LINES), ("other",)).kind, "full")
+
+    def test_detect_scroll_shapes(self):
+        a = np.zeros((10, 10), dtype=np.int16)
+        self.assertIsNone(detect_scroll(a, np.zeros((12, 10), dtype=np.int16)))
+        self.assertEqual(detect_scroll(a, a.copy()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""jsonl 片段转发：被 max_tokens 截断后按上限重发时，由重发的尝试接管转发"""
+
+import json
+import time
+import unittest
+
+from PIL import Image
+
+from backends import Capabilities
+from prompts import MAX_TOKENS_CEILING
+from translator import AITranslator, _SegmentSink
+from tests.standin import StandInServer, IsolatedCapabilities, Reply, MODEL
+
+
+def _jsonl(count: int) -> str:
+    return "".join(json.dumps({"src": f"line {i}", "tgt": f"第 {i} 行"}, ensure_ascii=False) + "\n"
+                   for i in range(count))
+
+
+class SegmentSinkTest(unittest.TestCase):
+
+    def test_reset_hands_forwarding_to_the_next_attempt(self):
+        seen = []
+        sink = _SegmentSink(lambda pairs: seen.append(len(pairs)))
+        first, second = object(), object()
+        sink.feed(first, _jsonl(2))
+        sink.reset()
+        sink.feed(second, _jsonl(3))
+        self.assertEqual(seen, [2, 3])
+
+
+class TruncatedRetryTest(unittest.TestCase):
+
+    def test_retry_after_length_streams_segments(self):
+        seen = []
+        replies = [Reply(_jsonl(2), chunk_delay=0.01, finish_reason="length"),
+                   Reply(_jsonl(3), chunk_delay=0.01)]
+        with StandInServer(replies) as server, IsolatedCapabilities(server):
+            translator = AITranslator(api_key="test", api_base=server.base_url, model=MODEL,
+                                      output_format="jsonl", max_retries=0)
+            translator.translate_image(Image.new("RGB", (200, 80), "white"), "英文", "中文",
+                                       on_segments=lambda pairs: seen.append(len(pairs)))
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(translator.metrics.get("truncated_retries"), 1)
+        # 重发的尝试逐条转发，而不是等到结束才一次性补发
+        self.assertEqual(seen, [1, 2, 1, 2, 3])
+
+    def test_truncated_request_usage_is_counted(self):
+        replies = [Reply(_jsonl(2), finish_reason="length",
+                         usage={"prompt_tokens": 500, "completion_tokens": 256}),
+                   Reply(_jsonl(3), usage={"prompt_tokens": 500, "completion_tokens": 300})]
+        with StandInServer(replies) as server, IsolatedCapabilities(server) as cache:
+            cache.put(server.base_url, MODEL, Capabilities(stream_usage=True, probed_at=time.time()))
+            translator = AITranslator(api_key="test", api_base=server.base_url, model=MODEL,
+                                      output_format="jsonl", max_retries=0)
+            translator.translate_image(Image.new("RGB", (200, 80), "white"), "英文", "中文")
+        metrics = translator.metrics.snapshot()
+        first_max_tokens = json.loads(server.bodies[0])["max_tokens"]
+        self.assertEqual(metrics["requests"], 2)
+        self.assertEqual(metrics["prompt_tokens"], 1000)
+        self.assertEqual(metrics["completion_tokens"], 556)
+        self.assertEqual(metrics["max_tokens_requested"], first_max_tokens + MAX_TOKENS_CEILING)
+        self.assertEqual(metrics["max_tokens_saved"], 0)        # 被截断的那次没有省下什么
+
+
+if __name__ == "__main__":
+    unittest.main()
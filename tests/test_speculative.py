@@ -0,0 +1,90 @@
+"""预翻译：本程序窗口挡住区域时不采样、只统计被采样预设的按键"""
+
+import time
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+import speculative
+from presets import Preset, DEFAULT_PRESET
+from service import ResultCache
+from speculative import Speculator, rects_intersect
+
+REGION = {"x": 100, "y": 100, "width": 200, "height": 80}
+
+
+class _FakeCapture:
+    """每次截图都返回同一帧（画面稳定）"""
+
+    def capture_region(self, x, y, w, h):
+        return Image.new("RGB", (w, h), "white")
+
+    def close(self):
+        pass
+
+
+class _FakeTranslator:
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate_image_multi(self, img, source_lang, targets):
+        self.calls += 1
+        return {lang: "ok" for lang in targets}
+
+
+class _FakePresets:
+
+    def __init__(self):
+        self.preset = Preset(DEFAULT_PRESET, "ctrl+1", REGION, "英语", "中文", "m")
+        self.results = ResultCache(16)
+        self.translator = _FakeTranslator()
+
+    def get(self, name=DEFAULT_PRESET):
+        return self.preset if name == DEFAULT_PRESET else None
+
+    def translator_for(self, preset):
+        return self.translator
+
+
+class RectsTest(unittest.TestCase):
+
+    def test_intersect(self):
+        self.assertTrue(rects_intersect((0, 0, 10, 10), (5, 5, 10, 10)))
+        self.assertFalse(rects_intersect((0, 0, 10, 10), (10, 0, 10, 10)))     # 只贴边不算
+        self.assertFalse(rects_intersect((0, 0, 10, 10), (0, 20, 10, 10)))
+
+
+class SpeculatorTest(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (("SAMPLE_INTERVAL", 0.02), ("ScreenCapture", _FakeCapture)):
+            patcher = mock.patch.object(speculative, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.presets = _FakePresets()
+        self.speculator = Speculator(self.presets, settle=0.1, budget=0.9)
+        self.speculator.user_cost = 10 ** 6          # 预算充足
+        self.addCleanup(self.speculator.stop)
+
+    def test_obstructed_region_is_not_speculated(self):
+        self.speculator.set_obstructions([(250, 150, 400, 300)])   # 悬浮窗盖住区域右下角
+        self.speculator.start()
+        time.sleep(0.4)
+        self.assertEqual(self.presets.translator.calls, 0)
+        self.speculator.set_obstructions([(1000, 1000, 400, 300)])   # 移开后重新计时、照常预翻译
+        deadline = time.monotonic() + 2.0
+        while self.presets.translator.calls == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.presets.translator.calls, 1)
+
+    def test_only_sampled_preset_presses_are_counted(self):
+        self.assertFalse(self.speculator.note_press("其他预设", ["k"]))
+        self.assertEqual(self.speculator.presses, 0)
+        self.assertFalse(self.speculator.note_press(DEFAULT_PRESET, ["k"]))
+        self.assertEqual(self.speculator.presses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,63 +2,132 @@
 AI 视觉翻译模块
 - 将截屏压缩到 ~1MB
 - 直接发送给 Qwen 视觉模型进行识别 + 翻译
-- 返回中英对照结果
+- 返回原文/译文对照结果
 """
 
 import io
-import base64
+import time
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from openai import OpenAI
+from openai import Stream
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from image_analysis import estimate_text_features, split_text_strips
+from routing import ModelRouter, NO_TEXT_REPLY
+from prompts import (
+    get_template, get_multi_template, estimate_max_tokens, MAX_TOKENS_CEILING,
+    OUTPUT_JSONL, OUTPUT_MULTI,
+)
+from segment_parser import JsonLinesParser, pairs_to_text, split_by_target
+from metrics import Metrics
+from profiling import profiled
+from ratelimit import estimate_request_tokens
+from payload import EncodedImage, RequestBodyBuilder, RAW_BODY_PARAM
+from endpoints import Endpoint, HedgedExecutor, Attempt, AttemptCancelled
+from resilience import (
+    Deadline, RetryBudget, FirstTokenTimeout,
+    backoff_delay, is_transient,
+)
 
 
 # ====================================================================== #
 #  图片压缩：确保 ≤ target_size_kb（默认 ~1024KB ≈ 1MB）
 # ====================================================================== #
-def compress_image(img: Image.Image, target_size_kb: int = 1024) -> str:
+# 可以直接对像素值求平均的模式；截图都是 RGB / RGBA，其余模式缩小前先转换
+_AVERAGEABLE_MODES = ("RGB", "RGBA", "RGBX", "L", "LA")
+_GRAY_MODES = ("1", "I", "I;16", "I;16L", "I;16B", "I;16N", "F")
+
+
+def downscale_image(img: Image.Image, max_edge: int = 1920) -> Image.Image:
     """
-    将 PIL Image 压缩为 JPEG base64 字符串，目标大小 ≤ target_size_kb。
-    策略：先按比例缩小分辨率，再降低 JPEG quality。
-    返回 base64 编码的 JPEG 字符串。
+    把长边缩到 max_edge 以内，尽量少做全分辨率运算：
+    先用 reduce() 按整数倍做盒式平均（只保证不小于目标尺寸），
+    剩下不到 2 倍的部分再用 BOX 滤波缩放；不需要缩小时原样返回、不复制
+    调色板（P / PA）、1 位、16 位 / 整数 / 浮点灰度等模式不能按像素值平均（reduce() 直接报错，
+    或者平均的是调色板索引），缩小前先转成 L 或 RGB
     """
-    # 确保 RGB 模式（去掉 alpha 通道）
-    if img.mode != "RGB":
-        img = img.convert("RGB")
-
-    # 1. 如果分辨率过大，先缩小（最大长边 1920px）
-    max_edge = 1920
+    longest = max(img.size)
+    if longest <= max_edge:
+        return img
+    if img.mode not in _AVERAGEABLE_MODES:
+        img = img.convert("L" if img.mode in _GRAY_MODES else "RGB")
+    factor = longest // max_edge
+    if factor >= 2:
+        img = img.reduce(factor)
     w, h = img.size
     if max(w, h) > max_edge:
         scale = max_edge / max(w, h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        img = img.resize((new_w, new_h), Image.LANCZOS)
+        img = img.resize((max(1, int(w * scale)), max(1, int(h * scale))), Image.BOX)
+    return img
+
+
+@profiled("compress")
+def encode_image(img: Image.Image, image_format: str = "jpeg", max_edge: int = 1920,
+                 target_size_kb: int = 1024) -> EncodedImage:
+    """
+    按端点支持的格式编码图片；返回持有编码缓冲区的 EncodedImage（不生成 base64 字符串）
+    """
+    if image_format == "jpeg":
+        return _encode_jpeg(img, target_size_kb, max_edge)
+    img = downscale_image(img, max_edge=max_edge)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format=image_format.upper(), optimize=True)
+    print(f"[压缩] {image_format.upper()} 图片大小: {buf.tell() / 1024:.0f}KB, 分辨率: {img.size}")
+    return EncodedImage(buf, f"image/{image_format}", img.size)
+
+
+@profiled("compress")
+def compress_image(img: Image.Image, target_size_kb: int = 1024, max_edge: int = 1920) -> str:
+    """
+    将 PIL Image 压缩为 JPEG base64 字符串，目标大小 ≤ target_size_kb。
+    返回 base64 编码的 JPEG 字符串（翻译热路径使用 encode_image，不经过字符串）。
+    """
+    return _encode_jpeg(img, target_size_kb, max_edge).b64_string()
+
+
+def _encode_jpeg(img: Image.Image, target_size_kb: int, max_edge: int) -> EncodedImage:
+    """
+    策略：先按比例缩小分辨率，再降低 JPEG quality
+    """
+    # 1. 如果分辨率过大，先缩小（默认最大长边 1920px）；在模式转换之前做，只转换缩小后的像素
+    img = downscale_image(img, max_edge=max_edge)
 
-    # 2. 二分法找到最优 JPEG quality
+    # 确保 RGB 模式（去掉 alpha 通道）
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    # 2. 最高质量能放下就直接用（截图大多如此，只需编码一次），否则二分法找最优 JPEG quality
     quality_low, quality_high = 20, 95
-    best_buf = None
+    best_buf = io.BytesIO()
+    img.save(best_buf, format="JPEG", quality=quality_high, optimize=True)
+    if best_buf.tell() / 1024 > target_size_kb:
+        best_buf = None
+        quality_high -= 1
 
-    while quality_low <= quality_high:
-        quality_mid = (quality_low + quality_high) // 2
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=quality_mid, optimize=True)
-        size_kb = buf.tell() / 1024
+        while quality_low <= quality_high:
+            quality_mid = (quality_low + quality_high) // 2
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=quality_mid, optimize=True)
+            size_kb = buf.tell() / 1024
 
-        if size_kb <= target_size_kb:
-            best_buf = buf
-            quality_low = quality_mid + 1  # 尝试更高质量
-        else:
-            quality_high = quality_mid - 1  # 需要降低质量
+            if size_kb <= target_size_kb:
+                best_buf = buf
+                quality_low = quality_mid + 1  # 尝试更高质量
+            else:
+                quality_high = quality_mid - 1  # 需要降低质量
 
     # 如果所有质量都超标，用最低质量
     if best_buf is None:
         best_buf = io.BytesIO()
         img.save(best_buf, format="JPEG", quality=20, optimize=True)
 
-    best_buf.seek(0)
-    b64 = base64.b64encode(best_buf.getvalue()).decode("utf-8")
     size_kb = best_buf.tell() / 1024
     print(f"[压缩] 图片大小: {size_kb:.0f}KB, 分辨率: {img.size}")
-    return b64
+    return EncodedImage(best_buf, "image/jpeg", img.size)
 
 
 # ====================================================================== #
@@ -67,71 +136,446 @@ def compress_image(img: Image.Image, target_size_kb: int = 1024) -> str:
 class AITranslator:
     """调用 Qwen / OpenAI 兼容视觉 API 进行截图翻译"""
 
-    def __init__(self, api_key: str, api_base: str, model: str):
-        self.model = model
-        self.client = OpenAI(api_key=api_key, base_url=api_base)
+    STRIP_MIN_LINES = 6    # 分条翻译时每条至少的文字行数；不足两条的区域不切
+
+    def __init__(self, api_key: str, api_base: str, model: str,
+                 endpoints=None, hedge_percentile: float = 0.95,
+                 timeouts: dict = None, max_retries: int = 2, light_model: str = "",
+                 output_format: str = "text", backend: str = "", rate_limits: dict = None,
+                 parallel_strips: int = 1):
+        self._retry_budget = RetryBudget()
+        self.metrics = Metrics()
+        self.update_client(api_key, api_base, model, endpoints, hedge_percentile,
+                           timeouts, max_retries, light_model, output_format, backend,
+                           rate_limits, parallel_strips)
 
-    def update_client(self, api_key: str, api_base: str, model: str):
+    def update_client(self, api_key: str, api_base: str, model: str,
+                      endpoints=None, hedge_percentile: float = 0.95,
+                      timeouts: dict = None, max_retries: int = 2, light_model: str = "",
+                      output_format: str = "text", backend: str = "", rate_limits: dict = None,
+                      parallel_strips: int = 1):
+        """
+        :param endpoints: 可选的备用端点列表 [{"api_base", "api_key", "model", "name"}]，
+                          缺省字段沿用主端点；主端点慢时会对冲到这些端点
+        :param timeouts: {"connect", "first_token", "total"} 各阶段时限（秒）
+        :param max_retries: 瞬时错误的最大重试次数（同时受重试预算限制）
+        :param light_model: 文字较少的帧改用的小模型；为空则不路由
+        :param output_format: "text" 原文/译文对照文本；"jsonl" 每个片段一行 JSON，可流式逐条显示
+        :param backend: 主端点的后端名称（见 backends.py），为空按 api_base 自动识别
+        :param rate_limits: {"rpm", "tpm", "max_wait"}；主端点的限流上限（0 表示按响应头自动校准）
+                            和最多排队秒数，备用端点在 endpoints 每项中单独配置 rpm / tpm
+        :param parallel_strips: 大于 1 时，文字很多的区域沿行间空白切成至多这么多条并行翻译
+        """
         self.model = model
-        self.client = OpenAI(api_key=api_key, base_url=api_base)
+        self.output_format = output_format
+        self.parallel_strips = max(1, int(parallel_strips or 1))
+        self.router = ModelRouter(model, light_model)
+        self.timeouts = {"connect": 3.0, "first_token": 15.0, "total": 45.0}
+        self.timeouts.update(timeouts or {})
+        self.max_retries = max_retries
+        self.rate_limits = {"rpm": 0, "tpm": 0, "max_wait": 5.0}
+        self.rate_limits.update(rate_limits or {})
+        endpoint_timeouts = {
+            "connect_timeout": self.timeouts["connect"],
+            "first_token_timeout": self.timeouts["first_token"],
+        }
+        primary = Endpoint(api_key, api_base, model, backend=backend,
+                           rpm=self.rate_limits["rpm"], tpm=self.rate_limits["tpm"],
+                           **endpoint_timeouts)
+        self.client = primary.client
+        self.endpoints = [primary] + [
+            Endpoint.from_config(e, api_key, api_base, model, **endpoint_timeouts)
+            for e in (endpoints or [])
+        ]
+        self._executor = HedgedExecutor(self.endpoints, hedge_percentile=hedge_percentile)
+        for endpoint in self.endpoints:
+            endpoint.ensure_probed()
+            if self.router.enabled and endpoint.model == model:
+                endpoint.ensure_probed(light_model)      # 路由到小模型时用的是它的能力
+
+    def _endpoint_model(self, endpoint: Endpoint, model: str) -> str:
+        """路由选出的模型只替换使用默认模型的端点，显式配置了其他模型的备用端点不变"""
+        return model if endpoint.model == self.model else endpoint.model
+
+    def _image_shape(self, model: str):
+        """所有端点（各按本次实际使用的模型）都能接受的图片格式和最大边长"""
+        caps = [e.capabilities_for(self._endpoint_model(e, model)) for e in self.endpoints]
+        edge = min(c.max_image_edge for c in caps)
+        common = set.intersection(*(set(c.image_formats) for c in caps))
+        for fmt in ("jpeg", "webp", "png"):
+            if fmt in common:
+                return fmt, edge
+        return "jpeg", edge
 
     def translate_image(
-        self, img: Image.Image, source_lang: str, target_lang: str
+        self, img: Image.Image, source_lang: str, target_lang: str, on_segments=None,
     ) -> str:
         """
-        将截屏图片直接发给视觉 AI，返回中英对照翻译结果。
+        将截屏图片直接发给视觉 AI，返回原文/译文对照翻译结果。
         图片会先压缩到 ~1MB。
+        :param on_segments: 仅 jsonl 输出格式有效；每解析出新的片段就以
+                            [(原文, 译文), ...]（到目前为止的完整列表）回调一次，在后台线程中调用
         """
-        # 压缩图片
-        b64_image = compress_image(img)
-
-        system_prompt = (
-            f"你是一位专业翻译和 OCR 专家。请仔细阅读图片中的所有{source_lang}文字内容，"
-            f"然后翻译为{target_lang}。\n"
-            f"要求：\n"
-            f"1. 输出【中英对照】格式：每一行先显示原文，下一行显示对应翻译，"
-            f"原文和译文之间用空行分隔，每对之间用分隔线 --- 分开。\n"
-            f"2. 保持原文的段落结构和顺序。\n"
-            f"3. 只翻译文字内容，不要描述图片本身。\n"
-            f"4. 如果图片中没有文字，只回复：（无文字内容）\n"
-            f"5. 不要附加任何额外解释。\n\n"
-            f"示例输出格式：\n"
-            f"Hello World\n"
-            f"你好世界\n\n"
-            f"---\n\n"
-            f"This is a test.\n"
-            f"这是一个测试。"
-        )
+        return self._translate(img, source_lang, (target_lang,), on_segments)
+
+    def translate_image_multi(
+        self, img: Image.Image, source_lang: str, target_langs, on_segments=None,
+    ) -> dict:
+        """
+        一次请求同时翻译成多种目标语言：图片只上传、只被模型读一次
+        :param target_langs: 目标语言列表（重复的只保留第一个）
+        :param on_segments: 每解析出新的片段就以 {目标语言: [(原文, 译文), ...]} 回调一次
+        :return: {目标语言: 原文/译文对照文本}
+        """
+        targets = tuple(dict.fromkeys(target_langs))
+        if len(targets) == 1:
+            lang = targets[0]
+            callback = (lambda pairs: on_segments({lang: pairs})) if on_segments else None
+            return {lang: self.translate_image(img, source_lang, lang, callback)}
+        return self._translate(img, source_lang, targets, on_segments)
+
+    def _translate(self, img: Image.Image, source_lang: str, targets: tuple, on_segments=None):
+        """单目标语言返回文本，多目标语言返回 {目标语言: 文本}"""
+        # 本地估计文字量：用于选模型和估计 max_tokens（没有 numpy 时为 None）
+        features = estimate_text_features(img)
+        if (self.parallel_strips > 1 and features is not None
+                and features.lines >= 2 * self.STRIP_MIN_LINES):
+            bounds = split_text_strips(img, self.parallel_strips, self.STRIP_MIN_LINES)
+            if len(bounds) > 1:
+                return self._translate_strips(img, bounds, source_lang, targets, on_segments)
+        return self._translate_one(img, features, source_lang, targets, on_segments)
+
+    def _translate_strips(self, img: Image.Image, bounds, source_lang: str, targets: tuple,
+                          on_segments=None):
+        """
+        各条并行翻译，结果按从上到下的阅读顺序拼接
+        输出是串行生成的，整块区域的耗时取决于最长的那段输出；切成 n 条后约为 1/n
+        """
+        strips = [img.crop((0, top, img.width, bottom)) for top, bottom in bounds]
+        print(f"[分条] 区域 {img.size} 沿行间空白切成 {len(strips)} 条并行翻译: {bounds}")
+        self.metrics.add("strip_splits")
+        multi = len(targets) > 1
+
+        lock = threading.Lock()
+        strip_pairs = [{} if multi else [] for _ in strips]
+
+        def forward(i):
+            """jsonl / 多目标模式：任一条有新片段时，按条的顺序合并后整体回调"""
+            if on_segments is None:
+                return None
+
+            def callback(pairs):
+                with lock:
+                    strip_pairs[i] = pairs
+                    if multi:
+                        on_segments({lang: [p for ps in strip_pairs for p in ps.get(lang, ())]
+                                     for lang in targets})
+                    else:
+                        on_segments([p for ps in strip_pairs for p in ps])
+            return callback
+
+        def run(i):
+            strip = strips[i]
+            return self._translate_one(strip, estimate_text_features(strip),
+                                       source_lang, targets, forward(i))
+
+        with ThreadPoolExecutor(max_workers=len(strips), thread_name_prefix="strip") as pool:
+            results = list(pool.map(run, range(len(strips))))
+        if multi:
+            return {lang: _join_parts([r[lang] for r in results]) for lang in targets}
+        return _join_parts(results)
+
+    def _translate_one(self, img: Image.Image, features, source_lang: str, targets: tuple,
+                       on_segments=None):
+        """整张图片作为一个请求翻译"""
+        multi = len(targets) > 1
+        output_format = OUTPUT_MULTI if multi else self.output_format
+        model = self.router.route(features)
+        max_tokens = estimate_max_tokens(features, output_format, len(targets))
+
+        # 压缩图片（格式和最大边长按端点能力选择）
+        image_format, max_edge = self._image_shape(model)
+        image = encode_image(img, image_format, max_edge)
+        if multi:
+            template = get_multi_template(source_lang, targets)
+        else:
+            template = get_template(source_lang, targets[0], output_format)
+        messages = template.build_messages(image.placeholder_url)
+        body = RequestBodyBuilder(image)
+        sink = None
+        if multi:
+            sink = _SegmentSink(on_segments, targets)
+        elif output_format == OUTPUT_JSONL:
+            sink = _SegmentSink(on_segments)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{b64_image}",
-                                },
-                            },
-                            {
-                                "type": "text",
-                                "text": f"请识别并翻译图片中的所有{source_lang}文字为{target_lang}，用中英对照格式输出。",
-                            },
-                        ],
-                    },
-                ],
-                max_tokens=4096,
-                temperature=0.1,
-                extra_body={"enable_thinking": False},
-            )
-            result = response.choices[0].message.content.strip()
-            print(f"[AI] 返回结果 ({len(result)} 字):\n{result}")
+            started = time.monotonic()
+            completion = self._run_with_retries(messages, body, model, max_tokens, sink)
+            if completion.finish_reason == "length" and max_tokens < MAX_TOKENS_CEILING:
+                # 估计偏小被截断：按上限重发一次，保证结果完整
+                print(f"[AI] 输出在 max_tokens={max_tokens} 处被截断，按上限重试")
+                self.metrics.add("truncated_retries")
+                self.metrics.record_usage(completion.usage, max_tokens, MAX_TOKENS_CEILING, truncated=True)
+                max_tokens = MAX_TOKENS_CEILING
+                if sink is not None:
+                    sink.reset()          # 重发的尝试从头输出，由它重新接管片段转发
+                completion = self._run_with_retries(messages, body, model, max_tokens, sink)
+            result = completion.text.strip()
+            if sink is not None:
+                result = sink.finish(completion.text) or result
+            primary = result[targets[0]] if multi else result
+            self.router.record(features, completion.model or model, time.monotonic() - started, primary)
+            self.metrics.record_usage(completion.usage, max_tokens, MAX_TOKENS_CEILING)
+            if multi:
+                self.metrics.add("multi_target_requests")
+                print(f"[AI] 返回 {len(targets)} 种语言 ({'、'.join(targets)}, max_tokens={max_tokens}):\n{primary}")
+            else:
+                print(f"[AI] 返回结果 ({len(result)} 字, max_tokens={max_tokens}):\n{result}")
+            print(f"[统计] {self.metrics.summary()}")
             return result
         except Exception as e:
             traceback.print_exc()
             print(f"[ERROR] AI 视觉翻译失败: {e}")
             raise
+
+    def _run_with_retries(self, messages, body: RequestBodyBuilder, model: str, max_tokens: int,
+                          sink: "_SegmentSink" = None) -> "Completion":
+        """
+        在总时限和重试预算内执行请求，瞬时错误按抖动退避重试
+        :param model: 路由选出的模型；只替换使用默认模型的端点，显式配置了其他模型的备用端点不变
+        :param sink: jsonl 模式下接收流式文本、转发片段
+        :param body: 图片请求体构造器；messages 中的图片是占位符，发送时由它填入
+        """
+        deadline = Deadline(**self.timeouts)
+        self._retry_budget.deposit()
+        est_tokens = estimate_request_tokens(body.image.size[0], body.image.size[1], max_tokens)
+
+        def request(attempt):
+            endpoint_model = self._endpoint_model(attempt.endpoint, model)
+            governor = attempt.endpoint.governor(endpoint_model)
+            # 限流额度不够时排队；排不上（或被对冲取消）就不发请求
+            reserved = governor.acquire(
+                est_tokens, min(self.rate_limits["max_wait"], deadline.remaining()), attempt.cancelled,
+            )
+            if attempt.cancelled.is_set():
+                governor.settle(reserved, 0, requests_used=0)
+                raise AttemptCancelled(attempt.endpoint.name)
+            try:
+                completion = self._stream_completion(
+                    attempt, messages, body, deadline, endpoint_model, max_tokens,
+                    on_text=sink.feed if sink is not None else None,
+                    governor=governor,
+                )
+            except BaseException as e:
+                if getattr(e, "status_code", None) == 429:
+                    governor.penalize(getattr(getattr(e, "response", None), "headers", None))
+                governor.settle(reserved)
+                if sink is not None:
+                    sink.release(attempt)
+                raise
+            governor.settle(reserved, getattr(completion.usage, "total_tokens", None))
+            completion.model = endpoint_model
+            return completion
+
+        retry = 0
+        while True:
+            try:
+                return self._executor.run(request, deadline=deadline)
+            except Exception as e:
+                if not is_transient(e) or retry >= self.max_retries:
+                    raise
+                delay = backoff_delay(retry)
+                if delay >= deadline.remaining():
+                    raise
+                if not self._retry_budget.try_acquire():
+                    print("[重试] 重试预算已耗尽，放弃重试")
+                    raise
+                retry += 1
+                print(f"[重试] 第 {retry} 次重试，{delay:.2f}s 后发起（{type(e).__name__}）")
+                time.sleep(delay)
+
+    @staticmethod
+    def _stream_completion(attempt: Attempt, messages, body: RequestBodyBuilder, deadline: Deadline,
+                           model: str, max_tokens: int, on_text=None,
+                           governor=None) -> "Completion":
+        """
+        对单个端点发起流式请求；读到首个内容即上报首 token，被对冲取消时关闭连接
+        连接 / 读超时由端点客户端的 httpx.Timeout 负责，这里再检查首 token 与总时限
+        :param on_text: on_text(attempt, delta)，每收到一段文本调用一次
+        :param governor: 限流调度器，用响应头校准
+        :param body: 把图片填进请求 JSON 的构造器；流式请求的请求体以 bytes 交给 SDK 的 post()，
+                     不再经 SDK 序列化，响应头从 Stream.response 取；
+                     非流式请求和不支持原始请求体的 SDK（低于 1.99）把 data URL 填进参数走 create()
+        """
+        endpoint = attempt.endpoint
+        caps = endpoint.capabilities_for(model)
+        if not caps.vision:
+            raise RuntimeError(f"{endpoint.name} 不支持图片输入")
+        kwargs = endpoint.backend.request_kwargs(caps, model, messages, max_tokens)
+        if kwargs.get("stream") and RAW_BODY_PARAM:
+            response = endpoint.client.post(
+                "/chat/completions",
+                cast_to=ChatCompletion,
+                stream=True,
+                stream_cls=Stream[ChatCompletionChunk],
+                **{RAW_BODY_PARAM: body.build(kwargs)},
+            )
+            headers = response.response.headers
+        else:
+            raw = endpoint.client.chat.completions.with_raw_response.create(**body.inline(kwargs))
+            headers = raw.headers
+            response = raw.parse()
+        if governor is not None:
+            governor.calibrate(headers)
+        if not kwargs.get("stream"):
+            return AITranslator._plain_completion(attempt, response, on_text)
+
+        stream = response
+        attempt.on_cancel(stream.close)
+        completion = Completion()
+        parts = []
+        try:
+            for chunk in stream:
+                if attempt.cancelled.is_set():
+                    raise AttemptCancelled(endpoint.name)
+                deadline.check()
+                if (not attempt.first_token.is_set()
+                        and time.monotonic() - attempt.started_at > deadline.first_token):
+                    raise FirstTokenTimeout(f"{endpoint.name} {deadline.first_token:.0f}s 内无首 token")
+                if getattr(chunk, "usage", None) is not None:
+                    completion.usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    completion.finish_reason = choice.finish_reason
+                delta = choice.delta.content
+                if delta:
+                    attempt.mark_first_token()
+                    parts.append(delta)
+                    if on_text is not None:
+                        on_text(attempt, delta)
+        except Exception:
+            if attempt.cancelled.is_set():
+                raise AttemptCancelled(endpoint.name)
+            raise
+        finally:
+            stream.close()
+        completion.text = "".join(parts)
+        return completion
+
+    @staticmethod
+    def _plain_completion(attempt: Attempt, response, on_text=None) -> "Completion":
+        """不支持流式的端点：整段返回，收到响应即视为首 token"""
+        if attempt.cancelled.is_set():
+            raise AttemptCancelled(attempt.endpoint.name)
+        choice = response.choices[0]
+        text = choice.message.content or ""
+        attempt.mark_first_token()
+        if on_text is not None and text:
+            on_text(attempt, text)
+        return Completion(text, choice.finish_reason, getattr(response, "usage", None))
+
+
+class Completion:
+    """一次流式请求的结果：文本、结束原因、usage（服务端不返回时为 None）、实际给出结果的模型"""
+
+    def __init__(self, text: str = "", finish_reason: str = None, usage=None, model: str = None):
+        self.text = text
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.model = model
+
+
+class _SegmentSink:
+    """
+    jsonl / 多目标模式的片段转发：每个尝试各有一个增量解析器，
+    对冲 / 重试时只转发"当前主导"尝试的片段；主导尝试失败后由下一个产出片段的尝试接管
+    指定 targets 时按目标语言拆分后回调 {目标语言: [(原文, 译文)]}
+    """
+
+    def __init__(self, callback, targets=None):
+        self._callback = callback
+        self._targets = targets
+        self._parsers = {}
+        self._owner = None
+        self._emitted = None
+        self._lock = threading.Lock()
+
+    def feed(self, attempt, delta: str):
+        with self._lock:
+            parser = self._parsers.get(attempt)
+            if parser is None:
+                parser = self._parsers[attempt] = JsonLinesParser(self._targets)
+            if not parser.feed(delta):
+                return
+            if self._owner is None:
+                self._owner = attempt
+            if self._owner is not attempt:
+                return
+            self._emit(list(parser.pairs))
+
+    def release(self, attempt):
+        with self._lock:
+            self._parsers.pop(attempt, None)
+            if self._owner is attempt:
+                self._owner = None
+
+    def reset(self):
+        """丢弃之前所有尝试的解析状态和主导者（被截断后整体重发时用）；已转发的片段保留"""
+        with self._lock:
+            self._parsers.clear()
+            self._owner = None
+
+    def finish(self, raw_text: str):
+        """
+        按胜出结果完整解析一遍；与已转发的不一致时补发一次最终列表
+        :return: 转成纯文本对照格式的结果；解析不出片段时返回空串，由调用方回退到原始文本
+                 多目标模式返回 {目标语言: 文本}，解析不出时每种语言都给原始文本
+        """
+        parser = JsonLinesParser(self._targets)
+        parser.feed(raw_text)
+        if not parser.pairs:
+            text = raw_text.strip() if self._targets else ""
+            text = text if raw_text.strip() else NO_TEXT_REPLY
+            return {lang: text for lang in self._targets} if self._targets else text
+        with self._lock:
+            if parser.pairs != self._emitted:
+                self._emit(list(parser.pairs))
+        if self._targets:
+            return {lang: pairs_to_text(pairs)
+                    for lang, pairs in split_by_target(parser.pairs, self._targets).items()}
+        return pairs_to_text(parser.pairs)
+
+    def _emit(self, pairs):
+        self._emitted = pairs
+        if self._callback is None:
+            return
+        try:
+            self._callback(split_by_target(pairs, self._targets) if self._targets else pairs)
+        except Exception as e:
+            print(f"[片段] 回调出错: {e}")
+
+
+def _join_parts(results) -> str:
+    """分条翻译的结果按顺序拼接，跳过没有文字的条"""
+    parts = [r for r in results if r and r != NO_TEXT_REPLY]
+    return "\n\n---\n\n".join(parts) if parts else NO_TEXT_REPLY
+
+
+def build_translator(config, model: str) -> "AITranslator":
+    """按 Config 中的 API 设置为指定模型创建翻译器"""
+    return AITranslator(
+        api_key=config.api_key,
+        api_base=config.api_base,
+        model=model,
+        endpoints=config.endpoints,
+        hedge_percentile=config.hedge_percentile,
+        timeouts=config.timeouts,
+        max_retries=config.max_retries,
+        light_model=config.light_model,
+        output_format=config.output_format,
+        backend=config.backend,
+        rate_limits=config.rate_limits,
+        parallel_strips=config.parallel_strips,
+    )